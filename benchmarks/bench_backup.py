@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Онлайн-копия базы под нагрузкой: скорость копирования и задержки записей клиентов.
+
+Запуск из корня репозитория: python benchmarks/bench_backup.py [МБ базы, по умолчанию 50]
+Во временной базе идут записи слотов из отдельного потока (как при бронированиях),
+а backup_database копирует ее с разным числом страниц за шаг. -1 - вся база
+за один шаг, как у простого sqlite3 .backup, 0 - записи без копирования.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '123:abc')
+os.environ.setdefault('ADMIN_IDS', '1')
+
+SCRATCH_DIR = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(SCRATCH_DIR, "bench.db")}'
+
+from src.database.core import get_db_connection
+from src.database.backup_repository import backup_database
+from src.database.schedule_repository import add_slot_to_schedule
+
+STEP_SIZES = [(0, 0.0), (-1, 0.0), (1000, 0.0), (100, 0.005), (20, 0.001)]
+WRITE_INTERVAL = 0.002
+BASELINE_SECONDS = 1.0
+
+
+def fill_database(megabytes: int):
+    """Заполняет архив записей до нужного размера базы"""
+    row = ('Клиент', 'контакт', 'x' * 900, 0, '2020-01-01 10:00', 'primary', 0)
+    with get_db_connection() as conn:
+        conn.executemany(
+            '''INSERT INTO appointments_archive
+            (client_name, client_contact, client_request, slot_id, slot_datetime, consultation_type, client_chat_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            [row] * (megabytes * 1024)
+        )
+        conn.commit()
+        # Заливка не должна достаться контрольной точке WAL во время замеров
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def measure(pages_per_step: int, pause: float, start: datetime) -> dict:
+    """Копирует базу, пока другой поток добавляет слоты, и замеряет задержку каждой записи"""
+    latencies = []
+    stop = threading.Event()
+
+    def writer():
+        index = 0
+        while not stop.is_set():
+            value = (start + timedelta(minutes=index * 90)).strftime('%Y-%m-%d %H:%M')
+            started = time.perf_counter()
+            add_slot_to_schedule(value)
+            latencies.append(time.perf_counter() - started)
+            index += 1
+            time.sleep(WRITE_INTERVAL)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    target = os.path.join(SCRATCH_DIR, 'snapshot.db')
+    try:
+        if pages_per_step:
+            stats = backup_database(target, pages_per_step, pause)
+            stats['size'] = os.path.getsize(target)
+            os.remove(target)
+        else:
+            # Базовая линия: те же записи без копирования
+            time.sleep(BASELINE_SECONDS)
+            stats = {'duration': BASELINE_SECONDS, 'size': 0, 'max_write_wait': 0.0, 'restarts': 0}
+    finally:
+        stop.set()
+        thread.join()
+
+    latencies.sort()
+    stats['writes'] = len(latencies)
+    stats['write_p99'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0
+    stats['write_max'] = latencies[-1] if latencies else 0.0
+    return stats
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    fill_database(megabytes)
+
+    print(f"{'страниц/шаг':>11} {'пауза, мс':>10} {'МБ/с':>7} {'проба макс, мс':>15} {'перезапусков':>13} "
+          f"{'записей':>8} {'запись p99, мс':>15} {'запись макс, мс':>16}")
+    for index, (pages_per_step, pause) in enumerate(STEP_SIZES):
+        stats = measure(pages_per_step, pause, start=datetime(2031 + index, 1, 1, 9, 0))
+        print(f"{pages_per_step:>11} {pause * 1000:>10.1f} {stats['size'] / stats['duration'] / 1024 / 1024:>7.1f} "
+              f"{stats['max_write_wait'] * 1000:>15.1f} {stats['restarts']:>13} {stats['writes']:>8} "
+              f"{stats['write_p99'] * 1000:>15.2f} {stats['write_max'] * 1000:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
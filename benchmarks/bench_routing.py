@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Стоимость выбора обработчика для кнопки меню в зависимости от числа кнопок.
+
+Запуск из корня репозитория: python benchmarks/bench_routing.py [6 20 50 100 200]
+Сравнивает прежнюю цепочку MessageHandler(filters.Regex('^...$')) по обработчику
+на кнопку с одним MenuHandler и таблицей маршрутов. Перебор повторяет
+Application.process_update: обработчики группы проверяются по порядку до первого
+подходящего. Замеряются последняя кнопка меню (худший случай для цепочки) и
+обычный текст, который не подходит ни одной кнопке.
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import MessageHandler, filters
+from src.bot.routing import MenuRouter
+
+ROUNDS = 20000
+
+
+async def noop(update, context):
+    pass
+
+
+def make_update(text: str) -> Update:
+    return Update.de_json({
+        'update_id': 1,
+        'message': {
+            'message_id': 1, 'date': 0, 'text': text,
+            'chat': {'id': 1, 'type': 'private'}, 'from': {'id': 1, 'is_bot': False, 'first_name': 'x'},
+        },
+    }, None)
+
+
+def regex_chain(buttons: list) -> list:
+    return [MessageHandler(filters.Regex(f'^{re.escape(button)}$'), noop) for button in buttons]
+
+
+def menu_table(buttons: list) -> list:
+    router = MenuRouter()
+    for button in buttons:
+        router.route(button, noop)
+    return [router.handler()]
+
+
+def select(handlers: list, update: Update):
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is not None and check is not False:
+            return handler
+    return None
+
+
+def measure(handlers: list, update: Update) -> float:
+    """Среднее время выбора обработчика на одно обновление, мкс"""
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        select(handlers, update)
+    return (time.perf_counter() - started) / ROUNDS * 1_000_000
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [6, 20, 50, 100, 200]
+    print(f"{'кнопок':>7} {'regex, кнопка':>14} {'таблица, кнопка':>16} {'regex, текст':>13} {'таблица, текст':>15}  (мкс)")
+    for count in counts:
+        buttons = [f'🔘 Пункт меню {index}' for index in range(count)]
+        last_button, free_text = make_update(buttons[-1]), make_update('Хочу записаться на вторник')
+        chain, table = regex_chain(buttons), menu_table(buttons)
+        print(f"{count:>7} {measure(chain, last_button):>14.2f} {measure(table, last_button):>16.2f} "
+              f"{measure(chain, free_text):>13.2f} {measure(table, free_text):>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Время от запуска процесса до первого обработанного обновления.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_startup.py [--tenants 1 5 20] [--latency-ms 50] [--budget-ms 1000]
+
+Каждый замер - новый процесс python: импорт модулей, сборка приложений,
+инициализация баз и ботов и долгий опрос проходят как при перезапуске бота.
+Bot API заменен заглушкой из replay_updates с задержкой --latency-ms на запрос,
+базы sqlite лежат во временном каталоге и создаются первым, незамеренным
+запуском, так что замеряется именно перезапуск. Если медиана времени до первого
+обновления превышает --budget-ms, скрипт завершается с кодом 1.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+RUNS = 5
+
+
+def child(started: float, tenant_count: int, latency: float, scratch_dir: str):
+    """Поднимает ботов и выходит, как только обработано первое обновление"""
+    sys.path.insert(0, ROOT_DIR)
+    os.environ.setdefault('BOT_TOKEN', '123:abc')
+    os.environ.setdefault('ADMIN_IDS', '1')
+    os.environ['PERSISTENCE_FILE'] = ''
+
+    import asyncio
+    import signal
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    from replay_updates import StubRequest
+    from src.config.settings import settings
+    from src.config.tenants import Tenant, _normalize_overrides
+    from src.bot.handlers.common_handlers import build_application, _run_tenants
+    imported = time.time()
+
+    settings.TENANTS = [
+        Tenant(f't{index}', _normalize_overrides(f't{index}', {
+            'BOT_TOKEN': f'{1000 + index}:abc',
+            'ADMIN_IDS': [1],
+            'DATABASE_URL': f'sqlite:///{os.path.join(scratch_dir, f"t{index}.db")}',
+            'PERSISTENCE_FILE': '',
+        }))
+        for index in range(tenant_count)
+    ]
+    request = StubRequest(latency)
+    request.pending_updates = [{
+        'update_id': 1,
+        'message': {
+            'message_id': 1, 'date': int(time.time()), 'text': '/help',
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 5}],
+            'chat': {'id': 7, 'type': 'private'}, 'from': {'id': 7, 'is_bot': False, 'first_name': 'x'},
+        },
+    }]
+    result = {}
+
+    async def first_update(update, context):
+        if 'first_update' not in result:
+            result['first_update'] = time.time()
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    applications = []
+    for tenant in settings.TENANTS:
+        scheduler = applications[0].scheduler if applications else None
+        application = build_application(tenant, scheduler, bot_request=request)
+        # Группа после основных обработчиков: срабатывает, когда обновление уже обработано
+        application.add_handler(TypeHandler(Update, first_update), group=1)
+        applications.append(application)
+    built = time.time()
+
+    asyncio.run(_run_tenants(applications))
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'build_ms': (built - imported) * 1000,
+        'first_update_ms': (result['first_update'] - started) * 1000,
+    }))
+
+
+def run_child(tenant_count: int, latency: float, scratch_dir: str) -> dict:
+    started = time.time()
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', str(started), str(tenant_count), str(latency), scratch_dir],
+        capture_output=True, text=True, check=True, cwd=scratch_dir,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(float(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4]), sys.argv[5])
+        return
+
+    parser = argparse.ArgumentParser(description='Время до первого обновления после запуска')
+    parser.add_argument('--tenants', type=int, nargs='+', default=[1, 5, 20], help='числа психологов')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='задержка ответа Bot API, мс')
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help='допустимая медиана до первого обновления, мс')
+    args = parser.parse_args()
+
+    print(f"{'психологов':>10} {'импорт, мс':>11} {'сборка, мс':>11} {'до первого обновления, мс':>26}")
+    over_budget = False
+    for tenant_count in args.tenants:
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            # Первый запуск создает базы, замеряются перезапуски
+            run_child(tenant_count, args.latency_ms / 1000, scratch_dir)
+            runs = [run_child(tenant_count, args.latency_ms / 1000, scratch_dir) for _ in range(RUNS)]
+        medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        over_budget |= medians['first_update_ms'] > args.budget_ms
+        print(f"{tenant_count:>10} {medians['import_ms']:>11.0f} {medians['build_ms']:>11.0f} "
+              f"{medians['first_update_ms']:>26.0f}")
+
+    if over_budget:
+        print(f"Время до первого обновления превышает бюджет {args.budget_ms:.0f} мс")
+        sys.exit(1)
+    print(f"В пределах бюджета {args.budget_ms:.0f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Стоимость одного психолога в общем процессе: время сборки, память и CPU в простое.
+
+Запуск из корня репозитория: python benchmarks/bench_tenants.py [1 10 50 100]
+Боты собираются без обращения к Telegram (фиктивные токены, базы memory://).
+"""
+
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '123:abc')
+os.environ.setdefault('ADMIN_IDS', '1')
+os.environ['PERSISTENCE_FILE'] = ''
+
+from src.config.settings import settings
+from src.config.tenants import Tenant, _normalize_overrides, use_tenant
+from src.bot.handlers.common_handlers import build_application
+from src.services.waitlist_service import waitlist_service
+
+IDLE_SECONDS = 2.0
+
+
+def make_tenants(count: int, offset: int = 0) -> list:
+    return [
+        Tenant(f't{i}', _normalize_overrides(f't{i}', {
+            'BOT_TOKEN': f'{1000 + i}:abc',
+            'ADMIN_IDS': [i + 1],
+            'DATABASE_URL': 'memory://',
+            'PERSISTENCE_FILE': '',
+        }))
+        for i in range(offset, offset + count)
+    ]
+
+
+async def measure(count: int) -> dict:
+    # Базовая линия — один психолог, замеряется прирост на каждого следующего
+    first = make_tenants(1)
+    others = make_tenants(count - 1, offset=1)
+    settings.TENANTS = first + others
+
+    applications = [build_application(first[0])]
+    scheduler = applications[0].scheduler
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    for tenant in others:
+        applications.append(build_application(tenant, scheduler))
+    build_time = time.perf_counter() - started
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for application in applications:
+        with use_tenant(application.tenant):
+            waitlist_service.start()
+
+    cpu_started = time.process_time()
+    await asyncio.sleep(IDLE_SECONDS)
+    idle_cpu = time.process_time() - cpu_started
+
+    for application in applications:
+        with use_tenant(application.tenant):
+            await waitlist_service.stop()
+
+    added = max(count - 1, 1)
+    return {
+        'tenants': count,
+        'build_ms_per_tenant': build_time / added * 1000 if count > 1 else 0.0,
+        'kb_per_tenant': (after - before) / added / 1024 if count > 1 else 0.0,
+        'idle_cpu_ms_per_s': idle_cpu / IDLE_SECONDS * 1000,
+    }
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 10, 50, 100]
+    print(f"{'психологов':>10} {'сборка, мс/шт':>14} {'память, КБ/шт':>14} {'CPU в простое, мс/с':>20}")
+    for count in counts:
+        result = asyncio.run(measure(count))
+        print(f"{result['tenants']:>10} {result['build_ms_per_tenant']:>14.2f} "
+              f"{result['kb_per_tenant']:>14.1f} {result['idle_cpu_ms_per_s']:>20.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Воспроизведение записанных обновлений через настоящие обработчики бота.
+
+Запуск из корня репозитория:
+    python benchmarks/replay_updates.py updates.jsonl.gz [updates.jsonl.gz.1 ...] [--speed 1] [--api-latency 0]
+
+Запись делает сам бот при RECORD_UPDATES_FILE (см. src/bot/recording.py).
+Приложения собираются build_application с заглушкой Bot API вместо сети и
+временными базами sqlite (или --database memory://), поэтому воспроизведение
+не трогает ни Telegram, ни рабочие данные. --speed 1 повторяет исходный темп,
+10 ускоряет в десять раз, 0 подает обновления без пауз. Отчет: задержка по
+каждому обработчику (p50, p95, максимум), пропускная способность и отставание
+от расписания записи.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '123:replay')
+os.environ.setdefault('ADMIN_IDS', '1')
+os.environ['PERSISTENCE_FILE'] = ''
+os.environ['RECORD_UPDATES_FILE'] = ''
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ConversationHandler
+from telegram.request import BaseRequest
+from src.config.settings import settings
+from src.config.tenants import Tenant, _normalize_overrides, use_tenant
+from src.bot.recording import read_recording
+from src.bot.routing import MenuHandler
+from src.bot.handlers.common_handlers import build_application, post_init, post_shutdown
+
+BOT_USER = {'id': 123, 'is_bot': True, 'first_name': 'Replay', 'username': 'replay_bot'}
+
+
+class StubRequest(BaseRequest):
+    """Bot API без сети: отвечает правдоподобными объектами и считает вызовы"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = defaultdict(int)
+        self.pending_updates = []
+        self._message_id = 0
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit('/', 1)[-1]
+        self.calls[api_method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        parameters = request_data.parameters if request_data else {}
+        if api_method == 'getMe':
+            result = BOT_USER
+        elif api_method == 'getUpdates':
+            # Долгий опрос: отдаем накопленные обновления или недолго ждем
+            result, self.pending_updates = self.pending_updates, []
+            if not result:
+                await asyncio.sleep(0.05)
+        elif api_method.startswith(('send', 'edit', 'copy', 'forward')):
+            self._message_id += 1
+            chat_id = parameters.get('chat_id', 0)
+            result = {
+                'message_id': parameters.get('message_id', self._message_id),
+                'date': int(time.time()),
+                'chat': {'id': chat_id if isinstance(chat_id, int) else 0, 'type': 'private'},
+                'from': BOT_USER,
+                'text': parameters.get('text', ''),
+            }
+            if api_method == 'sendPhoto':
+                result['photo'] = [{'file_id': 'replay', 'file_unique_id': 'replay', 'width': 1, 'height': 1}]
+        else:
+            result = True
+        return 200, json.dumps({'ok': True, 'result': result}).encode('utf-8')
+
+
+class HandlerTimings:
+    """Время выполнения и ошибки каждого обработчика по имени его функции"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def timed(self, callback):
+        name = callback.__name__
+        samples = self.samples[name]
+
+        async def timed(update, context):
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            except ApplicationHandlerStop:
+                raise
+            except Exception:
+                # Application перехватывает исключения обработчиков сам, поэтому считаем их здесь
+                self.errors[name] += 1
+                raise
+            finally:
+                samples.append(time.perf_counter() - started)
+
+        return timed
+
+    def instrument(self, handlers):
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler):
+                self.instrument(handler.entry_points)
+                for state_handlers in handler.states.values():
+                    self.instrument(state_handlers)
+                self.instrument(handler.fallbacks)
+            elif isinstance(handler, MenuHandler):
+                # Кнопки меню делят один обработчик: время считается по каждой кнопке отдельно
+                for button, callback in handler.routes.items():
+                    handler.routes[button] = self.timed(callback)
+            else:
+                handler.callback = self.timed(handler.callback)
+
+
+def percentile(values: list, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def load_records(paths: list) -> list:
+    records = list(read_recording(paths))
+    records.sort(key=lambda record: record['ts'])
+    return records
+
+
+def make_tenants(records: list, database: str, scratch_dir: str) -> list:
+    """Психологи из записи; админами становятся пользователи, записанные как админ"""
+    admins = defaultdict(set)
+    for record in records:
+        admins.setdefault(record['tenant'], set())
+        if record['admin']:
+            update = record['update']
+            sender = (update.get('message') or update.get('callback_query') or {}).get('from')
+            if sender:
+                admins[record['tenant']].add(sender['id'])
+
+    tenants = []
+    for index, (name, admin_ids) in enumerate(sorted(admins.items())):
+        tenants.append(Tenant(name, _normalize_overrides(name, {
+            'BOT_TOKEN': f'{1000 + index}:replay',
+            'ADMIN_IDS': sorted(admin_ids) or [1],
+            'DATABASE_URL': database or f'sqlite:///{os.path.join(scratch_dir, name)}.db',
+            'PERSISTENCE_FILE': '',
+            'ADMIN_DIGEST_ENABLED': False,
+        })))
+    return tenants
+
+
+async def replay(records: list, tenants: list, speed: float, latency: float) -> dict:
+    request = StubRequest(latency)
+    timings = HandlerTimings()
+    settings.TENANTS = tenants
+
+    applications = {}
+    scheduler = None
+    for tenant in tenants:
+        application = build_application(tenant, scheduler, bot_request=request)
+        scheduler = scheduler or application.scheduler
+        for handlers in application.handlers.values():
+            timings.instrument(handlers)
+        await application.initialize()
+        await post_init(application)
+        await application.start()
+        applications[tenant.name] = application
+
+    lags = []
+    first_ts = records[0]['ts']
+    started = time.perf_counter()
+    for record in records:
+        if speed:
+            due = started + (record['ts'] - first_ts) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lags.append(max(0.0, time.perf_counter() - due))
+
+        application = applications[record['tenant']]
+        await application.process_update(Update.de_json(record['update'], application.bot))
+    elapsed = time.perf_counter() - started
+
+    for application in applications.values():
+        with use_tenant(application.tenant):
+            await application.stop()
+            await application.shutdown()
+            await post_shutdown(application)
+
+    return {
+        'updates': len(records),
+        'elapsed': elapsed,
+        'lags': lags,
+        'timings': timings.samples,
+        'errors': timings.errors,
+        'api_calls': request.calls,
+    }
+
+
+def print_report(result: dict):
+    print(f"{'обработчик':<36} {'вызовов':>8} {'ошибок':>7} {'p50, мс':>9} {'p95, мс':>9} {'макс, мс':>9}")
+    for name, samples in sorted(result['timings'].items(), key=lambda item: -sum(item[1])):
+        if not samples:
+            continue
+        print(f"{name:<36} {len(samples):>8} {result['errors'][name]:>7} {percentile(samples, 0.5) * 1000:>9.2f} "
+              f"{percentile(samples, 0.95) * 1000:>9.2f} {max(samples) * 1000:>9.2f}")
+
+    print()
+    print(f"Обновлений: {result['updates']}, ошибок в обработчиках: {sum(result['errors'].values())}, "
+          f"за {result['elapsed']:.2f} с ({result['updates'] / max(result['elapsed'], 1e-9):.1f} обновлений/с)")
+    if result['lags']:
+        print(f"Отставание от записи: p95 {percentile(result['lags'], 0.95) * 1000:.1f} мс, "
+              f"макс {max(result['lags']) * 1000:.1f} мс")
+    print("Вызовы Bot API: " + ', '.join(f"{method} {count}" for method, count in sorted(result['api_calls'].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Воспроизведение записанных обновлений')
+    parser.add_argument('recordings', nargs='+', help='файлы записи, ротации в любом порядке')
+    parser.add_argument('--speed', type=float, default=1.0, help='ускорение относительно записи, 0 - без пауз')
+    parser.add_argument('--api-latency', type=float, default=0.0, help='задержка ответа заглушки Bot API, мс')
+    parser.add_argument('--database', default='', help='общая база вместо временных sqlite, например memory://')
+    args = parser.parse_args()
+
+    records = load_records(args.recordings)
+    if not records:
+        print("В записи нет обновлений")
+        return
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        tenants = make_tenants(records, args.database, scratch_dir)
+        result = asyncio.run(replay(records, tenants, args.speed, args.api_latency / 1000))
+    print_report(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Пересчет сводок аналитики по исходным данным, включая архив.
+
+По истории сводки заполняет миграция при обновлении базы; скрипт нужен,
+чтобы исправить их после сбоев или ручных правок базы:
+    python rebuild_stats.py                      # вся история
+    python rebuild_stats.py --from 2025-01-01    # начиная с дня
+    python rebuild_stats.py --tenant anna        # только один психолог из TENANTS_FILE
+Лучше запускать при остановленном боте: записи, сделанные во время пересчета,
+могут быть учтены дважды до следующего пересчета их дня.
+"""
+
+import argparse
+import logging
+from src.config.settings import settings
+from src.config.tenants import DEFAULT_TENANT, load_tenants, use_tenant
+from src.database.core import init_database
+from src.database.analytics_repository import rebuild_stats
+
+
+def main():
+    """Пересчитывает сводки всех или одного психолога"""
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    logger = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(description="Пересчет сводок аналитики")
+    parser.add_argument('--from', dest='start_day', help="первый день ГГГГ-ММ-ДД (по умолчанию вся история)")
+    parser.add_argument('--to', dest='end_day', help="день ГГГГ-ММ-ДД, до которого пересчитывать (не включая)")
+    parser.add_argument('--tenant', help="имя психолога из TENANTS_FILE")
+    args = parser.parse_args()
+
+    tenants = load_tenants(settings.TENANTS_FILE) if settings.TENANTS_FILE else [DEFAULT_TENANT]
+    if args.tenant:
+        tenants = [tenant for tenant in tenants if tenant.name == args.tenant]
+        if not tenants:
+            raise SystemExit(f"Психолог {args.tenant} не найден в {settings.TENANTS_FILE}")
+
+    failed = False
+    for tenant in tenants:
+        with use_tenant(tenant):
+            init_database()
+            days = rebuild_stats(args.start_day, args.end_day)
+        if days is None:
+            logger.error(f"Не удалось пересчитать сводки психолога {tenant.name}")
+            failed = True
+        else:
+            logger.info(f"Сводки психолога {tenant.name} пересчитаны: дней с данными {days}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import logging
+from telegram import Update
+from telegram.ext import Application
+from src.config.tenants import DEFAULT_TENANT, use_tenant
+from src.utils.tracing import tracer
+from src.config.settings import settings
+from src.bot.recording import recorder
+from src.bot.watchdog import loop_watchdog
+
+
+def _describe_update(update: object) -> dict:
+    """Атрибуты корневого отрезка без содержимого сообщений"""
+    if not isinstance(update, Update):
+        return {'kind': type(update).__name__}
+
+    attributes = {'update_id': update.update_id}
+    if update.effective_user:
+        attributes['user_id'] = update.effective_user.id
+    if update.callback_query:
+        attributes['kind'] = 'callback_query'
+    elif update.message and update.message.document:
+        attributes['kind'] = 'document'
+    elif update.message and update.message.text and update.message.text.startswith('/'):
+        attributes['kind'] = 'command'
+        attributes['command'] = update.message.text.split()[0]
+    elif update.message:
+        attributes['kind'] = 'message'
+    return attributes
+
+
+class TracedApplication(Application):
+    """Application психолога tenant, открывающий трассу на каждое входящее обновление.
+
+    Обновления обрабатываются в контексте своего психолога. Перед штатной
+    остановкой вызывает before_stop: пока цикл событий еще обслуживает
+    обновления, фоновые сервисы успевают дослать начатое.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tenant = DEFAULT_TENANT
+        self.background_bot = None
+        self.scheduler = None
+        self.before_stop = []
+
+    async def stop(self) -> None:
+        with use_tenant(self.tenant):
+            for callback in self.before_stop:
+                try:
+                    await callback(self)
+                except Exception as e:
+                    logging.getLogger(__name__).error(f"Ошибка при остановке: {e}")
+        await super().stop()
+
+    async def process_update(self, update: object) -> None:
+        if recorder.enabled and isinstance(update, Update):
+            with use_tenant(self.tenant):
+                is_admin = bool(update.effective_user) and settings.is_admin(update.effective_user.id)
+            recorder.record(update, self.tenant.name, is_admin)
+        with use_tenant(self.tenant), loop_watchdog.watch_update(update, self.tenant.name), tracer.span(
+            'update', root=True, tenant=self.tenant.name, **_describe_update(update)
+        ):
+            await super().process_update(update)
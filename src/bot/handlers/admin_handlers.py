@@ -1,23 +1,38 @@
-from telegram import Update
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes, ConversationHandler
+from telegram.helpers import escape_markdown
 from src.config.settings import settings
-from src.bot.keyboards.layouts import get_main_menu_keyboard, get_cancel_keyboard
+from src.config.tenants import current_tenant
+from src.bot.keyboards.layouts import get_main_menu_keyboard, get_cancel_keyboard, get_month_calendar_keyboard
 from src.utils.validators import is_valid_datetime, is_future_datetime
+from src.utils.intervals import normalize_slot
 from src.utils.formatters import format_datetime
 from src.database.schedule_repository import (
     get_available_slots_for_deletion, 
     delete_available_slot,
     add_slot_to_schedule,
-    get_future_slots,
-    get_all_slots
+    get_free_windows,
+    get_day_slots
 )
-from src.database.appointment_repository import (
-    get_appointments_for_admin,
-    get_past_appointments_for_admin
-)
-from datetime import datetime
+from src.database.appointment_repository import get_past_appointments_for_admin, get_appointments_between
+from src.services.admin_dashboard import admin_dashboard
+from src.services.slot_calendar import slot_calendar
+from src.services.analytics_service import analytics_service, REPORT_WEEKS
+from src.services.backup_service import backup_service
+from src.database.backup_repository import is_backup_supported
+from src.utils.tracing import tracer, format_trace
+from src.bot.request import pool_stats
+from src.bot.watchdog import loop_watchdog
+from src.services.calendar_feed import calendar_feed
+from src.services.slot_import_service import import_slots_from_file
+from src.services.export_service import export_appointments, is_xlsx_available, EXPORT_FORMATS
+from datetime import datetime, timedelta
+import asyncio
+import os
+import tempfile
 
-ADDING_SLOT, DELETING_SLOT = 1, 2
+ADDING_SLOT, DELETING_SLOT, IMPORTING_SLOTS = 1, 2, 3
 
 
 async def admin_add_slot_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -63,22 +78,55 @@ async def admin_add_slot_input(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return ADDING_SLOT
     
-    success = add_slot_to_schedule(user_input)
+    # 2027-1-5 9:00 -> 2027-01-05 09:00: строки слотов сравниваются как время
+    slot_datetime = normalize_slot(user_input)
+    success = add_slot_to_schedule(slot_datetime)
     
     if success:
         await update.message.reply_text(
-            f"✅ Слот на {user_input} успешно добавлен в расписание!",
+            f"✅ Слот на {slot_datetime} успешно добавлен в расписание!",
             reply_markup=get_main_menu_keyboard(is_admin=True)
         )
     else:
         await update.message.reply_text(
-            f"❌ Слот на {user_input} уже существует!",
+            f"❌ Слот на {slot_datetime} уже существует или пересекается с другим слотом!\n\n"
+            + _format_free_windows(slot_datetime[:10]),
             reply_markup=get_main_menu_keyboard(is_admin=True)
         )
     
     return ConversationHandler.END
 
 
+def _format_free_windows(day: str) -> str:
+    """Свободные промежутки рабочего дня, куда поместится консультация"""
+    windows = get_free_windows(f"{day} {settings.WORKDAY_START}", f"{day} {settings.WORKDAY_END}")
+    date_label = datetime.strptime(day, '%Y-%m-%d').strftime('%d.%m.%Y')
+    if not windows:
+        return f"🕳 {date_label} свободного времени нет."
+    return f"🕳 Свободно {date_label}: " + ", ".join(
+        f"{window_start[-5:]}–{window_end[-5:]}" for window_start, window_end in windows
+    )
+
+
+async def admin_show_free_windows(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает свободные промежутки рабочего дня: /free [ГГГГ-ММ-ДД]"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    day = context.args[0] if context.args else datetime.now().strftime('%Y-%m-%d')
+    try:
+        day = datetime.strptime(day, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        await update.message.reply_text("❌ Используйте формат: /free ГГГГ-ММ-ДД")
+        return
+    
+    await update.message.reply_text(
+        _format_free_windows(day),
+        reply_markup=get_main_menu_keyboard(is_admin=True)
+    )
+
+
 async def admin_delete_slot_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало процесса удаления слотов"""
     if not settings.is_admin(update.effective_user.id):
@@ -150,87 +198,199 @@ async def admin_delete_slot_choice(update: Update, context: ContextTypes.DEFAULT
     return ConversationHandler.END
 
 
-async def admin_show_appointments(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показывает будущие записи для администратора"""
+async def admin_import_slots_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Начало массового импорта слотов из файла"""
     if not settings.is_admin(update.effective_user.id):
         await update.message.reply_text("⛔ У вас нет прав для этой команды.")
-        return
+        return ConversationHandler.END
     
-    appointments = get_appointments_for_admin()
+    await update.message.reply_text(
+        "📥 Отправьте файл **CSV** или **ICS** со слотами.\n\n"
+        "CSV: в каждой строке дата и время в формате `ГГГГ-ММ-ДД ЧЧ:ММ` "
+        "(или дата и время в двух колонках).\n"
+        "ICS: каждое событие календаря станет слотом.",
+        parse_mode='Markdown',
+        reply_markup=get_cancel_keyboard()
+    )
+    return IMPORTING_SLOTS
+
+
+async def admin_import_slots_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработка загруженного файла со слотами"""
+    document = update.message.document
+    file_name = (document.file_name or '').lower()
     
-    if not appointments:
-        message = "📋 **Ближайшие записи**\n\nНа данный момент нет предстоящих записей."
+    if file_name.endswith('.ics'):
+        file_kind = 'ics'
+    elif file_name.endswith('.csv') or file_name.endswith('.txt'):
+        file_kind = 'csv'
     else:
-        current_time = datetime.now()
-        message = "📋 **Ближайшие записи:**\n\n"
-        
-        for appointment in appointments:
-            formatted_date = format_datetime(appointment['datetime'])
-            appointment_dt = datetime.strptime(appointment['datetime'], '%Y-%m-%d %H:%M')
-            status = "🟢 Предстоящая" if appointment_dt > current_time else "🔴 Прошедшая"
-            
-            message += (
-                f"👤 **{appointment['client_name']}**\n"
-                f"📅 {formatted_date}\n"
-                f"📞 {appointment['client_contact']}\n"
-                f"📝 {appointment['client_request']}\n"
-                f"🎯 {'🆕 Первичная' if appointment.get('consultation_type') == 'primary' else '🔄 Повторная'}\n"
-                f"🔄 {status}\n"
-                f"――――――――――――――――――――\n"
-            )
-        
-        message += f"\n📊 **Всего записей:** {len(appointments)}"
+        await update.message.reply_text(
+            "❌ Поддерживаются только файлы .csv и .ics",
+            reply_markup=get_cancel_keyboard()
+        )
+        return IMPORTING_SLOTS
+    
+    await update.message.reply_text("⏳ Импортирую слоты...")
+    
+    fd, path = tempfile.mkstemp(prefix='slots_import_', suffix=f'.{file_kind}')
+    os.close(fd)
+    try:
+        telegram_file = await document.get_file()
+        await telegram_file.download_to_drive(path)
+        report = await asyncio.to_thread(import_slots_from_file, path, file_kind)
+    except Exception:
+        await update.message.reply_text(
+            "❌ Не удалось обработать файл.",
+            reply_markup=get_main_menu_keyboard(is_admin=True)
+        )
+        return ConversationHandler.END
+    finally:
+        os.remove(path)
+    
+    message = (
+        "📥 **Импорт завершен**\n\n"
+        f"✅ Добавлено: {report['inserted']}\n"
+        f"⏭ Пропущено (уже есть): {report['skipped']}\n"
+        f"⛔ Пересекаются с другими слотами: {report['conflicts']}\n"
+        f"❌ С ошибкой: {report['invalid']}"
+    )
+    if report['invalid_examples']:
+        message += "\n\nПримеры строк с ошибкой (прошедшая дата или неверный формат):\n" + "\n".join(
+            f"• {escape_markdown(example)}" for example in report['invalid_examples']
+        )
     
     await update.message.reply_text(
         message,
         parse_mode='Markdown',
         reply_markup=get_main_menu_keyboard(is_admin=True)
     )
+    return ConversationHandler.END
 
 
-async def admin_show_my_slots(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показывает слоты администратора"""
+async def admin_import_slots_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Текст вместо файла во время импорта"""
+    if update.message.text.strip() == '❌ Отмена':
+        await update.message.reply_text(
+            "❌ Импорт отменен.",
+            reply_markup=get_main_menu_keyboard(is_admin=True)
+        )
+        return ConversationHandler.END
+    
+    await update.message.reply_text(
+        "📎 Пожалуйста, отправьте файл .csv или .ics",
+        reply_markup=get_cancel_keyboard()
+    )
+    return IMPORTING_SLOTS
+
+
+async def admin_show_appointments(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает будущие записи для администратора"""
     if not settings.is_admin(update.effective_user.id):
         await update.message.reply_text("⛔ У вас нет прав для этой команды.")
         return
     
-    future_slots = get_future_slots()
+    message = admin_dashboard.render_appointments()
     
-    if not future_slots:
-        message = "👀 **Мои слоты**\n\nНа данный момент нет активных слотов."
+    await update.message.reply_text(
+        message,
+        parse_mode='Markdown',
+        reply_markup=get_main_menu_keyboard(is_admin=True)
+    )
+
+
+def _render_month(month: str):
+    """Текст и клавиатура календаря слотов на месяц"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    days = slot_calendar.get_month(month)
+    free = sum(counts['free'] for day, counts in days.items() if day >= today)
+    booked = sum(counts['booked'] for day, counts in days.items() if day >= today)
+    message = (
+        "👀 **Мои слоты**\n\n"
+        "🟢 есть свободные  🟡 частично заняты  🔴 все заняты\n"
+        f"📊 **Впереди в этом месяце:** {free} свободных, {booked} занятых\n\n"
+        "Нажмите на день, чтобы увидеть его слоты."
+    )
+    return message, get_month_calendar_keyboard(month, days, today)
+
+
+def _render_day(day: str):
+    """Текст и клавиатура слотов одного дня"""
+    slots = get_day_slots(day)
+    next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    appointments = {
+        appointment['slot_id']: appointment
+        for appointment in get_appointments_between(f"{day} 00:00", f"{next_day} 00:00")
+    }
+    date_label = datetime.strptime(day, '%Y-%m-%d').strftime('%d.%m.%Y')
+    if not slots:
+        message = f"📅 **{date_label}**\n\nСлотов нет."
     else:
-        free_slots = []
-        booked_slots = []
-        
-        for slot in future_slots:
-            formatted_date = format_datetime(slot['datetime'])
-            if slot['is_booked']:
-                booked_slots.append(f"• {formatted_date} 🔴 (Занят)")
+        lines = []
+        for slot in slots:
+            appointment = appointments.get(slot['id'])
+            if appointment:
+                lines.append(f"🔴 {slot['datetime'][-5:]} — {appointment['client_name']}")
+            elif slot['is_booked']:
+                lines.append(f"🔴 {slot['datetime'][-5:]} (Занят)")
             else:
-                free_slots.append(f"• {formatted_date} 🟢 (Свободен)")
-        
-        message = "👀 **Мои активные слоты:**\n\n"
-        if free_slots:
-            message += "🟢 **Свободные слоты:**\n" + "\n".join(free_slots) + "\n\n"
-        if booked_slots:
-            message += "🔴 **Занятые слоты:**\n" + "\n".join(booked_slots)
-        
-        message += f"\n📊 **Итого:** {len(free_slots)} свободных, {len(booked_slots)} занятых"
-        
-        all_slots = get_all_slots()
-        current_time = datetime.now()
-        past_slots = [slot for slot in all_slots if datetime.strptime(slot['datetime'], '%Y-%m-%d %H:%M') < current_time]
-        
-        if past_slots:
-            message += f"\n\n📚 **В архиве:** {len(past_slots)} прошедших слотов"
+                lines.append(f"🟢 {slot['datetime'][-5:]} (Свободен)")
+        message = f"📅 **{date_label}**\n\n" + "\n".join(lines)
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton('⬅️ К месяцу', callback_data=f'cal_month_{day[:7]}')]])
+    return message, keyboard
+
+
+async def _edit_calendar_message(query, message: str, keyboard):
+    try:
+        await query.edit_message_text(message, parse_mode='Markdown', reply_markup=keyboard)
+    except BadRequest as e:
+        # Повторное нажатие на ту же кнопку не меняет сообщение
+        if 'not modified' not in str(e).lower():
+            raise
+
+
+async def admin_show_my_slots(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает календарь слотов администратора на текущий месяц"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    message, keyboard = _render_month(datetime.now().strftime('%Y-%m'))
     
     await update.message.reply_text(
         message,
         parse_mode='Markdown',
-        reply_markup=get_main_menu_keyboard(is_admin=True)
+        reply_markup=keyboard
     )
 
 
+async def admin_calendar_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Навигация по календарю слотов: смена месяца, слоты дня, полный список"""
+    query = update.callback_query
+    if not settings.is_admin(update.effective_user.id):
+        await query.answer("⛔ У вас нет прав для этой команды.")
+        return
+    await query.answer()
+    
+    callback_data = query.data
+    try:
+        if callback_data.startswith('cal_month_'):
+            month = callback_data[len('cal_month_'):]
+            datetime.strptime(month, '%Y-%m')
+            await _edit_calendar_message(query, *_render_month(month))
+        elif callback_data.startswith('cal_day_'):
+            day = callback_data[len('cal_day_'):]
+            datetime.strptime(day, '%Y-%m-%d')
+            await _edit_calendar_message(query, *_render_day(day))
+        elif callback_data == 'cal_list':
+            keyboard = InlineKeyboardMarkup([[
+                InlineKeyboardButton('⬅️ К календарю', callback_data=f"cal_month_{datetime.now().strftime('%Y-%m')}")
+            ]])
+            await _edit_calendar_message(query, admin_dashboard.render_slots(), keyboard)
+    except ValueError:
+        return
+
+
 async def admin_show_archive(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает архивные записи"""
     if not settings.is_admin(update.effective_user.id):
@@ -262,6 +422,199 @@ async def admin_show_archive(update: Update, context: ContextTypes.DEFAULT_TYPE)
     )
 
 
+async def admin_export_appointments(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Выгрузка записей в файл: /export [с ГГГГ-ММ-ДД] [по ГГГГ-ММ-ДД] [csv|xlsx]"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    export_format = 'csv'
+    dates = []
+    for arg in context.args or []:
+        if arg.lower() in EXPORT_FORMATS:
+            export_format = arg.lower()
+            continue
+        try:
+            dates.append(datetime.strptime(arg, '%Y-%m-%d'))
+        except ValueError:
+            await update.message.reply_text(
+                "❌ Неверный формат!\n"
+                "Используйте: `/export [ГГГГ-ММ-ДД] [ГГГГ-ММ-ДД] [csv|xlsx]`",
+                parse_mode='Markdown'
+            )
+            return
+    
+    if len(dates) > 2 or (len(dates) == 2 and dates[0] > dates[1]):
+        await update.message.reply_text("❌ Укажите не больше двух дат: начало и конец периода.")
+        return
+    
+    if export_format == 'xlsx' and not is_xlsx_available():
+        await update.message.reply_text("❌ Для выгрузки в XLSX установите пакет openpyxl. Используйте CSV.")
+        return
+    
+    start_datetime = dates[0].strftime('%Y-%m-%d 00:00') if dates else None
+    end_datetime = (dates[-1] + timedelta(days=1)).strftime('%Y-%m-%d 00:00') if len(dates) == 2 else None
+    
+    path, count = await asyncio.to_thread(export_appointments, export_format, start_datetime, end_datetime)
+    
+    try:
+        if not count:
+            await update.message.reply_text(
+                "📤 За выбранный период записей нет.",
+                reply_markup=get_main_menu_keyboard(is_admin=True)
+            )
+            return
+        
+        period = ""
+        if dates:
+            period = f"_{dates[0].strftime('%Y%m%d')}"
+            if len(dates) == 2:
+                period += f"-{dates[1].strftime('%Y%m%d')}"
+        
+        with open(path, 'rb') as export_file:
+            await update.message.reply_document(
+                document=export_file,
+                filename=f"appointments{period}.{export_format}",
+                caption=f"📤 Выгружено записей: {count}",
+                reply_markup=get_main_menu_keyboard(is_admin=True)
+            )
+    finally:
+        os.remove(path)
+
+
+async def admin_send_calendar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отправляет файл календаря (.ics) с предстоящими записями"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    body, _, _ = calendar_feed.get_feed()
+    await update.message.reply_document(
+        document=body,
+        filename="sessions.ics",
+        caption="🗓 Календарь предстоящих консультаций",
+        reply_markup=get_main_menu_keyboard(is_admin=True)
+    )
+
+
+async def admin_show_slow_traces(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает разбивку самых медленных обновлений с момента запуска"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    if not tracer.enabled:
+        await update.message.reply_text("ℹ️ Трассировка выключена (TRACING_ENABLED).")
+        return
+    
+    traces = tracer.get_slowest()[:5]
+    if not traces:
+        await update.message.reply_text("🐢 Медленных обновлений пока нет.")
+        return
+    
+    message = "🐢 Самые медленные обновления:\n"
+    for trace in traces:
+        attributes = trace.root.attributes
+        message += (
+            f"\n{trace.duration_ms:.0f} мс · {attributes.get('command') or attributes.get('kind', trace.name)}"
+            f" · {trace.trace_id[:8]}\n{format_trace(trace)}\n"
+        )
+    await update.message.reply_text(message[:4000])
+
+
+async def admin_show_pools(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает загрузку пулов соединений с Bot API"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    # Общие пулы и собственные пулы текущего психолога; чужие пулы не показываются
+    tenant = current_tenant().name
+    message = "🔌 Пулы соединений:\n"
+    for stats in pool_stats.values():
+        if stats.tenant not in (None, tenant):
+            continue
+        pool = stats.snapshot()
+        scope = 'свой' if pool['tenant'] else 'общий'
+        message += (
+            f"\n{pool['name']}, {scope} ({pool['size']} соед.): занято {pool['in_use']}, в очереди {pool['waiting']}\n"
+            f"запросов {pool['requests']}, ждали {pool['waited']}, таймаутов {pool['timeouts']}\n"
+            f"ожидание: среднее {pool['avg_wait_ms']:.1f} мс, максимум {pool['max_wait_ms']:.1f} мс\n"
+        )
+    await update.message.reply_text(message)
+
+
+async def admin_show_loop_lag(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает задержку цикла событий и места, где он блокировался"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    if not loop_watchdog.running:
+        await update.message.reply_text("ℹ️ Сторож цикла событий выключен (LOOP_WATCHDOG_ENABLED).")
+        return
+    
+    lag = loop_watchdog.percentiles()
+    message = (
+        f"⏱ Задержка цикла событий ({lag['samples']} замеров):\n"
+        f"p50 {lag['p50']:.1f} мс, p95 {lag['p95']:.1f} мс, p99 {lag['p99']:.1f} мс, максимум {lag['max']:.1f} мс\n"
+    )
+    offenders = loop_watchdog.get_offenders()
+    if offenders:
+        message += f"\n🧱 Блокировки дольше {loop_watchdog.threshold * 1000:.0f} мс:\n"
+        for key, count, max_ms in offenders:
+            message += f"{count} раз, до {max_ms:.0f} мс · {key}\n"
+    else:
+        message += "\n✅ Блокировок не было."
+    await update.message.reply_text(message[:4000])
+
+
+async def admin_show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает аналитику практики по недельным сводкам: /stats [недель]"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    weeks = REPORT_WEEKS
+    if context.args:
+        try:
+            weeks = max(1, min(int(context.args[0]), 104))
+        except ValueError:
+            await update.message.reply_text("❌ Используйте формат: /stats [количество недель]")
+            return
+    
+    await update.message.reply_text(
+        analytics_service.build_report(weeks),
+        parse_mode='Markdown',
+        reply_markup=get_main_menu_keyboard(is_admin=True)
+    )
+
+
+async def admin_create_backup(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Делает резервную копию базы по команде /backup, не останавливая запись клиентов"""
+    if not settings.is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ У вас нет прав для этой команды.")
+        return
+    
+    if not is_backup_supported():
+        await update.message.reply_text("ℹ️ База хранится в памяти, резервное копирование недоступно.")
+        return
+    
+    await update.message.reply_text("💾 Создаю резервную копию базы...")
+    stats = await backup_service.run()
+    if stats is None:
+        await update.message.reply_text(
+            "❌ Не удалось создать резервную копию: копирование уже идет или произошла ошибка (подробности в логе)."
+        )
+        return
+    
+    await update.message.reply_text(
+        backup_service.format_report(stats),
+        parse_mode='Markdown',
+        reply_markup=get_main_menu_keyboard(is_admin=True)
+    )
+
+
 async def admin_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Отмена диалога"""
     await update.message.reply_text(
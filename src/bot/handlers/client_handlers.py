@@ -1,11 +1,20 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, MessageHandler, filters, ConversationHandler, CallbackQueryHandler
 from src.config.settings import settings
+from src.config.tenants import TenantLocal, use_tenant
 from src.bot.keyboards.layouts import get_main_menu_keyboard, get_cancel_keyboard
 from src.database.schedule_repository import get_available_slots
-from src.database.appointment_repository import book_appointment
+from src.database.appointment_repository import (
+    book_appointment,
+    get_client_appointments,
+    cancel_appointment,
+    reschedule_appointment
+)
+from src.database.waitlist_repository import join_waitlist
 from src.utils.formatters import format_datetime
 from src.services.working_reminder_service import working_reminder_service
+from src.utils.slot_holds import SlotHolds
+from datetime import datetime, timedelta
 
 # Состояния для ConversationHandler
 (
@@ -15,44 +24,102 @@ from src.services.working_reminder_service import working_reminder_service
     TYPING_REQUEST
 ) = range(7)
 
+# Выбранный слот закрепляется за клиентом, пока он заполняет анкету
+slot_holds = TenantLocal(lambda: SlotHolds(ttl=settings.SLOT_HOLD_MINUTES * 60), key='slot_holds')
+
+
+def _get_slots_keyboard(available_slots):
+    """Кнопки выбора слота для записи"""
+    keyboard = []
+    for slot in available_slots:
+        formatted_date = format_datetime(slot['datetime'])
+        button = InlineKeyboardButton(formatted_date, callback_data=f"book_slot_{slot['id']}")
+        keyboard.append([button])
+    
+    keyboard.append([InlineKeyboardButton("❌ Отмена", callback_data="cancel_booking")])
+    return InlineKeyboardMarkup(keyboard)
+
 
 async def client_start_booking(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало процесса записи для клиента"""
-    available_slots = get_available_slots()
+    user_id = update.effective_user.id
+    slot_holds.release(user_id)
+    available_slots = slot_holds.visible_to(get_available_slots(), user_id)
     
     if not available_slots:
         await update.message.reply_text(
-            "😔 На данный момент нет свободных слотов для записи.",
-            reply_markup=get_main_menu_keyboard(is_admin=False)
+            "😔 На данный момент нет свободных слотов для записи.\n\n"
+            "🔔 Хотите, мы сообщим, когда появится свободное время?",
+            reply_markup=_get_waitlist_keyboard()
         )
         return ConversationHandler.END
     
     context.user_data['available_slots'] = available_slots
     
-    keyboard = []
-    for slot in available_slots:
-        formatted_date = format_datetime(slot['datetime'])
-        button = InlineKeyboardButton(formatted_date, callback_data=f"book_slot_{slot['id']}")
-        keyboard.append([button])
-    
-    keyboard.append([InlineKeyboardButton("❌ Отмена", callback_data="cancel_booking")])
-    
     await update.message.reply_text(
         "📅 **Выберите удобное время для консультации:**",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=_get_slots_keyboard(available_slots),
         parse_mode='Markdown'
     )
     return CHOOSING_SLOT
 
 
+def _get_waitlist_keyboard():
+    """Кнопки записи в лист ожидания: любой день или конкретный день недели вперед"""
+    today = datetime.now()
+    days = [today + timedelta(days=offset) for offset in range(7)]
+    
+    keyboard = [[InlineKeyboardButton("📅 Любой день", callback_data="waitlist_any")]]
+    for week_row in (days[:4], days[4:]):
+        keyboard.append([
+            InlineKeyboardButton(day.strftime('%d.%m'), callback_data=f"waitlist_day_{day.strftime('%Y-%m-%d')}")
+            for day in week_row
+        ])
+    keyboard.append([InlineKeyboardButton("✖️ Не нужно", callback_data="waitlist_close")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def client_join_waitlist(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Запись клиента в лист ожидания"""
+    query = update.callback_query
+    await query.answer()
+    
+    callback_data = query.data
+    
+    if callback_data == "waitlist_close":
+        await query.edit_message_text("😔 На данный момент нет свободных слотов для записи.")
+        return
+    
+    preferred_date = ""
+    if callback_data.startswith("waitlist_day_"):
+        preferred_date = callback_data.replace("waitlist_day_", "")
+    
+    success = join_waitlist(
+        client_chat_id=update.effective_user.id,
+        client_name=update.effective_user.full_name,
+        preferred_date=preferred_date
+    )
+    
+    if not success:
+        await query.edit_message_text("❌ Не удалось записаться в лист ожидания. Попробуйте позже.")
+    elif preferred_date:
+        day = datetime.strptime(preferred_date, '%Y-%m-%d').strftime('%d.%m.%Y')
+        await query.edit_message_text(f"🔔 Мы сообщим вам, когда появится свободное время на {day}.")
+    else:
+        await query.edit_message_text("🔔 Мы сообщим вам, когда появится свободное время.")
+
+
 async def client_choose_slot(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка выбора слота клиентом"""
     query = update.callback_query
     await query.answer()
     
     callback_data = query.data
+    user_id = update.effective_user.id
 
     if callback_data == "cancel_booking":
+        slot_holds.release(user_id)
+        context.user_data.clear()
         await query.edit_message_text("❌ Запись отменена.")
         return ConversationHandler.END
     
@@ -60,11 +127,27 @@ async def client_choose_slot(update: Update, context: ContextTypes.DEFAULT_TYPE)
         slot_id = int(callback_data.replace("book_slot_", ""))
         
         selected_slot = None
-        for slot in context.user_data['available_slots']:
+        for slot in context.user_data.get('available_slots', []):
             if slot['id'] == slot_id:
                 selected_slot = slot
                 break
         
+        if selected_slot and not slot_holds.hold(slot_id, user_id):
+            available_slots = slot_holds.visible_to(get_available_slots(), user_id)
+            if not available_slots:
+                context.user_data.clear()
+                await query.edit_message_text("😔 Это время только что выбрал другой клиент, свободных слотов больше нет.")
+                return ConversationHandler.END
+            
+            context.user_data['available_slots'] = available_slots
+            await query.edit_message_text(
+                "😔 Это время только что выбрал другой клиент.\n\n"
+                "📅 **Выберите другое время:**",
+                reply_markup=_get_slots_keyboard(available_slots),
+                parse_mode='Markdown'
+            )
+            return CHOOSING_SLOT
+        
         if selected_slot:
             context.user_data['selected_slot'] = selected_slot
             
@@ -75,7 +158,8 @@ async def client_choose_slot(update: Update, context: ContextTypes.DEFAULT_TYPE)
             ]
             
             await query.edit_message_text(
-                f"✅ Вы выбрали время: **{format_datetime(selected_slot['datetime'])}**\n\n"
+                f"✅ Вы выбрали время: **{format_datetime(selected_slot['datetime'])}**\n"
+                f"⏳ Оно закреплено за вами на {settings.SLOT_HOLD_MINUTES} мин., пока вы заполняете анкету.\n\n"
                 "📋 **Выберите тип консультации:**",
                 reply_markup=InlineKeyboardMarkup(keyboard),
                 parse_mode='Markdown'
@@ -91,6 +175,13 @@ async def client_choose_consultation_type(update: Update, context: ContextTypes.
     query = update.callback_query
     await query.answer()
     
+    if query.data == "cancel_booking":
+        slot_holds.release(update.effective_user.id)
+        context.user_data.clear()
+        await query.edit_message_text("❌ Запись отменена.")
+        return ConversationHandler.END
+    
+    slot_holds.extend(update.effective_user.id)
     consultation_type = query.data.replace("consult_type_", "")
     context.user_data['consultation_type'] = consultation_type
     
@@ -120,6 +211,8 @@ async def client_input_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await client_cancel_booking(update, context)
         return ConversationHandler.END
     
+    slot_holds.extend(update.effective_user.id)
+    
     if len(user_input) < 2:
         await update.message.reply_text(
             "❌ Имя слишком короткое. Пожалуйста, введите ваше имя и фамилию:",
@@ -145,6 +238,8 @@ async def client_input_contact(update: Update, context: ContextTypes.DEFAULT_TYP
         await client_cancel_booking(update, context)
         return ConversationHandler.END
     
+    slot_holds.extend(update.effective_user.id)
+    
     if len(user_input) < 5:
         await update.message.reply_text(
             "❌ Контакт слишком короткий. Пожалуйста, введите телефон или email:",
@@ -183,6 +278,8 @@ async def client_input_therapy_experience(update: Update, context: ContextTypes.
         await client_cancel_booking(update, context)
         return ConversationHandler.END
     
+    slot_holds.extend(update.effective_user.id)
+    
     context.user_data['therapy_experience'] = user_input
     
     await update.message.reply_text(
@@ -203,6 +300,8 @@ async def client_input_disorders(update: Update, context: ContextTypes.DEFAULT_T
         await client_cancel_booking(update, context)
         return ConversationHandler.END
     
+    slot_holds.extend(update.effective_user.id)
+    
     context.user_data['disorders_info'] = user_input
     
     await update.message.reply_text(
@@ -241,6 +340,14 @@ async def client_input_request(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return ConversationHandler.END
     
+    if slot_holds.held_by_other(selected_slot['id'], client_chat_id):
+        context.user_data.clear()
+        await update.message.reply_text(
+            "😔 Время брони истекло, и этот слот уже выбрал другой клиент. Пожалуйста, начните запись заново.",
+            reply_markup=get_main_menu_keyboard(is_admin=False)
+        )
+        return ConversationHandler.END
+    
     if consultation_type == 'primary':
         full_request = (
             f"{user_input}\n\n"
@@ -255,8 +362,10 @@ async def client_input_request(update: Update, context: ContextTypes.DEFAULT_TYP
         client_name=client_name,
         client_contact=client_contact,
         client_request=full_request,
-        consultation_type=consultation_type
+        consultation_type=consultation_type,
+        client_chat_id=client_chat_id
     )
+    slot_holds.release(client_chat_id)
     
     if success:
         try:
@@ -292,7 +401,7 @@ async def client_input_request(update: Update, context: ContextTypes.DEFAULT_TYP
         )
     else:
         await update.message.reply_text(
-            "❌ Произошла ошибка при записи.",
+            "❌ Не удалось записаться: возможно, это время уже занято. Пожалуйста, выберите другое.",
             reply_markup=get_main_menu_keyboard(is_admin=False)
         )
     
@@ -302,9 +411,189 @@ async def client_input_request(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def client_cancel_booking(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Отмена процесса записи клиентом"""
+    slot_holds.release(update.effective_user.id)
     context.user_data.clear()
     await update.message.reply_text(
         "❌ Запись отменена.",
         reply_markup=get_main_menu_keyboard(is_admin=False)
     )
-    return ConversationHandler.END
\ No newline at end of file
+    return ConversationHandler.END
+
+
+async def client_booking_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Завершение брошенной записи по таймауту: снимает бронь и очищает анкету"""
+    # Таймаут срабатывает из планировщика, вне обработки обновления психолога
+    with use_tenant(context.application.tenant):
+        slot_holds.release(update.effective_user.id)
+    context.user_data.clear()
+    try:
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="⌛ Время на оформление записи истекло. Чтобы записаться, начните заново.",
+            reply_markup=get_main_menu_keyboard(is_admin=False)
+        )
+    except Exception:
+        pass
+
+
+def _build_client_appointments_view(appointments, header: str = ""):
+    """Текст и кнопки управления предстоящими записями клиента"""
+    message = header + "🗂 **Ваши предстоящие записи:**\n\n"
+    keyboard = []
+    
+    for number, appointment in enumerate(appointments, start=1):
+        message += f"{number}. 📅 {format_datetime(appointment['datetime'])}\n"
+        keyboard.append([
+            InlineKeyboardButton(f"❌ Отменить №{number}", callback_data=f"appt_cancel_{appointment['appointment_id']}"),
+            InlineKeyboardButton(f"🔄 Перенести №{number}", callback_data=f"appt_move_{appointment['appointment_id']}")
+        ])
+    
+    keyboard.append([InlineKeyboardButton("✖️ Закрыть", callback_data="appt_close")])
+    return message, InlineKeyboardMarkup(keyboard)
+
+
+async def _show_client_appointments(query, client_chat_id: int, header: str = ""):
+    """Перерисовывает список записей клиента в том же сообщении"""
+    appointments = get_client_appointments(client_chat_id)
+    
+    if not appointments:
+        await query.edit_message_text(header + "🗂 У вас нет предстоящих записей.", parse_mode='Markdown')
+        return
+    
+    message, reply_markup = _build_client_appointments_view(appointments, header)
+    await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+
+
+async def client_show_appointments(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает клиенту его предстоящие записи"""
+    appointments = get_client_appointments(update.effective_user.id)
+    
+    if not appointments:
+        await update.message.reply_text(
+            "🗂 У вас нет предстоящих записей.",
+            reply_markup=get_main_menu_keyboard(is_admin=False)
+        )
+        return
+    
+    message, reply_markup = _build_client_appointments_view(appointments)
+    await update.message.reply_text(
+        message,
+        reply_markup=reply_markup,
+        parse_mode='Markdown'
+    )
+
+
+async def client_manage_appointment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработка отмены и переноса записи клиентом"""
+    query = update.callback_query
+    await query.answer()
+    
+    callback_data = query.data
+    client_chat_id = update.effective_user.id
+    
+    if callback_data == "appt_close":
+        await query.edit_message_text("🗂 Управление записями закрыто.")
+        return
+    
+    if callback_data == "appt_list":
+        await _show_client_appointments(query, client_chat_id)
+        return
+    
+    appointments = {
+        appointment['appointment_id']: appointment
+        for appointment in get_client_appointments(client_chat_id)
+    }
+    
+    if callback_data.startswith("appt_cancel_"):
+        appointment = appointments.get(int(callback_data.replace("appt_cancel_", "")))
+        if not appointment:
+            await _show_client_appointments(query, client_chat_id, "❌ Запись не найдена.\n\n")
+            return
+        
+        keyboard = [
+            [InlineKeyboardButton("✅ Да, отменить", callback_data=f"appt_cancelok_{appointment['appointment_id']}")],
+            [InlineKeyboardButton("⬅️ Назад", callback_data="appt_list")]
+        ]
+        await query.edit_message_text(
+            f"❓ Отменить запись на **{format_datetime(appointment['datetime'])}**?",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return
+    
+    if callback_data.startswith("appt_cancelok_"):
+        appointment = appointments.get(int(callback_data.replace("appt_cancelok_", "")))
+        
+        if appointment and cancel_appointment(appointment['appointment_id'], client_chat_id):
+            await working_reminder_service.send_appointment_change_notification(
+                client_name=appointment['client_name'],
+                old_datetime=appointment['datetime']
+            )
+            header = f"✅ Запись на **{format_datetime(appointment['datetime'])}** отменена.\n\n"
+        else:
+            header = "❌ Не удалось отменить запись.\n\n"
+        
+        await _show_client_appointments(query, client_chat_id, header)
+        return
+    
+    if callback_data.startswith("appt_move_"):
+        appointment = appointments.get(int(callback_data.replace("appt_move_", "")))
+        if not appointment:
+            await _show_client_appointments(query, client_chat_id, "❌ Запись не найдена.\n\n")
+            return
+        
+        await _show_reschedule_options(query, appointment)
+        return
+    
+    if callback_data.startswith("appt_moveto_"):
+        appointment_id, new_slot_id = (int(part) for part in callback_data.replace("appt_moveto_", "").split("_"))
+        appointment = appointments.get(appointment_id)
+        
+        if (appointment and not slot_holds.held_by_other(new_slot_id, client_chat_id)
+                and reschedule_appointment(appointment_id, client_chat_id, new_slot_id)):
+            moved = next(
+                (item for item in get_client_appointments(client_chat_id) if item['appointment_id'] == appointment_id),
+                None
+            )
+            new_datetime = moved['datetime'] if moved else None
+            await working_reminder_service.send_appointment_change_notification(
+                client_name=appointment['client_name'],
+                old_datetime=appointment['datetime'],
+                new_datetime=new_datetime
+            )
+            header = f"✅ Запись перенесена на **{format_datetime(new_datetime)}**.\n\n" if new_datetime else ""
+            await _show_client_appointments(query, client_chat_id, header)
+        elif appointment:
+            await _show_reschedule_options(query, appointment, "😔 Этот слот уже занят. Выберите другой.\n\n")
+        else:
+            await _show_client_appointments(query, client_chat_id, "❌ Запись не найдена.\n\n")
+
+
+async def _show_reschedule_options(query, appointment, header: str = ""):
+    """Показывает свободные слоты для переноса записи"""
+    available_slots = slot_holds.visible_to(get_available_slots(), query.from_user.id)
+    
+    if not available_slots:
+        keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data="appt_list")]]
+        await query.edit_message_text(
+            header + "😔 На данный момент нет свободных слотов для переноса.",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return
+    
+    keyboard = [
+        [InlineKeyboardButton(
+            format_datetime(slot['datetime']),
+            callback_data=f"appt_moveto_{appointment['appointment_id']}_{slot['id']}"
+        )]
+        for slot in available_slots
+    ]
+    keyboard.append([InlineKeyboardButton("⬅️ Назад", callback_data="appt_list")])
+    
+    await query.edit_message_text(
+        header +
+        f"🔄 Перенос записи с **{format_datetime(appointment['datetime'])}**\n\n"
+        "📅 **Выберите новое время:**",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='Markdown'
+    )
\ No newline at end of file
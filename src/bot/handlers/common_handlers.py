@@ -1,28 +1,71 @@
-import os
-from telegram import Update, InputFile
+import asyncio
+import logging
+import signal
+from datetime import datetime, time
+from telegram import Update, Bot
 from telegram.ext import (
     ContextTypes, CommandHandler, Application, MessageHandler, 
-    filters, ConversationHandler, CallbackQueryHandler
+    filters, ConversationHandler, CallbackQueryHandler, TypeHandler, PicklePersistence
 )
 from src.config.settings import settings
-from src.bot.keyboards.layouts import get_main_menu_keyboard
+from src.config.tenants import DEFAULT_TENANT, Tenant, use_tenant
+from src.bot.keyboards.layouts import (
+    get_main_menu_keyboard, get_menu_buttons, ADD_SLOT_BUTTON, DELETE_SLOT_BUTTON, IMPORT_SLOTS_BUTTON,
+    APPOINTMENTS_BUTTON, MY_SLOTS_BUTTON, ARCHIVE_BUTTON, BOOK_BUTTON, MY_APPOINTMENTS_BUTTON
+)
+from src.bot.routing import MenuRouter
+from src.bot.middleware import rate_limit_guard
+from src.bot.application import TracedApplication
+from src.bot.request import build_request, get_shared_request
 from src.database.core import init_database
+from src.database.archive_repository import is_archive_supported
+from src.database.state_repository import LAST_DIGEST_DATE_KEY, get_state_value, set_state_value
 from src.services.working_reminder_service import init_working_reminder_service, working_reminder_service
+from src.services.welcome_photo_service import welcome_photo_service
+from src.services.retention_service import retention_service
+from src.services.backup_service import backup_service
+from src.services.digest_service import init_digest_service, digest_service
+from src.services.waitlist_service import init_waitlist_service, waitlist_service
+from src.services.calendar_feed import calendar_feed
+from src.services.admin_dashboard import admin_dashboard
+from src.services.analytics_service import analytics_service
+from src.utils.tracing import tracer
+from src.bot.recording import recorder
+from src.bot.watchdog import loop_watchdog
 
 from src.bot.handlers.admin_handlers import (
     admin_add_slot_start, admin_add_slot_input, admin_cancel, ADDING_SLOT,
     admin_show_appointments, admin_delete_slot_start, DELETING_SLOT,
-    admin_show_my_slots, admin_show_archive, admin_delete_slot_choice
+    admin_show_my_slots, admin_show_archive, admin_delete_slot_choice,
+    admin_export_appointments, admin_send_calendar, admin_show_slow_traces, admin_show_pools,
+    admin_show_free_windows, admin_calendar_callback, admin_show_stats, admin_create_backup, admin_show_loop_lag,
+    admin_import_slots_start, admin_import_slots_file, admin_import_slots_text, IMPORTING_SLOTS
 )
 
 from src.bot.handlers.client_handlers import (
     client_start_booking, client_choose_slot, client_input_name,
     client_input_contact, client_input_request, client_cancel_booking,
     client_choose_consultation_type, client_input_therapy_experience, client_input_disorders,
+    client_booking_timeout,
+    client_show_appointments, client_manage_appointment, client_join_waitlist,
     CHOOSING_SLOT, CHOOSING_TYPE, TYPING_NAME, TYPING_CONTACT, 
     TYPING_THERAPY_EXPERIENCE, TYPING_DISORDERS, TYPING_REQUEST
 )
 
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WELCOME_TEXT = (
+    "Добрый день! 👋\n\n"
+    "Меня зовут Александр. Я психолог с 10-летним опытом работы.\n\n"
+    "Я специализируюсь на:\n"
+    "• Работе с тревогой и стрессом\n"
+    "• Поиске жизненного баланса\n"
+    "• Преодолении кризисных ситуаций\n"
+    "• Развитии эмоционального интеллекта\n\n"
+    "Для записи на консультацию нажмите кнопку ниже 👇"
+)
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start с разными приветствиями для админов и клиентов"""
@@ -39,36 +82,15 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=get_main_menu_keyboard(is_admin=True)
         )
     else:
-        welcome_text = (
-            "Добрый день! 👋\n\n"
-            "Меня зовут Александр. Я психолог с 10-летним опытом работы.\n\n"
-            "Я специализируюсь на:\n"
-            "• Работе с тревогой и стрессом\n"
-            "• Поиске жизненного баланса\n"
-            "• Преодолении кризисных ситуаций\n"
-            "• Развитии эмоционального интеллекта\n\n"
-            "Для записи на консультацию нажмите кнопку ниже 👇"
-        )
-        
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        assets_dir = os.path.join(base_dir, 'assets')
-        
-        photo_path = None
-        for ext in ['png', 'jpg', 'jpeg']:
-            path = os.path.join(assets_dir, f'psychologist_photo.{ext}')
-            if os.path.exists(path):
-                photo_path = path
-                break
+        welcome_text = settings.WELCOME_TEXT or DEFAULT_WELCOME_TEXT
         
         try:
-            if photo_path:
-                with open(photo_path, 'rb') as photo:
-                    await update.message.reply_photo(
-                        photo=InputFile(photo),
-                        caption=welcome_text,
-                        reply_markup=get_main_menu_keyboard(is_admin=False)
-                    )
-            else:
+            sent = await welcome_photo_service.reply_photo(
+                update.message,
+                caption=welcome_text,
+                reply_markup=get_main_menu_keyboard(is_admin=False)
+            )
+            if not sent:
                 await update.message.reply_text(
                     welcome_text,
                     reply_markup=get_main_menu_keyboard(is_admin=False)
@@ -90,50 +112,235 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     print(f"❌ Ошибка: {context.error}")
 
 
-def setup_handlers():
-    """Настройка всех обработчиков бота"""
-    application = Application.builder().token(settings.BOT_TOKEN).build()
-    
-    init_working_reminder_service(application.bot)
-    
-    async def check_reminders_callback(context):
-        await working_reminder_service.check_and_send_reminders()
-    
-    job_queue = application.job_queue
-    job_queue.run_repeating(check_reminders_callback, interval=300, first=10)
+async def digest_callback(context: ContextTypes.DEFAULT_TYPE):
+    """Отправка ежедневной сводки психологу с отметкой дня отправки.
+
+    День хранится в базе психолога и отмечается только после успешной отправки,
+    чтобы при перезапуске неотправленная сводка была дослана.
+    """
+    application = context.job.data or context.application
+    with use_tenant(application.tenant):
+        sent = await digest_service.send_daily_digest()
+        if sent:
+            await asyncio.to_thread(
+                set_state_value, LAST_DIGEST_DATE_KEY, datetime.now().date().isoformat()
+            )
+
+
+async def check_reminders_callback(context: ContextTypes.DEFAULT_TYPE):
+    """Проверка напоминаний всех психологов одной задачей общего планировщика"""
+    for tenant in settings.TENANTS:
+        with use_tenant(tenant):
+            await working_reminder_service.check_and_send_reminders()
+
+
+async def retention_callback(context: ContextTypes.DEFAULT_TYPE):
+    """Архивация прошедших данных всех психологов"""
+    for tenant in settings.TENANTS:
+        with use_tenant(tenant):
+            await retention_service.run()
+
+
+async def backup_callback(context: ContextTypes.DEFAULT_TYPE):
+    """Резервные копии баз психологов, у которых подошел срок"""
+    for tenant in settings.TENANTS:
+        with use_tenant(tenant):
+            await backup_service.run(force=False)
+
+
+async def stats_rollover_callback(context: ContextTypes.DEFAULT_TYPE):
+    """Пересчет сводок аналитики за завершившийся день у всех психологов"""
+    for tenant in settings.TENANTS:
+        with use_tenant(tenant):
+            await asyncio.to_thread(analytics_service.close_day)
+
+
+async def _schedule_missed_digest(application: Application):
+    """Досылает сводку, если ее время прошло, пока бот был остановлен.
+
+    Отсутствие отметки (первый запуск со сводкой) считается как «сегодня не отправлена».
+    Отметку из bot_data прежних версий учитываем, чтобы не отправить сводку повторно.
+    """
+    last_digest_date = (
+        await asyncio.to_thread(get_state_value, LAST_DIGEST_DATE_KEY)
+        or application.bot_data.get('last_digest_date')
+    )
+    now = datetime.now()
+    send_time = digest_service.get_send_time()
+    if ((not last_digest_date or last_digest_date < now.date().isoformat())
+            and now.time() >= send_time.replace(tzinfo=None)):
+        application.scheduler.run_once(digest_callback, when=5, data=application)
+
+
+_warmup_tasks = set()
+
+
+async def post_init(application: Application):
+    """Запуск фоновых задач после инициализации бота.
+
+    База, фоновый бот и HTTP-календарь готовятся одновременно, а сводка админа
+    прогревается в фоне и не задерживает начало опроса.
+    """
+    with use_tenant(application.tenant):
+        await asyncio.gather(
+            asyncio.to_thread(init_database),
+            application.background_bot.initialize(),
+            calendar_feed.start_http_server(),
+        )
+        waitlist_service.start()
+        if not is_archive_supported():
+            logger.warning(
+                f"Психолог {application.tenant.name}: слоты и записи хранятся в памяти ({settings.DATABASE_URL}), "
+                "архивация прошедших данных и резервные копии отключены"
+            )
+        if settings.LOOP_WATCHDOG_ENABLED:
+            loop_watchdog.start()
+        warmup = asyncio.create_task(asyncio.to_thread(admin_dashboard.load))
+        _warmup_tasks.add(warmup)
+        warmup.add_done_callback(_warmup_tasks.discard)
+        if settings.ADMIN_DIGEST_ENABLED:
+            await _schedule_missed_digest(application)
+
+
+async def before_stop(application: Application):
+    """Досылка начатых фоновых отправок до остановки приложения"""
+    await working_reminder_service.stop(settings.SHUTDOWN_DRAIN_TIMEOUT)
+    await waitlist_service.stop(settings.SHUTDOWN_DRAIN_TIMEOUT)
+
+
+async def post_shutdown(application: Application):
+    """Остановка фоновых задач"""
+    with use_tenant(application.tenant):
+        await waitlist_service.stop()
+        await loop_watchdog.stop()
+        await calendar_feed.stop_http_server()
+        await application.background_bot.shutdown()
+
+
+def build_application(tenant: Tenant, scheduler=None, bot_request=None) -> Application:
+    """Собирает приложение психолога: свой токен, база и состояние, общие пулы соединений.
+
+    Без scheduler приложение ставит общие задачи в собственный JobQueue, иначе
+    его задачи добавляются в переданный планировщик. Свой JobQueue у каждого
+    приложения остается только для таймаутов диалогов. bot_request заменяет
+    все пулы соединений, например заглушкой при воспроизведении записи.
+    """
+    with use_tenant(tenant):
+        # Отдельные пулы соединений: долгий опрос, ответы пользователям и фоновые рассылки
+        # не конкурируют между собой за соединения. Пулы ответов и рассылок общие
+        # для всех психологов, долгий опрос у каждого бота свой
+        builder = (
+            Application.builder()
+            .token(settings.BOT_TOKEN)
+            .application_class(TracedApplication)
+            .request(bot_request or get_shared_request('replies'))
+            .get_updates_request(bot_request or build_request('updates', tenant.name))
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
+        )
+        # Диалоги и состояние планировщика переживают перезапуск
+        persistent = bool(settings.PERSISTENCE_FILE)
+        if persistent:
+            builder.persistence(PicklePersistence(filepath=settings.PERSISTENCE_FILE))
+        application = builder.build()
+        application.tenant = tenant
+        application.scheduler = scheduler or application.job_queue
+        application.before_stop.append(before_stop)
+        application.background_bot = Bot(settings.BOT_TOKEN, request=bot_request or get_shared_request('background'))
+
+        init_working_reminder_service(application.background_bot)
+        init_waitlist_service(application.background_bot)
+
+        if scheduler is None:
+            application.scheduler.run_repeating(check_reminders_callback, interval=300, first=10)
+            application.scheduler.run_repeating(retention_callback, interval=settings.RETENTION_INTERVAL, first=60)
+            if settings.BACKUP_INTERVAL > 0:
+                # Срок проверяется по времени последнего снимка, поэтому перезапуски его не сбивают
+                application.scheduler.run_repeating(
+                    backup_callback, interval=min(settings.BACKUP_INTERVAL, 3600), first=120
+                )
+            application.scheduler.run_daily(
+                stats_rollover_callback, time=time(0, 5, tzinfo=datetime.now().astimezone().tzinfo)
+            )
+
+        if settings.ADMIN_DIGEST_ENABLED:
+            init_digest_service(application.background_bot)
+            application.scheduler.run_daily(
+                digest_callback, time=digest_service.get_send_time(), data=application, name=f'digest:{tenant.name}'
+            )
+
+        _add_handlers(application, persistent)
+    return application
+
+
+def _add_handlers(application: Application, persistent: bool):
+    """Регистрация обработчиков команд и диалогов"""
+    # Ограничение частоты запросов до всех остальных обработчиков
+    application.add_handler(TypeHandler(Update, rate_limit_guard), group=-1)
     
     # Основные команды
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
     
+    # Кнопки главного меню: диалоги получают точные точки входа, остальное - одна таблица
+    menu = MenuRouter()
+    
     # Админ: добавление слотов
     add_slot_conv_handler = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex('^➕ Добавить слот$'), admin_add_slot_start)],
+        entry_points=[menu.entry(ADD_SLOT_BUTTON, admin_add_slot_start)],
         states={
             ADDING_SLOT: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_add_slot_input)]
         },
-        fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), admin_cancel)]
+        fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), admin_cancel)],
+        name='add_slot',
+        persistent=persistent
     )
     application.add_handler(add_slot_conv_handler)
 
     # Админ: удаление слотов
     delete_slot_conv_handler = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex('^🗑️ Удалить слот$'), admin_delete_slot_start)],
+        entry_points=[menu.entry(DELETE_SLOT_BUTTON, admin_delete_slot_start)],
         states={
             DELETING_SLOT: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_delete_slot_choice)]
         },
-        fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), admin_cancel)]
+        fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), admin_cancel)],
+        name='delete_slot',
+        persistent=persistent
     )
     application.add_handler(delete_slot_conv_handler)
 
+    # Админ: импорт слотов из файла
+    import_slots_conv_handler = ConversationHandler(
+        entry_points=[menu.entry(IMPORT_SLOTS_BUTTON, admin_import_slots_start)],
+        states={
+            IMPORTING_SLOTS: [
+                MessageHandler(filters.Document.ALL, admin_import_slots_file),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, admin_import_slots_text)
+            ]
+        },
+        fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), admin_cancel)],
+        name='import_slots',
+        persistent=persistent
+    )
+    application.add_handler(import_slots_conv_handler)
+
     # Админ: просмотр информации
-    application.add_handler(MessageHandler(filters.Regex('^📋 Ближайшие записи$'), admin_show_appointments))
-    application.add_handler(MessageHandler(filters.Regex('^👀 Мои слоты$'), admin_show_my_slots))
-    application.add_handler(MessageHandler(filters.Regex('^📚 Архив записей$'), admin_show_archive))
+    menu.route(APPOINTMENTS_BUTTON, admin_show_appointments)
+    menu.route(MY_SLOTS_BUTTON, admin_show_my_slots)
+    menu.route(ARCHIVE_BUTTON, admin_show_archive)
+    application.add_handler(CallbackQueryHandler(admin_calendar_callback, pattern='^cal_'))
+    application.add_handler(CommandHandler("export", admin_export_appointments))
+    application.add_handler(CommandHandler("calendar", admin_send_calendar))
+    application.add_handler(CommandHandler("slow", admin_show_slow_traces))
+    application.add_handler(CommandHandler("pools", admin_show_pools))
+    application.add_handler(CommandHandler("lag", admin_show_loop_lag))
+    application.add_handler(CommandHandler("free", admin_show_free_windows))
+    application.add_handler(CommandHandler("stats", admin_show_stats))
+    application.add_handler(CommandHandler("backup", admin_create_backup))
     
     # Клиент: запись на консультацию
     client_booking_conv_handler = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex('^📅 Записаться на консультацию$'), client_start_booking)],
+        entry_points=[menu.entry(BOOK_BUTTON, client_start_booking)],
             states={
                     CHOOSING_SLOT: [CallbackQueryHandler(client_choose_slot, pattern='^(book_slot_|cancel_booking)')],
                     CHOOSING_TYPE: [CallbackQueryHandler(client_choose_consultation_type, pattern='^(consult_type_|cancel_booking)')],
@@ -156,16 +363,81 @@ def setup_handlers():
                     TYPING_REQUEST: [
                         MessageHandler(filters.TEXT & ~filters.COMMAND, client_input_request),
                         MessageHandler(filters.Regex('^❌ Отмена$'), client_cancel_booking)
-                    ]
+                    ],
+                    ConversationHandler.TIMEOUT: [TypeHandler(Update, client_booking_timeout)]
                 },
-                fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), client_cancel_booking)]
+                fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), client_cancel_booking)],
+                conversation_timeout=settings.BOOKING_TIMEOUT_MINUTES * 60,
+                name='client_booking',
+                persistent=persistent
     )
     application.add_handler(client_booking_conv_handler)
     
-    # Обработчик ошибок
-    application.add_error_handler(error_handler)
+    # Клиент: отмена и перенос записей
+    menu.route(MY_APPOINTMENTS_BUTTON, client_show_appointments)
+    application.add_handler(CallbackQueryHandler(client_manage_appointment, pattern='^appt_'))
+    
+    # Кнопки меню без диалогов - после всех диалогов, чтобы активный диалог получал свой ввод первым
+    menu.validate(get_menu_buttons())
+    application.add_handler(menu.handler())
     
-    # Инициализация БД
-    init_database()
+    # Клиент: лист ожидания
+    application.add_handler(CallbackQueryHandler(client_join_waitlist, pattern='^waitlist_'))
     
-    application.run_polling()
\ No newline at end of file
+    # Обработчик ошибок
+    application.add_error_handler(error_handler)
+
+
+async def _run_tenants(applications: list):
+    """Запускает ботов всех психологов в одном цикле событий до SIGINT/SIGTERM"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    started = set()
+
+    async def start(application):
+        await application.initialize()
+        started.add(application)
+        await application.post_init(application)
+        await application.updater.start_polling()
+        await application.start()
+        logger.info(f"Бот психолога {application.tenant.name} запущен")
+
+    try:
+        # Психологи запускаются одновременно: время старта не растет с их числом
+        results = await asyncio.gather(*(start(application) for application in applications), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        await stop_event.wait()
+    finally:
+        # Владелец общего планировщика останавливается последним
+        for application in reversed([application for application in applications if application in started]):
+            with use_tenant(application.tenant):
+                try:
+                    if application.updater.running:
+                        await application.updater.stop()
+                    if application.running:
+                        await application.stop()
+                    await application.shutdown()
+                    await application.post_shutdown(application)
+                except Exception as e:
+                    logger.error(f"Ошибка при остановке бота психолога {application.tenant.name}: {e}")
+
+
+def setup_handlers():
+    """Настройка всех обработчиков бота и запуск опроса"""
+    if settings.TENANTS == [DEFAULT_TENANT]:
+        application = build_application(DEFAULT_TENANT)
+        application.run_polling()
+    else:
+        # Несколько психологов в одном процессе: общий планировщик первого приложения
+        applications = []
+        for tenant in settings.TENANTS:
+            scheduler = applications[0].scheduler if applications else None
+            applications.append(build_application(tenant, scheduler))
+        asyncio.run(_run_tenants(applications))
+    tracer.shutdown()
+    recorder.shutdown()
@@ -1,18 +1,39 @@
-from telegram import ReplyKeyboardMarkup
+import calendar
+from telegram import ReplyKeyboardMarkup, InlineKeyboardButton, InlineKeyboardMarkup
 from src.utils.formatters import format_datetime
 
+MONTH_NAMES = [
+    'Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь',
+    'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'
+]
+WEEKDAY_NAMES = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+
+# Кнопки главного меню: по этим же текстам обработчики находятся в таблице маршрутов
+ADD_SLOT_BUTTON = '➕ Добавить слот'
+DELETE_SLOT_BUTTON = '🗑️ Удалить слот'
+APPOINTMENTS_BUTTON = '📋 Ближайшие записи'
+MY_SLOTS_BUTTON = '👀 Мои слоты'
+ARCHIVE_BUTTON = '📚 Архив записей'
+IMPORT_SLOTS_BUTTON = '📥 Импорт слотов'
+BOOK_BUTTON = '📅 Записаться на консультацию'
+MY_APPOINTMENTS_BUTTON = '🗂 Мои записи'
+
+ADMIN_MENU = [
+    [ADD_SLOT_BUTTON, DELETE_SLOT_BUTTON],
+    [APPOINTMENTS_BUTTON, MY_SLOTS_BUTTON],
+    [ARCHIVE_BUTTON, IMPORT_SLOTS_BUTTON]
+]
+CLIENT_MENU = [[BOOK_BUTTON], [MY_APPOINTMENTS_BUTTON]]
+
+
+def get_menu_buttons() -> list:
+    """Тексты всех кнопок главного меню админа и клиента"""
+    return [button for menu in (ADMIN_MENU, CLIENT_MENU) for row in menu for button in row]
+
 
 def get_main_menu_keyboard(is_admin: bool = False):
     """Главное меню в зависимости от роли пользователя"""
-    if is_admin:
-        keyboard = [
-            ['➕ Добавить слот', '🗑️ Удалить слот'],
-            ['📋 Ближайшие записи', '👀 Мои слоты'],
-            ['📚 Архив записей']
-        ]
-    else:
-        keyboard = [['📅 Записаться на консультацию']]
-    
+    keyboard = ADMIN_MENU if is_admin else CLIENT_MENU
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
 
 
@@ -31,4 +52,49 @@ def get_slots_for_deletion_keyboard(available_slots):
     
     keyboard.append(['❌ Отмена'])
     
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
\ No newline at end of file
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
+
+
+def _shift_month(month: str, delta: int) -> str:
+    year, number = (int(part) for part in month.split('-'))
+    index = year * 12 + number - 1 + delta
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def day_marker(counts: dict) -> str:
+    """Отметка дня: есть свободные (🟢), частично занят (🟡), занят полностью (🔴)"""
+    if not counts['booked']:
+        return '🟢'
+    return '🟡' if counts['free'] else '🔴'
+
+
+def get_month_calendar_keyboard(month: str, days: dict, today: str):
+    """Календарь месяца 'ГГГГ-ММ' с отметками занятости; дни со слотами открываются нажатием"""
+    year, number = (int(part) for part in month.split('-'))
+    noop = 'cal_noop'
+
+    navigation = [
+        InlineKeyboardButton('◀️', callback_data=f'cal_month_{_shift_month(month, -1)}')
+        if month > today[:7] else InlineKeyboardButton(' ', callback_data=noop),
+        InlineKeyboardButton(f'{MONTH_NAMES[number - 1]} {year}', callback_data=noop),
+        InlineKeyboardButton('▶️', callback_data=f'cal_month_{_shift_month(month, 1)}'),
+    ]
+    keyboard = [navigation, [InlineKeyboardButton(name, callback_data=noop) for name in WEEKDAY_NAMES]]
+
+    for week in calendar.monthcalendar(year, number):
+        row = []
+        for day in week:
+            date = f'{month}-{day:02d}'
+            counts = days.get(date) if day else None
+            if not day:
+                row.append(InlineKeyboardButton(' ', callback_data=noop))
+            elif not counts:
+                row.append(InlineKeyboardButton(str(day), callback_data=noop))
+            else:
+                # Прошедшие дни без отметки: записаться на них уже нельзя
+                label = str(day) if date < today else f'{day}{day_marker(counts)}'
+                row.append(InlineKeyboardButton(label, callback_data=f'cal_day_{date}'))
+        keyboard.append(row)
+
+    keyboard.append([InlineKeyboardButton('📃 Все слоты списком', callback_data='cal_list')])
+    return InlineKeyboardMarkup(keyboard)
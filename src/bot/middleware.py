@@ -0,0 +1,37 @@
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+from src.config.settings import settings
+from src.config.tenants import TenantLocal
+from src.utils.rate_limiter import RateLimiter
+
+THROTTLED_TEXT = "⏳ Слишком много запросов. Пожалуйста, подождите немного."
+
+# Лимиты Telegram действуют на каждого бота отдельно, поэтому бакеты у каждого психолога свои
+rate_limiter = TenantLocal(lambda: RateLimiter(
+    user_rate=settings.RATE_LIMIT_USER_RATE,
+    user_burst=settings.RATE_LIMIT_USER_BURST,
+    global_rate=settings.RATE_LIMIT_GLOBAL_RATE,
+    global_burst=settings.RATE_LIMIT_GLOBAL_BURST,
+    idle_ttl=settings.RATE_LIMIT_IDLE_TTL
+), key='rate_limiter')
+
+
+async def rate_limit_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отсекает апдейты сверх лимита до того, как они дойдут до обработчиков"""
+    user = update.effective_user
+    if user is None or settings.is_admin(user.id):
+        return
+
+    allowed, notify = rate_limiter.check(user.id)
+    if allowed:
+        return
+
+    try:
+        if update.callback_query:
+            await update.callback_query.answer(THROTTLED_TEXT if notify else None)
+        elif notify and update.effective_message:
+            await update.effective_message.reply_text(THROTTLED_TEXT)
+    except Exception:
+        pass
+
+    raise ApplicationHandlerStop
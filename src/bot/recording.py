@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+import time
+from src.config.settings import settings
+from src.bot.keyboards.layouts import get_main_menu_keyboard, get_cancel_keyboard
+
+# Поля с персональными данными клиента: строки заменяются хэшем, числовые id - числом из хэша
+PII_STRING_FIELDS = {'first_name', 'last_name', 'username', 'phone_number', 'vcard', 'email', 'title', 'bio'}
+PII_ID_PARENTS = {'from', 'chat', 'user', 'sender_chat', 'forward_from', 'contact'}
+PII_TEXT_FIELDS = {'text', 'caption'}
+
+# Команды, даты и время администратора не содержат данных клиента
+SAFE_TEXT = re.compile(r'^(/\w+( [\w:.\-| ]*)?|\d{4}-\d{2}-\d{2}( \d{2}:\d{2})?|\d{2}\.\d{2}\.\d{4} в \d{2}:\d{2})$')
+
+
+def _keyboard_labels() -> set:
+    """Тексты кнопок меню: их нажатия сохраняются как есть, чтобы запись можно было воспроизвести"""
+    labels = {'Пропустить', 'Нет'}
+    for keyboard in (get_main_menu_keyboard(True), get_main_menu_keyboard(False), get_cancel_keyboard()):
+        for row in keyboard.keyboard:
+            labels.update(button.text for button in row)
+    return labels
+
+
+class UpdateAnonymizer:
+    """Заменяет персональные данные в JSON обновления детерминированными хэшами.
+
+    Один и тот же пользователь с тем же секретом всегда получает один и тот же
+    id, поэтому диалоги в записи остаются связными. Свободный текст заменяется
+    хэшем той же длины: проверки длины в анкете ведут себя как на настоящих данных.
+    """
+
+    def __init__(self, salt: str):
+        self._key = salt.encode('utf-8')
+        self._labels = _keyboard_labels()
+
+    @property
+    def has_key(self) -> bool:
+        return bool(self._key)
+
+    def _digest(self, value) -> str:
+        return hmac.new(self._key, str(value).encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def hash_id(self, value: int) -> int:
+        # 48 бит: без коллизий на практике и в пределах id Telegram
+        return int(self._digest(value)[:12], 16)
+
+    def hash_text(self, value: str) -> str:
+        if value in self._labels or SAFE_TEXT.match(value):
+            return value
+        digest = self._digest(value)
+        return (digest * (len(value) // len(digest) + 1))[:len(value)]
+
+    def anonymize(self, data, parent: str = None):
+        if isinstance(data, list):
+            return [self.anonymize(item, parent) for item in data]
+        if not isinstance(data, dict):
+            return data
+
+        result = {}
+        for key, value in data.items():
+            if key in ('id', 'user_id') and isinstance(value, int) and (parent in PII_ID_PARENTS or key == 'user_id'):
+                result[key] = self.hash_id(value)
+            elif key in PII_STRING_FIELDS and isinstance(value, str):
+                result[key] = self._digest(value)[:16]
+            elif key in PII_TEXT_FIELDS and isinstance(value, str):
+                result[key] = self.hash_text(value)
+            elif key == 'entities' or key == 'caption_entities':
+                # Смещения сущностей сохраняются вместе с длиной текста, а упомянутые пользователи - нет
+                result[key] = [{k: v for k, v in entity.items() if k != 'user'} for entity in value]
+            else:
+                result[key] = self.anonymize(value, key)
+        return result
+
+
+class UpdateRecorder:
+    """Пишет входящие обновления в сжатый журнал с ротацией.
+
+    Каждая строка - JSON {"ts", "tenant", "admin", "update"}, персональные данные
+    клиентов заменены хэшами. Сжатый поток сбрасывается на диск каждые
+    FLUSH_EVERY строк: при аварийной остановке теряется только хвост, а
+    read_recording читает оборванный файл до места обрыва.
+    """
+
+    FLUSH_EVERY = 100
+
+    def __init__(self, path: str, salt: str = '', max_bytes: int = 50 * 1024 * 1024, backups: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.anonymizer = UpdateAnonymizer(salt)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+
+    @property
+    def enabled(self) -> bool:
+        # Без секрета хэши не защищают данные клиентов: такая запись не ведется
+        return bool(self.path) and self.anonymizer.has_key
+
+    def _open(self):
+        self._file = gzip.open(self.path, 'ab')
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        self._pending = 0
+        for index in range(self.backups - 1, 0, -1):
+            source = f'{self.path}.{index}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def record(self, update, tenant: str, is_admin: bool):
+        """Добавляет обновление в журнал; ошибки записи не мешают обработке"""
+        if not self.enabled:
+            return
+        try:
+            line = json.dumps({
+                'ts': round(time.time(), 3),
+                'tenant': tenant,
+                'admin': is_admin,
+                'update': self.anonymizer.anonymize(update.to_dict()),
+            }, ensure_ascii=False)
+            with self._lock:
+                if self._file is None:
+                    self._open()
+                self._file.write(line.encode('utf-8') + b'\n')
+                self._pending += 1
+                if self._pending >= self.FLUSH_EVERY:
+                    self._file.flush()
+                    self._pending = 0
+                # Размер считается по сжатым данным, уже ушедшим в файл
+                if self._file.fileobj.tell() >= self.max_bytes:
+                    self._rotate()
+        except Exception as e:
+            self.logger.warning(f"Не удалось записать обновление в журнал: {e}")
+
+    def shutdown(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(paths):
+    """Читает записи из журналов по порядку, пропуская оборванную последнюю строку"""
+    for path in paths:
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as recording:
+                for line in recording:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except EOFError:
+            continue
+
+
+recorder = UpdateRecorder(
+    path=settings.RECORD_UPDATES_FILE,
+    salt=settings.RECORD_SALT,
+    max_bytes=settings.RECORD_MAX_MB * 1024 * 1024,
+    backups=settings.RECORD_BACKUPS,
+)
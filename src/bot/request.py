@@ -0,0 +1,154 @@
+import asyncio
+import importlib.util
+import logging
+import time
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+from src.config.settings import settings
+from src.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Счетчики ожидания свободного соединения в пуле (tenant None - общий пул)"""
+
+    def __init__(self, name: str, size: int, tenant: str = None):
+        self.name = name
+        self.size = size
+        self.tenant = tenant
+        self.requests = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.in_use = 0
+        self.waiting = 0
+
+    def record_wait(self, wait: float):
+        self.requests += 1
+        if wait > 0.001:
+            self.waited += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        return {
+            'name': self.name,
+            'tenant': self.tenant,
+            'size': self.size,
+            'requests': self.requests,
+            'waited': self.waited,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': self.total_wait / self.requests * 1000 if self.requests else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+            'in_use': self.in_use,
+            'waiting': self.waiting,
+        }
+
+
+# (психолог, пул) -> счетчики; у общих пулов психолог None
+pool_stats = {}
+
+
+class TracedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest, записывающий каждый запрос к Bot API отрезком текущей трассы.
+
+    Перед запросом занимает место в семафоре размером с пул соединений,
+    поэтому время ожидания свободного соединения измеряется здесь, а не
+    теряется внутри httpx.
+    """
+
+    def __init__(self, pool_name: str = 'default', connection_pool_size: int = 1,
+                 pool_timeout: float = 1.0, tenant: str = None, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, pool_timeout=pool_timeout, **kwargs)
+        self._pool_size = connection_pool_size
+        self._pool_wait_timeout = pool_timeout
+        self._pool_slots = None
+        self._users = 0
+        self.stats = pool_stats.setdefault(
+            (tenant, pool_name), PoolStats(pool_name, connection_pool_size, tenant)
+        )
+
+    async def initialize(self) -> None:
+        # Один запрос может обслуживать ботов нескольких психологов:
+        # соединения закрываются, только когда его отпустил последний бот
+        self._users += 1
+        await super().initialize()
+
+    async def shutdown(self) -> None:
+        self._users = max(0, self._users - 1)
+        if not self._users:
+            await super().shutdown()
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        if self._pool_slots is None:
+            self._pool_slots = asyncio.Semaphore(self._pool_size)
+
+        with tracer.span(f"telegram.{url.rsplit('/', 1)[-1]}", pool=self.stats.name) as span:
+            started = time.perf_counter()
+            self.stats.waiting += 1
+            try:
+                await asyncio.wait_for(self._pool_slots.acquire(), timeout=self._pool_wait_timeout)
+            except asyncio.TimeoutError as e:
+                self.stats.timeouts += 1
+                raise TimedOut(
+                    f"Все {self._pool_size} соединений пула {self.stats.name} заняты"
+                ) from e
+            finally:
+                self.stats.waiting -= 1
+
+            wait = time.perf_counter() - started
+            self.stats.record_wait(wait)
+            self.stats.in_use += 1
+            if span:
+                span.set_attribute('pool_wait_ms', round(wait * 1000, 3))
+            try:
+                status_code, payload = await super().do_request(url, method, *args, **kwargs)
+            finally:
+                self.stats.in_use -= 1
+                self._pool_slots.release()
+
+            if span:
+                span.set_attribute('status_code', status_code)
+            return status_code, payload
+
+
+def _http_version() -> str:
+    """HTTP/2 требует пакет h2; без него остаемся на HTTP/1.1"""
+    if settings.HTTP_VERSION in ('2', '2.0') and importlib.util.find_spec('h2') is None:
+        logger.warning("HTTP_VERSION=2 требует пакет h2 (pip install httpx[http2]), используется HTTP/1.1")
+        return '1.1'
+    return settings.HTTP_VERSION
+
+
+_shared_requests = {}
+
+
+def get_shared_request(pool_name: str) -> TracedHTTPXRequest:
+    """Общий для всех психологов пул replies или background"""
+    if pool_name not in _shared_requests:
+        _shared_requests[pool_name] = build_request(pool_name)
+    return _shared_requests[pool_name]
+
+
+def build_request(pool_name: str, tenant: str = None) -> TracedHTTPXRequest:
+    """Создает запрос с отдельным пулом: updates (getUpdates), replies (ответы) или background (рассылки).
+
+    tenant - психолог, которому принадлежит пул; у общих пулов не указывается.
+    """
+    pool_size, pool_timeout = {
+        'updates': (settings.UPDATES_POOL_SIZE, settings.UPDATES_POOL_TIMEOUT),
+        'replies': (settings.REPLIES_POOL_SIZE, settings.REPLIES_POOL_TIMEOUT),
+        'background': (settings.BACKGROUND_POOL_SIZE, settings.BACKGROUND_POOL_TIMEOUT),
+    }[pool_name]
+    return TracedHTTPXRequest(
+        pool_name=pool_name,
+        connection_pool_size=pool_size,
+        pool_timeout=pool_timeout,
+        tenant=tenant,
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout=settings.HTTP_READ_TIMEOUT,
+        write_timeout=settings.HTTP_WRITE_TIMEOUT,
+        http_version=_http_version(),
+    )
@@ -0,0 +1,63 @@
+from telegram import Update
+from telegram.ext import MessageHandler, filters
+
+
+class MenuButtonFilter(filters.MessageFilter):
+    """Сообщение с точным текстом одной из кнопок: проверка по множеству, без регулярных выражений"""
+
+    def __init__(self, buttons):
+        self.buttons = frozenset(buttons)
+        super().__init__(name=f'MenuButtonFilter({len(self.buttons)})')
+
+    def filter(self, message) -> bool:
+        return message.text in self.buttons
+
+
+class MenuHandler(MessageHandler):
+    """Один обработчик на все кнопки меню без диалогов: текст кнопки -> функция"""
+
+    def __init__(self, routes: dict):
+        self.routes = routes
+        super().__init__(MenuButtonFilter(routes), self.dispatch)
+
+    async def dispatch(self, update: Update, context):
+        return await self.routes[update.effective_message.text](update, context)
+
+
+class MenuRouter:
+    """Таблица маршрутов главного меню.
+
+    Кнопка, начинающая диалог, получает точный фильтр для entry_points своего
+    ConversationHandler: диалог по-прежнему сам ведет свои состояния. Остальные
+    кнопки обслуживает один MenuHandler с поиском по словарю, поэтому новая
+    кнопка не удлиняет цепочку обработчиков. Каждая кнопка назначается ровно
+    одному обработчику, а validate проверяет, что ни одна не осталась без него.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.entries = {}
+
+    def _claim(self, button: str):
+        if button in self.routes or button in self.entries:
+            raise ValueError(f"Кнопка меню «{button}» уже назначена другому обработчику")
+
+    def entry(self, button: str, callback) -> MessageHandler:
+        """Точка входа диалога по кнопке меню"""
+        self._claim(button)
+        self.entries[button] = callback
+        return MessageHandler(MenuButtonFilter([button]), callback)
+
+    def route(self, button: str, callback):
+        """Кнопка меню, которую обрабатывает одна функция"""
+        self._claim(button)
+        self.routes[button] = callback
+
+    def handler(self) -> MenuHandler:
+        return MenuHandler(self.routes)
+
+    def validate(self, buttons):
+        """Проверяет, что у каждой кнопки клавиатур есть обработчик"""
+        missing = [button for button in buttons if button not in self.routes and button not in self.entries]
+        if missing:
+            raise ValueError(f"Кнопки меню без обработчика: {', '.join(missing)}")
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from telegram import Update
+from src.config.settings import settings
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.dirname(SRC_DIR)
+ROUTING_FILE = os.path.join(SRC_DIR, 'bot', 'routing.py')
+
+
+def _describe_stack(frame) -> dict:
+    """Обработчик и место блокировки по стеку потока цикла событий.
+
+    Чужой поток читает только код и строки кадров, но не их локальные
+    переменные: обновление и психолога сторож знает из process_update.
+    """
+    location = None
+    handler = None
+    # От внутреннего кадра к внешнему: первое найденное место - ближайшее к блокирующему вызову,
+    # обработчик - последний кадр бота перед handle_update из telegram.ext
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'handle_update' and code.co_filename.endswith('_basehandler.py'):
+            break
+        if code.co_filename.startswith(SRC_DIR) and code.co_filename != __file__:
+            if location is None:
+                location = f"{os.path.relpath(code.co_filename, PROJECT_DIR)}:{frame.f_lineno} {code.co_name}"
+            if code.co_filename != ROUTING_FILE:
+                handler = code.co_name
+        frame = frame.f_back
+    if frame is None:
+        handler = None
+    return {'handler': handler, 'location': location}
+
+
+class LoopWatchdog:
+    """Сторож цикла событий: непрерывно меряет задержку и ловит блокирующий код.
+
+    Задача в цикле просыпается каждые interval секунд и записывает, на сколько
+    позже срока проснулась. Вспомогательный поток следит за последним
+    пробуждением: если цикл молчит дольше threshold, он снимает стек потока
+    цикла событий прямо во время блокировки и пишет в лог вместе с обработчиком,
+    обновлением и психологом: их process_update отмечает через watch_update
+    для задачи, которая обрабатывает обновление. Общий цикл событий у всех психологов, поэтому
+    сторож один на процесс: start и stop считают пользователей.
+    """
+
+    def __init__(self, interval: float, threshold: float, window: int = 6000, keep_stalls: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.logger = logging.getLogger(__name__)
+        self._lags = deque(maxlen=window)
+        self._stalls = deque(maxlen=keep_stalls)
+        self._offenders = Counter()
+        self._offender_max = {}
+        self._users = 0
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._loop = None
+        self._loop_thread_id = None
+        self._updates = {}
+        self._last_beat = 0.0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        """Запускает сторож в текущем цикле событий"""
+        self._users += 1
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = self._loop.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._users = max(0, self._users - 1)
+        if self._users or self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    @contextmanager
+    def watch_update(self, update, tenant: str):
+        """Отмечает обновление, которое обрабатывает текущая задача"""
+        task = asyncio.current_task() if self._task is not None else None
+        if task is None or not isinstance(update, Update):
+            yield
+            return
+        self._updates[task] = {
+            'update_id': update.update_id,
+            'user_id': update.effective_user.id if update.effective_user else None,
+            'tenant': tenant,
+        }
+        try:
+            yield
+        finally:
+            self._updates.pop(task, None)
+
+    async def _beat(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            with self._lock:
+                self._last_beat = now
+                self._lags.append(lag)
+                pending, self._pending = self._pending, None
+            if pending is not None:
+                self._finish_stall(pending, lag)
+
+    def _watch(self):
+        """Поток-наблюдатель: снимает стек, пока цикл событий еще заблокирован"""
+        while not self._stop.wait(self.interval / 2):
+            with self._lock:
+                silent = time.monotonic() - self._last_beat - self.interval
+                if silent < self.threshold or self._pending is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is None:
+                    continue
+                stall = _describe_stack(frame)
+                # Пока цикл заблокирован, текущая задача не меняется
+                task = asyncio.current_task(self._loop)
+                stall.update(self._updates.get(task) or {'update_id': None, 'user_id': None, 'tenant': None})
+                stall['stack'] = ''.join(traceback.format_stack(frame)[-12:])
+                stall['detected_ms'] = silent * 1000
+                stall['at'] = time.time()
+                self._pending = stall
+            self.logger.warning(
+                f"Цикл событий заблокирован уже {silent * 1000:.0f} мс: {stall['location'] or 'вне кода бота'}, "
+                f"обработчик {stall['handler'] or '-'}, обновление {stall['update_id'] or '-'}, "
+                f"психолог {stall['tenant'] or '-'}\n{stall['stack']}"
+            )
+
+    def _finish_stall(self, stall: dict, lag: float):
+        stall['lag_ms'] = lag * 1000
+        key = f"{stall['handler'] or '-'} → {stall['location'] or 'вне кода бота'}"
+        self._stalls.append(stall)
+        self._offenders[key] += 1
+        self._offender_max[key] = max(self._offender_max.get(key, 0.0), stall['lag_ms'])
+        self.logger.warning(f"Цикл событий был заблокирован {stall['lag_ms']:.0f} мс: {key}")
+
+    def percentiles(self) -> dict:
+        """Задержка цикла событий за последние измерения: p50, p95, p99 и максимум в мс"""
+        with self._lock:
+            lags = sorted(self._lags)
+        if not lags:
+            return {'samples': 0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+        def percentile(share):
+            return lags[min(len(lags) - 1, int(len(lags) * share))] * 1000
+
+        return {
+            'samples': len(lags),
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': lags[-1] * 1000,
+        }
+
+    def get_offenders(self, limit: int = 5) -> list:
+        """Места блокировок по числу случаев: (обработчик → место, случаев, максимум мс)"""
+        return [(key, count, self._offender_max[key]) for key, count in self._offenders.most_common(limit)]
+
+    def get_stalls(self) -> list:
+        return list(self._stalls)
+
+
+loop_watchdog = LoopWatchdog(
+    interval=settings.LOOP_WATCHDOG_INTERVAL_MS / 1000,
+    threshold=settings.LOOP_LAG_THRESHOLD_MS / 1000,
+)
@@ -1,25 +1,114 @@
 import os
 from dotenv import load_dotenv
+from src.config.tenants import current_overrides, load_tenants, DEFAULT_TENANT
 
 load_dotenv()
 
 
 class Settings:
-    """Конфигурация приложения"""
+    """Конфигурация приложения.
     
+    В режиме нескольких психологов значения из их переопределений имеют
+    приоритет над общими, так что settings.X всегда отдает настройку
+    психолога, в контексте которого выполняется код.
+    """
+    
+    TENANTS_FILE = os.getenv('TENANTS_FILE', '')
+    TENANTS = [DEFAULT_TENANT]
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     ADMIN_IDS = []
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./psychologist_bot.db')
     REMINDER_HOURS_BEFORE = 24
+    SESSION_DURATION_MINUTES = int(os.getenv('SESSION_DURATION_MINUTES', '60'))
+    SLOT_BUFFER_MINUTES = int(os.getenv('SLOT_BUFFER_MINUTES', '0'))
+    WELCOME_TEXT = os.getenv('WELCOME_TEXT', '').replace('\\n', '\n')
+    WELCOME_PHOTO = os.getenv('WELCOME_PHOTO', '')
+    SLOT_HOLD_MINUTES = int(os.getenv('SLOT_HOLD_MINUTES', '10'))
+    BOOKING_TIMEOUT_MINUTES = int(os.getenv('BOOKING_TIMEOUT_MINUTES', '30'))
+    WORKDAY_START = os.getenv('WORKDAY_START', '09:00')
+    WORKDAY_END = os.getenv('WORKDAY_END', '21:00')
+    WELCOME_PHOTO_CHECK_INTERVAL = int(os.getenv('WELCOME_PHOTO_CHECK_INTERVAL', '60'))
+    RATE_LIMIT_USER_RATE = float(os.getenv('RATE_LIMIT_USER_RATE', '1'))
+    RATE_LIMIT_USER_BURST = float(os.getenv('RATE_LIMIT_USER_BURST', '5'))
+    RATE_LIMIT_GLOBAL_RATE = float(os.getenv('RATE_LIMIT_GLOBAL_RATE', '30'))
+    RATE_LIMIT_GLOBAL_BURST = float(os.getenv('RATE_LIMIT_GLOBAL_BURST', '60'))
+    RATE_LIMIT_IDLE_TTL = int(os.getenv('RATE_LIMIT_IDLE_TTL', '600'))
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '1'))
+    RETENTION_INTERVAL = int(os.getenv('RETENTION_INTERVAL', '3600'))
+    RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '200'))
+    RETENTION_VACUUM_PAGES = int(os.getenv('RETENTION_VACUUM_PAGES', '500'))
+    BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+    BACKUP_INTERVAL = int(os.getenv('BACKUP_INTERVAL', '86400'))
+    BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '7'))
+    BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', '100'))
+    BACKUP_STEP_PAUSE = float(os.getenv('BACKUP_STEP_PAUSE', '0.005'))
+    CALENDAR_HTTP_HOST = os.getenv('CALENDAR_HTTP_HOST', '127.0.0.1')
+    CALENDAR_HTTP_PORT = int(os.getenv('CALENDAR_HTTP_PORT', '0'))
+    CALENDAR_FEED_TOKEN = os.getenv('CALENDAR_FEED_TOKEN', '')
+    ADMIN_DIGEST_ENABLED = os.getenv('ADMIN_DIGEST_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    ADMIN_DIGEST_TIME = os.getenv('ADMIN_DIGEST_TIME', '20:00')
+    WAITLIST_NOTIFY_PER_SLOT = int(os.getenv('WAITLIST_NOTIFY_PER_SLOT', '1'))
+    WAITLIST_SEND_RATE = float(os.getenv('WAITLIST_SEND_RATE', '5'))
+    ADMIN_REALTIME_NOTIFICATIONS = os.getenv('ADMIN_REALTIME_NOTIFICATIONS', 'true').lower() in ('1', 'true', 'yes')
+    DEBUG = os.getenv('DEBUG', 'false').lower() in ('1', 'true', 'yes')
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    TRACE_FILE = os.getenv('TRACE_FILE', 'traces.jsonl')
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.1'))
+    TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', '1000'))
+    TRACE_KEEP_SLOWEST = int(os.getenv('TRACE_KEEP_SLOWEST', '10'))
+    LOOP_WATCHDOG_ENABLED = os.getenv('LOOP_WATCHDOG_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    LOOP_WATCHDOG_INTERVAL_MS = float(os.getenv('LOOP_WATCHDOG_INTERVAL_MS', '100'))
+    LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', '200'))
+    RECORD_UPDATES_FILE = os.getenv('RECORD_UPDATES_FILE', '')
+    RECORD_SALT = os.getenv('RECORD_SALT', '')
+    RECORD_MAX_MB = int(os.getenv('RECORD_MAX_MB', '50'))
+    RECORD_BACKUPS = int(os.getenv('RECORD_BACKUPS', '5'))
+    UPDATES_POOL_SIZE = int(os.getenv('UPDATES_POOL_SIZE', '1'))
+    UPDATES_POOL_TIMEOUT = float(os.getenv('UPDATES_POOL_TIMEOUT', '1'))
+    REPLIES_POOL_SIZE = int(os.getenv('REPLIES_POOL_SIZE', '32'))
+    REPLIES_POOL_TIMEOUT = float(os.getenv('REPLIES_POOL_TIMEOUT', '5'))
+    BACKGROUND_POOL_SIZE = int(os.getenv('BACKGROUND_POOL_SIZE', '8'))
+    BACKGROUND_POOL_TIMEOUT = float(os.getenv('BACKGROUND_POOL_TIMEOUT', '30'))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '5'))
+    HTTP_WRITE_TIMEOUT = float(os.getenv('HTTP_WRITE_TIMEOUT', '5'))
+    HTTP_VERSION = os.getenv('HTTP_VERSION', '1.1')
+    PERSISTENCE_FILE = os.getenv('PERSISTENCE_FILE', 'bot_state.pickle')
+    SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '10'))
+    REMINDER_SEND_RATE = float(os.getenv('REMINDER_SEND_RATE', '5'))
     
-    @classmethod
-    def is_admin(cls, user_id: int) -> bool:
+    def __getattribute__(self, name):
+        overrides = current_overrides()
+        if overrides and name in overrides:
+            return overrides[name]
+        return object.__getattribute__(self, name)
+    
+    def is_admin(self, user_id: int) -> bool:
         """Проверяет, является ли пользователь администратором"""
-        return user_id in cls.ADMIN_IDS
+        return user_id in self.ADMIN_IDS
     
     @classmethod
     def validate(cls):
         """Проверка обязательных настроек"""
+        if cls.RECORD_UPDATES_FILE and len(cls.RECORD_SALT) < 16:
+            # По пустому или короткому секрету хэши id и телефонов подбираются перебором
+            raise ValueError(
+                "Для RECORD_UPDATES_FILE нужен RECORD_SALT не короче 16 символов, "
+                "например: python -c \"import secrets; print(secrets.token_hex(16))\""
+            )
+        
+        if cls.TENANTS_FILE:
+            cls.TENANTS = load_tenants(cls.TENANTS_FILE)
+            for tenant in cls.TENANTS:
+                if not tenant.overrides.get('BOT_TOKEN'):
+                    raise ValueError(f"BOT_TOKEN не указан для психолога {tenant.name} в {cls.TENANTS_FILE}")
+                if not tenant.overrides['ADMIN_IDS']:
+                    raise ValueError(f"ADMIN_IDS не указаны для психолога {tenant.name} в {cls.TENANTS_FILE}")
+                cls._validate_digest_time(tenant.overrides.get('ADMIN_DIGEST_TIME', cls.ADMIN_DIGEST_TIME))
+            if not cls.TENANTS:
+                raise ValueError(f"В {cls.TENANTS_FILE} нет ни одного психолога")
+            return
+        
         if not cls.BOT_TOKEN:
             raise ValueError("BOT_TOKEN не установлен в .env файле")
         
@@ -32,6 +121,18 @@ class Settings:
         
         if not cls.ADMIN_IDS:
             raise ValueError("ADMIN_IDS не установлены в .env файле")
+        
+        cls._validate_digest_time(cls.ADMIN_DIGEST_TIME)
+    
+    @staticmethod
+    def _validate_digest_time(value: str):
+        """Проверка формата ADMIN_DIGEST_TIME"""
+        try:
+            hours, minutes = (int(part) for part in value.split(':'))
+            if not (0 <= hours < 24 and 0 <= minutes < 60):
+                raise ValueError("время вне допустимого диапазона")
+        except ValueError as e:
+            raise ValueError(f"Ошибка в формате ADMIN_DIGEST_TIME (ожидается ЧЧ:ММ): {e}")
 
 
 settings = Settings()
\ No newline at end of file
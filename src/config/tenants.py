@@ -0,0 +1,113 @@
+import contextvars
+import json
+from contextlib import contextmanager
+
+
+class Tenant:
+    """Психолог, обслуживаемый общим процессом: имя и переопределения настроек.
+
+    Ключи overrides совпадают с атрибутами Settings (BOT_TOKEN, ADMIN_IDS,
+    DATABASE_URL, WELCOME_TEXT и т.д.). Объекты, состояние которых у каждого
+    психолога свое, создаются лениво и хранятся в state.
+    """
+
+    __slots__ = ('name', 'overrides', 'state')
+
+    def __init__(self, name: str, overrides: dict = None):
+        self.name = name
+        self.overrides = overrides or {}
+        self.state = {}
+
+    def __repr__(self):
+        return f'Tenant({self.name!r})'
+
+
+DEFAULT_TENANT = Tenant('default')
+
+_current_tenant = contextvars.ContextVar('current_tenant', default=DEFAULT_TENANT)
+
+
+def current_tenant() -> Tenant:
+    """Психолог, в контексте которого выполняется код"""
+    return _current_tenant.get()
+
+
+def current_overrides() -> dict:
+    """Переопределения настроек текущего психолога"""
+    return _current_tenant.get().overrides
+
+
+@contextmanager
+def use_tenant(tenant: Tenant):
+    """Выполняет блок в контексте психолога (переносится в задачи и to_thread)"""
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def _normalize_overrides(name: str, overrides: dict) -> dict:
+    """Приводит значения из файла к типам Settings и задает пути по умолчанию"""
+    overrides = dict(overrides)
+    admin_ids = overrides.get('ADMIN_IDS', [])
+    if isinstance(admin_ids, str):
+        admin_ids = [x.strip() for x in admin_ids.split(',') if x.strip()]
+    overrides['ADMIN_IDS'] = [int(x) for x in admin_ids]
+    overrides.setdefault('DATABASE_URL', f'sqlite:///./{name}.db')
+    overrides.setdefault('PERSISTENCE_FILE', f'bot_state.{name}.pickle')
+    return overrides
+
+
+def load_tenants(path: str) -> list:
+    """Читает список психологов из JSON: [{"name": ..., "BOT_TOKEN": ..., "ADMIN_IDS": [...], ...}]"""
+    with open(path, encoding='utf-8') as tenants_file:
+        entries = json.load(tenants_file)
+
+    tenants = []
+    names = set()
+    for entry in entries:
+        entry = dict(entry)
+        name = str(entry.pop('name', '')).strip()
+        if not name or name in names:
+            raise ValueError(f"У каждого психолога в {path} должно быть уникальное имя (name)")
+        names.add(name)
+        tenants.append(Tenant(name, _normalize_overrides(name, entry)))
+    return tenants
+
+
+class TenantLocal:
+    """Объект, у каждого психолога свой: создается фабрикой при первом обращении.
+
+    Доступ к атрибутам прозрачно перенаправляется экземпляру текущего психолога,
+    поэтому модульные синглтоны сервисов остаются прежними по интерфейсу.
+    """
+
+    __slots__ = ('_factory', '_key')
+
+    def __init__(self, factory, key: str = None):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_key', key or f'{id(self)}')
+
+    def get(self):
+        state = _current_tenant.get().state
+        instance = state.get(self._key)
+        if instance is None:
+            instance = state[self._key] = self._factory()
+        return instance
+
+    def set(self, instance):
+        _current_tenant.get().state[self._key] = instance
+
+    def bind(self, name: str):
+        """Функция, вызывающая метод экземпляра того психолога, в чьем контексте ее вызвали"""
+        def call(*args, **kwargs):
+            return getattr(self.get(), name)(*args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get(), name, value)
@@ -0,0 +1,41 @@
+from .storage import get_storage
+from src.utils.tracing import traced
+
+
+@traced()
+def apply_stats_deltas(deltas: dict) -> bool:
+    """Прибавляет изменения к дневным и недельным сводкам"""
+    if not deltas:
+        return True
+    try:
+        get_storage().apply_stats_deltas(deltas)
+        return True
+    except Exception:
+        return False
+
+
+@traced()
+def rebuild_stats(start_day: str = None, end_day: str = None):
+    """Пересчитывает сводки дней [start_day, end_day) с нуля; возвращает число дней или None при ошибке"""
+    try:
+        return get_storage().rebuild_stats(start_day, end_day)
+    except Exception:
+        return None
+
+
+@traced()
+def get_daily_stats(start_day: str, end_day: str) -> list:
+    """Дневные сводки в интервале [start_day, end_day)"""
+    try:
+        return get_storage().list_stats('day', start_day, end_day)
+    except Exception:
+        return []
+
+
+@traced()
+def get_weekly_stats(start_week: str, end_week: str) -> list:
+    """Недельные сводки с понедельником в интервале [start_week, end_week)"""
+    try:
+        return get_storage().list_stats('week', start_week, end_week)
+    except Exception:
+        return []
@@ -1,91 +1,130 @@
-from .core import get_db_connection
+from datetime import datetime
+from src.config.settings import settings
+from . import events
+from .storage import get_storage, EXPORT_COLUMNS
+from src.utils.tracing import traced
 
 
+def _now() -> str:
+    """Текущее время в формате слотов"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M')
+
+
+@traced()
 def book_appointment(slot_id: int, client_name: str, client_contact: str, 
-                    client_request: str = "", consultation_type: str = "primary") -> bool:
+                    client_request: str = "", consultation_type: str = "primary",
+                    client_chat_id: int = None) -> bool:
     """Создает запись на консультацию"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                'SELECT id, datetime, is_booked FROM schedule_slots WHERE id = ?',
-                (slot_id,)
-            )
-            slot = cursor.fetchone()
-            
-            if not slot or slot['is_booked']:
-                return False
-            
-            cursor.execute(
-                '''INSERT INTO appointments 
-                (client_name, client_contact, client_request, slot_id, consultation_type) 
-                VALUES (?, ?, ?, ?, ?)''',
-                (client_name, client_contact, client_request, slot_id, consultation_type)
-            )
-            
-            cursor.execute(
-                'UPDATE schedule_slots SET is_booked = TRUE WHERE id = ?',
-                (slot_id,)
-            )
-            
-            conn.commit()
-            return True
-            
+        appointment = get_storage().book_appointment(slot_id, {
+            'client_name': client_name,
+            'client_contact': client_contact,
+            'client_request': client_request,
+            'consultation_type': consultation_type,
+            'client_chat_id': client_chat_id
+        })
     except Exception:
         return False
+    
+    if not appointment:
+        return False
+    
+    events.publish(events.APPOINTMENT_BOOKED, appointment=appointment)
+    return True
 
 
+@traced()
+def get_client_appointments(client_chat_id: int):
+    """Получает предстоящие записи клиента"""
+    try:
+        now = _now()
+        return [
+            appointment for appointment in get_storage().list_appointments(start=now, client_chat_id=client_chat_id)
+            if appointment['datetime'] > now
+        ]
+    except Exception:
+        return []
+
+
+@traced()
+def cancel_appointment(appointment_id: int, client_chat_id: int) -> bool:
+    """Отменяет предстоящую запись клиента, освобождает слот и удаляет напоминание"""
+    try:
+        appointment = get_storage().cancel_appointment(appointment_id, client_chat_id, _now())
+    except Exception:
+        return False
+    
+    if not appointment:
+        return False
+    
+    events.publish(events.APPOINTMENT_CANCELLED, appointment=appointment)
+    return True
+
+
+@traced()
+def reschedule_appointment(appointment_id: int, client_chat_id: int, new_slot_id: int) -> bool:
+    """Переносит запись клиента на другой слот одной транзакцией.
+    
+    Новый слот занимается условно, поэтому параллельная запись
+    на тот же слот не пройдет; старый слот освобождается в той же транзакции.
+    """
+    try:
+        result = get_storage().reschedule_appointment(
+            appointment_id, client_chat_id, new_slot_id, _now(), settings.REMINDER_HOURS_BEFORE
+        )
+    except Exception:
+        return False
+    
+    if not result:
+        return False
+    
+    appointment, old_slot = result
+    events.publish(events.APPOINTMENT_RESCHEDULED, appointment=appointment, old_slot=old_slot)
+    return True
+
+
+@traced()
 def get_appointments_for_admin():
     """Получает будущие записи для админа"""
+    return get_upcoming_appointments()
+
+
+@traced()
+def get_past_appointments_for_admin():
+    """Получает прошедшие записи для админа, включая перенесённые в архив"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 
-                    a.id as appointment_id,
-                    a.client_name,
-                    a.client_contact,
-                    a.client_request,
-                    s.datetime,
-                    s.is_booked
-                FROM appointments a
-                JOIN schedule_slots s ON a.slot_id = s.id
-                WHERE datetime(s.datetime) > datetime('now')
-                ORDER BY s.datetime
-            ''')
-            
-            appointments = cursor.fetchall()
-            return [dict(appointment) for appointment in appointments]
-            
+        return get_storage().list_past_appointments(_now(), limit=20)
     except Exception:
         return []
 
 
-def get_past_appointments_for_admin():
-    """Получает прошедшие записи для админа"""
+@traced()
+def get_upcoming_appointments():
+    """Получает все предстоящие записи вместе со слотами"""
+    try:
+        now = _now()
+        return [
+            appointment for appointment in get_storage().list_appointments(start=now)
+            if appointment['datetime'] > now
+        ]
+    except Exception:
+        return []
+
+
+@traced()
+def get_appointments_between(start_datetime: str, end_datetime: str):
+    """Получает записи в интервале [start_datetime, end_datetime) одним запросом"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 
-                    a.id as appointment_id,
-                    a.client_name,
-                    a.client_contact,
-                    a.client_request,
-                    s.datetime,
-                    s.is_booked
-                FROM appointments a
-                JOIN schedule_slots s ON a.slot_id = s.id
-                WHERE datetime(s.datetime) < datetime('now')
-                ORDER BY s.datetime DESC
-                LIMIT 20
-            ''')
-            
-            appointments = cursor.fetchall()
-            return [dict(appointment) for appointment in appointments]
-            
+        return get_storage().list_appointments(start=start_datetime, end=end_datetime)
     except Exception:
-        return []
\ No newline at end of file
+        return []
+
+
+def iter_appointments_for_export(start_datetime: str = None, end_datetime: str = None,
+                                 batch_size: int = 500):
+    """Построчно выдает записи (архив, затем текущие) в интервале [start, end).
+    
+    Строки идут в порядке EXPORT_COLUMNS и забираются из хранилища пачками по batch_size.
+    """
+    return get_storage().iter_appointments(start_datetime, end_datetime, batch_size)
+
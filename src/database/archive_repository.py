@@ -0,0 +1,108 @@
+from .core import get_db_connection
+from .storage import get_storage, SQLiteStorage
+from src.utils.tracing import traced
+
+
+def is_archive_supported() -> bool:
+    """Архивные таблицы есть только у хранилища SQLite: при memory:// слоты и записи живут в памяти"""
+    return isinstance(get_storage(), SQLiteStorage)
+
+
+def _archive_slots_batch(conn, cutoff: str, batch_size: int) -> int:
+    """Переносит пачку прошедших слотов вместе с их записями в архив"""
+    batch = 'SELECT id FROM schedule_slots WHERE datetime < ? ORDER BY datetime LIMIT ?'
+    params = (cutoff, batch_size)
+    cursor = conn.cursor()
+
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO appointments_archive
+            (id, client_name, client_contact, client_request, slot_id, slot_datetime,
+             consultation_type, client_chat_id, created_at)
+            SELECT a.id, a.client_name, a.client_contact, a.client_request, a.slot_id, s.datetime,
+                   a.consultation_type, a.client_chat_id, a.created_at
+            FROM appointments a
+            JOIN schedule_slots s ON a.slot_id = s.id
+            WHERE s.id IN ({batch})
+        ''', params)
+        cursor.execute(f'DELETE FROM appointments WHERE slot_id IN ({batch})', params)
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO schedule_slots_archive
+            (id, datetime, is_booked, created_at, duration_minutes, buffer_minutes)
+            SELECT id, datetime, is_booked, created_at, duration_minutes, buffer_minutes
+            FROM schedule_slots
+            WHERE id IN ({batch})
+        ''', params)
+        cursor.execute(f'DELETE FROM schedule_slots WHERE id IN ({batch})', params)
+        moved = cursor.rowcount
+        cursor.execute('COMMIT')
+        return moved
+    except Exception:
+        cursor.execute('ROLLBACK')
+        raise
+
+
+def _archive_reminders_batch(conn, cutoff: str, batch_size: int) -> int:
+    """Переносит пачку отправленных или устаревших напоминаний в архив"""
+    batch = '''
+        SELECT id FROM reminders
+        WHERE is_sent = TRUE OR appointment_datetime < ?
+        ORDER BY id LIMIT ?
+    '''
+    params = (cutoff, batch_size)
+    cursor = conn.cursor()
+
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO reminders_archive
+            (id, client_chat_id, client_name, appointment_datetime, reminder_time, is_sent, created_at)
+            SELECT id, client_chat_id, client_name, appointment_datetime, reminder_time, is_sent, created_at
+            FROM reminders
+            WHERE id IN ({batch})
+        ''', params)
+        cursor.execute(f'DELETE FROM reminders WHERE id IN ({batch})', params)
+        moved = cursor.rowcount
+        cursor.execute('COMMIT')
+        return moved
+    except Exception:
+        cursor.execute('ROLLBACK')
+        raise
+
+
+@traced()
+def archive_expired_data(cutoff: str, batch_size: int = 200, vacuum_pages: int = 500) -> dict:
+    """Переносит данные старше cutoff в архивные таблицы короткими транзакциями
+    и возвращает освобождённые страницы файлу через инкрементальный VACUUM"""
+    if not is_archive_supported():
+        raise RuntimeError("архивация доступна только для хранилища SQLite")
+    moved = {'slots': 0, 'reminders': 0, 'vacuumed_pages': 0}
+
+    with get_db_connection() as conn:
+        conn.isolation_level = None
+
+        while True:
+            count = _archive_slots_batch(conn, cutoff, batch_size)
+            moved['slots'] += count
+            if count < batch_size:
+                break
+
+        while True:
+            count = _archive_reminders_batch(conn, cutoff, batch_size)
+            moved['reminders'] += count
+            if count < batch_size:
+                break
+
+        while vacuum_pages > 0:
+            free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if not free_pages:
+                break
+            conn.execute(f'PRAGMA incremental_vacuum({int(vacuum_pages)})').fetchall()
+            freed = free_pages - conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if freed <= 0:
+                break
+            moved['vacuumed_pages'] += freed
+
+    return moved
+
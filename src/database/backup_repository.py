@@ -0,0 +1,138 @@
+import contextvars
+import sqlite3
+import threading
+import time
+from .core import get_db_connection
+from .storage import get_storage, SQLiteStorage
+from .migrations import LATEST_VERSION
+from src.config.settings import settings
+from src.utils.tracing import traced
+
+# При непрерывной записи копия может перезапускаться бесконечно
+MAX_RESTARTS = 20
+# Как часто пробная запись проверяет, сколько писатель ждет блокировку записи
+PROBE_INTERVAL = 0.02
+
+
+class _WriteProbe:
+    """Пробные записи во время копирования: замеряет, сколько писатель ждет блокировку.
+
+    Проба берет блокировку записи (BEGIN IMMEDIATE) и сразу откатывается,
+    поэтому данные не меняются и копия из-за нее не перезапускается.
+    """
+
+    def __init__(self, interval: float = PROBE_INTERVAL):
+        self.interval = interval
+        self.max_wait = 0.0
+        self.count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Поток пробы работает с базой того же психолога
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run,), name='backup-probe', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        with get_db_connection() as conn:
+            conn.isolation_level = None
+            while True:
+                started = time.perf_counter()
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute('ROLLBACK')
+                except sqlite3.OperationalError:
+                    pass
+                self.max_wait = max(self.max_wait, time.perf_counter() - started)
+                self.count += 1
+                if self._stop.wait(self.interval):
+                    return
+
+
+def is_backup_supported() -> bool:
+    """Онлайн-копия возможна только для базы в файле, в которой хранятся слоты и записи"""
+    return isinstance(get_storage(), SQLiteStorage) and not settings.DATABASE_URL.endswith(':memory:')
+
+
+@traced()
+def backup_database(target_path: str, pages_per_step: int = 100, pause: float = 0.01) -> dict:
+    """Копирует рабочую базу в target_path онлайн-API SQLite небольшими шагами.
+
+    В режиме WAL копия читается из одного снимка базы: читатель не мешает
+    записям, и снимок не меняется, пока копирование не закончится. В других
+    режимах журнала шаг держит чтение источника только на pages_per_step страниц,
+    а если базу меняют между шагами, SQLite начинает копию заново - такие
+    перезапуски считаются в restarts, после MAX_RESTARTS копирование прерывается.
+    Между шагами выдерживается pause секунд.
+
+    max_write_wait - самое долгое ожидание блокировки записи пробным писателем
+    во время копирования. Без WAL писатель ждет фиксации, пока идет шаг
+    копирования, а проба берет блокировку раньше фиксации, поэтому в этом
+    режиме ожидание оценивается сверху самым долгим шагом.
+    """
+    if not is_backup_supported():
+        raise RuntimeError("резервное копирование доступно только для базы SQLite в файле")
+    stats = {'pages': 0, 'steps': 0, 'restarts': 0, 'max_step': 0.0, 'max_write_wait': 0.0, 'duration': 0.0}
+    remaining_before = None
+    step_started = time.perf_counter()
+
+    def progress(status, remaining, total):
+        nonlocal remaining_before, step_started
+        now = time.perf_counter()
+        stats['max_step'] = max(stats['max_step'], now - step_started)
+        stats['steps'] += 1
+        stats['pages'] = total
+        if remaining_before is not None and remaining > remaining_before:
+            stats['restarts'] += 1
+            if stats['restarts'] > MAX_RESTARTS:
+                raise RuntimeError(f"база менялась во время копирования больше {MAX_RESTARTS} раз")
+        remaining_before = remaining
+        # Единственная пауза между шагами: sleep у backup срабатывает только при занятой базе
+        if remaining and pause:
+            time.sleep(pause)
+        step_started = time.perf_counter()
+
+    started = time.perf_counter()
+    with get_db_connection() as source:
+        target = sqlite3.connect(target_path)
+        # Промежуточная копия сразу проверяется и сжимается: fsync ее страниц только
+        # забивает диск и задерживает коммиты рабочей базы
+        target.execute('PRAGMA synchronous = OFF')
+        probe = _WriteProbe()
+        wal = source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        try:
+            if wal:
+                source.execute('BEGIN')
+                source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            probe.start()
+            try:
+                source.backup(target, pages=pages_per_step, progress=progress)
+            finally:
+                probe.stop()
+            # Снимок - один самодостаточный файл без WAL
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.rollback()
+    stats['duration'] = time.perf_counter() - started
+    stats['probes'] = probe.count
+    stats['max_write_wait'] = probe.max_wait if wal else max(probe.max_wait, stats['max_step'])
+    return stats
+
+
+def verify_backup(path: str) -> list:
+    """Проверяет снимок: целостность страниц и версию схемы; возвращает список проблем"""
+    conn = sqlite3.connect(path)
+    try:
+        problems = [row[0] for row in conn.execute('PRAGMA integrity_check').fetchall() if row[0] != 'ok']
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != LATEST_VERSION:
+            problems.append(f"версия схемы {version}, ожидалась {LATEST_VERSION}")
+        return problems
+    finally:
+        conn.close()
@@ -2,9 +2,11 @@ import sqlite3
 from contextlib import contextmanager
 from .models import DatabaseManager
 from src.config.settings import settings
+from src.config.tenants import TenantLocal
 
 
-db_manager = DatabaseManager(settings.DATABASE_URL)
+# У каждого психолога своя база; создается при первом обращении
+db_manager = TenantLocal(lambda: DatabaseManager(settings.DATABASE_URL), key='db_manager')
 
 
 @contextmanager
@@ -0,0 +1,35 @@
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+SLOTS_ADDED = 'slots_added'
+SLOT_DELETED = 'slot_deleted'
+APPOINTMENT_BOOKED = 'appointment_booked'
+APPOINTMENT_CANCELLED = 'appointment_cancelled'
+APPOINTMENT_RESCHEDULED = 'appointment_rescheduled'
+
+_subscribers = defaultdict(list)
+
+
+def subscribe(event: str, callback):
+    """Подписывает обработчик на изменение расписания"""
+    _subscribers[event].append(callback)
+
+
+def unsubscribe(event: str, callback):
+    """Отписывает обработчик от события"""
+    if callback in _subscribers[event]:
+        _subscribers[event].remove(callback)
+
+
+def publish(event: str, **payload):
+    """Синхронно уведомляет подписчиков после успешного коммита.
+
+    Ошибка одного подписчика не мешает остальным и не откатывает изменение.
+    """
+    for callback in list(_subscribers[event]):
+        try:
+            callback(**payload)
+        except Exception as e:
+            logger.error(f"Ошибка обработчика события {event}: {e}")
@@ -0,0 +1,47 @@
+from .core import get_db_connection
+from src.utils.tracing import traced
+
+
+@traced()
+def get_cached_file_id(file_hash: str):
+    """Получает file_id Telegram для файла с заданным хэшем"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT file_id FROM media_cache WHERE file_hash = ?',
+                (file_hash,)
+            )
+            row = cursor.fetchone()
+            return row['file_id'] if row else None
+    except Exception:
+        return None
+
+
+@traced()
+def save_cached_file_id(file_hash: str, file_id: str) -> bool:
+    """Сохраняет file_id Telegram для файла с заданным хэшем"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT OR REPLACE INTO media_cache (file_hash, file_id) VALUES (?, ?)',
+                (file_hash, file_id)
+            )
+            conn.commit()
+            return True
+    except Exception:
+        return False
+
+
+@traced()
+def delete_cached_file_id(file_hash: str) -> bool:
+    """Удаляет устаревший file_id из кэша"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM media_cache WHERE file_hash = ?', (file_hash,))
+            conn.commit()
+            return True
+    except Exception:
+        return False
@@ -0,0 +1,389 @@
+import logging
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 500
+AUTO_VACUUM_MAX_PAGES = 10000
+# Сводки по истории пересчитываются отрезками по столько дней
+STATS_BACKFILL_DAYS = 31
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы из PRAGMA user_version"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def _set_schema_version(conn: sqlite3.Connection, version: int):
+    """Фиксирует версию схемы (PRAGMA не принимает параметры)"""
+    conn.execute(f'PRAGMA user_version = {int(version)}')
+
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    """Проверяет наличие колонки в таблице"""
+    return any(row[1] == column for row in conn.execute(f'PRAGMA table_info({table})'))
+
+
+def backfill_in_batches(conn: sqlite3.Connection, select_sql: str, update_sql: str,
+                        batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Пакетный бэкфилл: каждая пачка обновляется в отдельной короткой транзакции.
+
+    select_sql получает параметры (last_id, batch_size) и возвращает строки
+    (id, значение) по возрастанию id. Строки со значением NULL пропускаются.
+    update_sql получает параметры (значение, id).
+    """
+    last_id = 0
+    updated = 0
+    while True:
+        rows = conn.execute(select_sql, (last_id, batch_size)).fetchall()
+        if not rows:
+            return updated
+
+        params = [(row[1], row[0]) for row in rows if row[1] is not None]
+        if params:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(update_sql, params)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            updated += len(params)
+
+        last_id = rows[-1][0]
+
+
+def _create_base_schema(conn: sqlite3.Connection):
+    """Исходные таблицы, включая напоминания"""
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_slots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            datetime TEXT UNIQUE NOT NULL,
+            is_booked BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_name TEXT NOT NULL,
+            client_contact TEXT NOT NULL,
+            client_request TEXT,
+            slot_id INTEGER NOT NULL,
+            consultation_type TEXT DEFAULT 'primary',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (slot_id) REFERENCES schedule_slots (id) ON DELETE CASCADE
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_chat_id INTEGER NOT NULL,
+            client_name TEXT NOT NULL,
+            appointment_datetime TEXT NOT NULL,
+            reminder_time TEXT NOT NULL,
+            is_sent BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('COMMIT')
+
+
+def _add_hot_path_indexes(conn: sqlite3.Connection):
+    """Индексы для частых запросов и WAL-журнал"""
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_slots_booked_datetime '
+        'ON schedule_slots (is_booked, datetime)'
+    )
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_appointments_slot_id '
+        'ON appointments (slot_id)'
+    )
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_reminders_pending '
+        'ON reminders (is_sent, reminder_time)'
+    )
+    conn.execute('COMMIT')
+
+    # WAL позволяет читать базу во время записи; режим сохраняется в файле
+    conn.execute('PRAGMA journal_mode = WAL')
+
+
+def _add_appointment_client_chat_id(conn: sqlite3.Connection):
+    """Колонка client_chat_id в записях, заполняемая из напоминаний пачками"""
+    if not _column_exists(conn, 'appointments', 'client_chat_id'):
+        conn.execute('ALTER TABLE appointments ADD COLUMN client_chat_id INTEGER')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_appointments_client_chat_id '
+        'ON appointments (client_chat_id)'
+    )
+
+    # Временный индекс: без него подзапрос перебирает все напоминания на каждую запись
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_reminders_backfill_datetime '
+        'ON reminders (appointment_datetime, id)'
+    )
+    try:
+        updated = backfill_in_batches(
+            conn,
+            '''
+                SELECT a.id, (
+                    SELECT r.client_chat_id FROM reminders r
+                    WHERE r.appointment_datetime = s.datetime
+                    ORDER BY r.id DESC LIMIT 1
+                )
+                FROM appointments a
+                JOIN schedule_slots s ON a.slot_id = s.id
+                WHERE a.id > ? AND a.client_chat_id IS NULL
+                ORDER BY a.id
+                LIMIT ?
+            ''',
+            'UPDATE appointments SET client_chat_id = ? WHERE id = ?'
+        )
+    finally:
+        conn.execute('DROP INDEX IF EXISTS idx_reminders_backfill_datetime')
+    if updated:
+        logger.info(f"Заполнен client_chat_id для {updated} записей")
+
+
+def _create_media_cache(conn: sqlite3.Connection):
+    """Кэш file_id загруженных в Telegram файлов"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS media_cache (
+            file_hash TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _create_archive_tables(conn: sqlite3.Connection):
+    """Архивные таблицы для прошедших данных и инкрементальный VACUUM"""
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_slots_archive (
+            id INTEGER PRIMARY KEY,
+            datetime TEXT NOT NULL,
+            is_booked BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS appointments_archive (
+            id INTEGER PRIMARY KEY,
+            client_name TEXT NOT NULL,
+            client_contact TEXT NOT NULL,
+            client_request TEXT,
+            slot_id INTEGER NOT NULL,
+            slot_datetime TEXT NOT NULL,
+            consultation_type TEXT DEFAULT 'primary',
+            client_chat_id INTEGER,
+            created_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reminders_archive (
+            id INTEGER PRIMARY KEY,
+            client_chat_id INTEGER NOT NULL,
+            client_name TEXT NOT NULL,
+            appointment_datetime TEXT NOT NULL,
+            reminder_time TEXT NOT NULL,
+            is_sent BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_slots_archive_datetime '
+        'ON schedule_slots_archive (datetime)'
+    )
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_appointments_archive_slot_datetime '
+        'ON appointments_archive (slot_datetime)'
+    )
+    conn.execute('COMMIT')
+
+    # Режим auto_vacuum меняется только полным VACUUM; на больших базах
+    # он надолго заблокирует запись, поэтому выполняется лишь для небольших файлов
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        if conn.execute('PRAGMA page_count').fetchone()[0] <= AUTO_VACUUM_MAX_PAGES:
+            conn.execute('VACUUM')
+        else:
+            logger.warning(
+                "База слишком большая для автоматического VACUUM: "
+                "выполните VACUUM вручную, чтобы включить инкрементальную очистку"
+            )
+
+
+def _create_waitlist(conn: sqlite3.Connection):
+    """Лист ожидания свободных слотов"""
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS waitlist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_chat_id INTEGER NOT NULL,
+            client_name TEXT,
+            preferred_date TEXT NOT NULL DEFAULT '',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (client_chat_id, preferred_date)
+        )
+    ''')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_waitlist_preferred_date '
+        'ON waitlist (preferred_date, id)'
+    )
+    conn.execute('COMMIT')
+
+
+def _add_slot_durations(conn: sqlite3.Connection):
+    """Длительность и перерыв после консультации у слотов"""
+    # Значение по умолчанию у ADD COLUMN не переписывает существующие строки,
+    # поэтому старые слоты получают текущую длительность сессии без бэкфилла
+    duration = int(settings.SESSION_DURATION_MINUTES)
+    for table in ('schedule_slots', 'schedule_slots_archive'):
+        if not _column_exists(conn, table, 'duration_minutes'):
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN duration_minutes INTEGER NOT NULL DEFAULT {duration}')
+        if not _column_exists(conn, table, 'buffer_minutes'):
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN buffer_minutes INTEGER NOT NULL DEFAULT 0')
+
+
+def _add_slot_calendar_index(conn: sqlite3.Connection):
+    """Покрывающий индекс для помесячного календаря слотов"""
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_slots_datetime_booked '
+        'ON schedule_slots (datetime, is_booked)'
+    )
+    conn.execute('COMMIT')
+
+
+def _create_stats_tables(conn: sqlite3.Connection):
+    """Дневные и недельные сводки для аналитики практики, заполненные по истории"""
+    conn.execute('BEGIN IMMEDIATE')
+    for table, key in (('stats_daily', 'day'), ('stats_weekly', 'week')):
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key} TEXT PRIMARY KEY,
+                slots INTEGER NOT NULL DEFAULT 0,
+                booked INTEGER NOT NULL DEFAULT 0,
+                bookings INTEGER NOT NULL DEFAULT 0,
+                primary_bookings INTEGER NOT NULL DEFAULT 0,
+                lead_minutes INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+    conn.execute('COMMIT')
+
+    days = _backfill_stats(conn)
+    if days:
+        logger.info(f"Сводки аналитики заполнены по истории: дней с данными {days}")
+
+
+def _backfill_stats(conn: sqlite3.Connection, chunk_days: int = STATS_BACKFILL_DAYS) -> int:
+    """Заполняет сводки по истории пересчетом rebuild_stats по отрезкам дней.
+
+    Каждый отрезок пересчитывается в своей короткой транзакции, поэтому
+    большая история не держит блокировку записи. Пересчет идемпотентен:
+    прерванная миграция просто повторит его при следующем запуске.
+    """
+    from src.database.storage.sqlite import SQLiteStorage
+
+    first_day, last_day = conn.execute('''
+        SELECT MIN(day), MAX(day) FROM (
+            SELECT substr(MIN(datetime), 1, 10) AS day FROM schedule_slots
+            UNION ALL SELECT substr(MAX(datetime), 1, 10) FROM schedule_slots
+            UNION ALL SELECT substr(MIN(datetime), 1, 10) FROM schedule_slots_archive
+            UNION ALL SELECT substr(MAX(datetime), 1, 10) FROM schedule_slots_archive
+            UNION ALL SELECT date(MIN(created_at), 'localtime') FROM appointments
+            UNION ALL SELECT date(MIN(created_at), 'localtime') FROM appointments_archive
+        )
+    ''').fetchone()
+    if first_day is None:
+        return 0
+
+    @contextmanager
+    def same_connection():
+        yield conn
+
+    row_factory = conn.row_factory
+    conn.row_factory = sqlite3.Row
+    try:
+        storage = SQLiteStorage(same_connection)
+        day = datetime.strptime(first_day, '%Y-%m-%d')
+        end = datetime.strptime(last_day, '%Y-%m-%d') + timedelta(days=1)
+        filled = 0
+        while day < end:
+            next_day = min(day + timedelta(days=chunk_days), end)
+            filled += storage.rebuild_stats(day.strftime('%Y-%m-%d'), next_day.strftime('%Y-%m-%d'))
+            day = next_day
+        return filled
+    finally:
+        conn.row_factory = row_factory
+
+
+def _create_bot_state(conn: sqlite3.Connection):
+    """Служебное состояние бота (например, день последней сводки)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+MIGRATIONS = [
+    (1, _create_base_schema),
+    (2, _add_hot_path_indexes),
+    (3, _add_appointment_client_chat_id),
+    (4, _create_media_cache),
+    (5, _create_archive_tables),
+    (6, _create_waitlist),
+    (7, _add_slot_durations),
+    (8, _add_slot_calendar_index),
+    (9, _create_stats_tables),
+    (10, _create_bot_state),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Применяет недостающие миграции по порядку и возвращает версию схемы.
+
+    Каждый шаг должен быть идемпотентным: версия поднимается только после
+    успешного завершения шага, и прерванный шаг повторяется при следующем запуске.
+    """
+    current = get_schema_version(conn)
+    if current >= LATEST_VERSION:
+        return current
+
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for version, migration in MIGRATIONS:
+            if version <= get_schema_version(conn):
+                continue
+
+            logger.info(f"Применение миграции {version}: {migration.__doc__}")
+            migration(conn)
+            _set_schema_version(conn, version)
+            current = version
+    finally:
+        conn.isolation_level = isolation_level
+
+    return current
@@ -1,52 +1,35 @@
 import sqlite3
+from .migrations import run_migrations
+
+MEMORY_URL_PREFIX = 'memory://'
 
 
 class DatabaseManager:
     """Менеджер базы данных"""
     
     def __init__(self, db_url: str):
-        self.db_url = db_url.replace('sqlite:///', '')
+        self._keeper = None
+        if db_url.startswith(MEMORY_URL_PREFIX) or db_url.endswith(':memory:'):
+            # Общая in-memory база живет, пока открыто хотя бы одно соединение
+            name = db_url[len(MEMORY_URL_PREFIX):] if db_url.startswith(MEMORY_URL_PREFIX) else ''
+            self.db_url = f"file:{name or 'psychologist_bot'}?mode=memory&cache=shared"
+            self._uri = True
+            self._keeper = self.get_connection()
+        else:
+            self.db_url = db_url.replace('sqlite:///', '')
+            self._uri = False
         self._init_db()
     
     def get_connection(self) -> sqlite3.Connection:
         """Получить соединение с базой данных"""
-        conn = sqlite3.connect(self.db_url)
+        conn = sqlite3.connect(self.db_url, uri=self._uri)
         conn.row_factory = sqlite3.Row
         return conn
     
     def _init_db(self):
-        """Инициализация таблиц базы данных"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS admins (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    telegram_id INTEGER UNIQUE NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS schedule_slots (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    datetime TEXT UNIQUE NOT NULL,
-                    is_booked BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS appointments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    client_name TEXT NOT NULL,
-                    client_contact TEXT NOT NULL,
-                    client_request TEXT,
-                    slot_id INTEGER NOT NULL,
-                    consultation_type TEXT DEFAULT 'primary',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (slot_id) REFERENCES schedule_slots (id) ON DELETE CASCADE
-                )
-            ''')
-            
-            conn.commit()
\ No newline at end of file
+        """Приведение схемы базы данных к актуальной версии"""
+        conn = self.get_connection()
+        try:
+            run_migrations(conn)
+        finally:
+            conn.close()
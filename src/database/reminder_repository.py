@@ -0,0 +1,41 @@
+from .storage import get_storage
+from src.utils.tracing import traced
+
+
+@traced()
+def save_reminder(client_chat_id: int, client_name: str, appointment_datetime: str,
+                  reminder_time: str) -> bool:
+    """Сохраняет напоминание о консультации"""
+    try:
+        get_storage().add_reminder(client_chat_id, client_name, appointment_datetime, reminder_time)
+        return True
+    except Exception:
+        return False
+
+
+@traced()
+def get_due_reminders(now_iso: str):
+    """Получает неотправленные напоминания, время которых наступило"""
+    try:
+        return get_storage().get_due_reminders(now_iso)
+    except Exception:
+        return []
+
+
+@traced()
+def mark_reminder_sent(reminder_id: int) -> bool:
+    """Отмечает напоминание отправленным"""
+    try:
+        get_storage().mark_reminder_sent(reminder_id)
+        return True
+    except Exception:
+        return False
+
+
+@traced()
+def expire_stale_reminders(now: str) -> int:
+    """Снимает с отправки напоминания о консультациях, которые уже прошли"""
+    try:
+        return get_storage().expire_reminders(now)
+    except Exception:
+        return 0
@@ -1,110 +1,157 @@
-import sqlite3
-from .core import get_db_connection
+from datetime import datetime, timedelta
+from src.config.settings import settings
+from . import events
+from .storage import get_storage
+from src.utils.tracing import traced
 
 
-def add_slot_to_schedule(datetime_str: str) -> bool:
-    """Добавляет слот в расписание"""
+def _now() -> str:
+    """Текущее время в формате слотов"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M')
+
+
+@traced()
+def add_slot_to_schedule(datetime_str: str, duration_minutes: int = None, buffer_minutes: int = None) -> bool:
+    """Добавляет слот в расписание, если время свободно"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO schedule_slots (datetime, is_booked) VALUES (?, ?)',
-                (datetime_str, False)
-            )
-            conn.commit()
-            return True
-    except sqlite3.IntegrityError:
-        return False
+        inserted, _ = get_storage().add_slots(
+            [datetime_str],
+            duration_minutes or settings.SESSION_DURATION_MINUTES,
+            settings.SLOT_BUFFER_MINUTES if buffer_minutes is None else buffer_minutes
+        )
     except Exception:
         return False
+    
+    if not inserted:
+        return False
+    
+    events.publish(events.SLOTS_ADDED, slots=inserted)
+    return True
 
 
+@traced()
+def add_slots_bulk(datetimes, chunk_size: int = 500, duration_minutes: int = None,
+                   buffer_minutes: int = None) -> dict:
+    """Массово добавляет слоты пачками в отдельных транзакциях.
+    
+    Слоты, уже существующие в расписании (уникальный datetime), пропускаются,
+    пересекающиеся с занятым временем - отклоняются. Возвращает количество
+    добавленных, пропущенных и отклоненных слотов.
+    """
+    report = {'inserted': 0, 'skipped': 0, 'conflicts': 0}
+    inserted_slots = []
+    storage = get_storage()
+    duration_minutes = duration_minutes or settings.SESSION_DURATION_MINUTES
+    buffer_minutes = settings.SLOT_BUFFER_MINUTES if buffer_minutes is None else buffer_minutes
+    
+    def flush(chunk):
+        inserted, conflicts = storage.add_slots(chunk, duration_minutes, buffer_minutes)
+        inserted_slots.extend(inserted)
+        report['inserted'] += len(inserted)
+        report['conflicts'] += len(conflicts)
+        report['skipped'] += len(chunk) - len(inserted) - len(conflicts)
+    
+    chunk = []
+    for value in datetimes:
+        chunk.append(value)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    
+    if inserted_slots:
+        events.publish(events.SLOTS_ADDED, slots=inserted_slots)
+    return report
+
+
+@traced()
 def get_available_slots():
-    """Получает все доступные слоты"""
+    """Получает все доступные будущие слоты"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, datetime 
-                FROM schedule_slots 
-                WHERE is_booked = FALSE 
-                ORDER BY datetime
-            ''')
-            slots = cursor.fetchall()
-            return [dict(slot) for slot in slots]
+        now = _now()
+        slots = get_storage().list_slots(start=now, is_booked=False)
+        return [{'id': slot['id'], 'datetime': slot['datetime']} for slot in slots if slot['datetime'] > now]
     except Exception:
         return []
 
 
+@traced()
 def delete_available_slot(slot_id: int) -> bool:
     """Удаляет свободный слот из расписания"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                'SELECT id, is_booked FROM schedule_slots WHERE id = ?',
-                (slot_id,)
-            )
-            slot = cursor.fetchone()
-            
-            if not slot or slot['is_booked']:
-                return False
-            
-            cursor.execute('DELETE FROM schedule_slots WHERE id = ?', (slot_id,))
-            conn.commit()
-            return True
-            
+        slot = get_storage().delete_free_slot(slot_id)
     except Exception:
         return False
+    
+    if not slot:
+        return False
+    
+    events.publish(events.SLOT_DELETED, slot=slot)
+    return True
 
 
+@traced()
 def get_available_slots_for_deletion():
     """Получает будущие свободные слоты для удаления"""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, datetime 
-                FROM schedule_slots 
-                WHERE is_booked = FALSE 
-                AND datetime(datetime) > datetime('now')
-                ORDER BY datetime
-            ''')
-            slots = cursor.fetchall()
-            return [dict(slot) for slot in slots]
-    except Exception:
-        return []
+    return get_available_slots()
 
 
+@traced()
 def get_all_slots():
     """Получает все слоты"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, datetime, is_booked 
-                FROM schedule_slots 
-                ORDER BY datetime
-            ''')
-            slots = cursor.fetchall()
-            return [dict(slot) for slot in slots]
+        return get_storage().list_slots()
     except Exception:
         return []
 
 
+@traced()
 def get_future_slots():
     """Получает будущие слоты"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, datetime, is_booked 
-                FROM schedule_slots 
-                WHERE datetime(datetime) > datetime('now')
-                ORDER BY datetime
-            ''')
-            slots = cursor.fetchall()
-            return [dict(slot) for slot in slots]
+        now = _now()
+        return [slot for slot in get_storage().list_slots(start=now) if slot['datetime'] > now]
+    except Exception:
+        return []
+
+
+@traced()
+def get_month_availability(month: str) -> dict:
+    """Свободные и занятые слоты по дням месяца 'ГГГГ-ММ' одним сгруппированным запросом"""
+    year, number = (int(part) for part in month.split('-'))
+    next_month = f'{year + number // 12:04d}-{number % 12 + 1:02d}'
+    try:
+        return get_storage().count_slots_by_day(f'{month}-01 00:00', f'{next_month}-01 00:00')
+    except Exception:
+        return {}
+
+
+@traced()
+def get_day_slots(day: str) -> list:
+    """Слоты дня 'ГГГГ-ММ-ДД' по возрастанию времени"""
+    next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    try:
+        return get_storage().list_slots(start=f'{day} 00:00', end=f'{next_day} 00:00')
+    except Exception:
+        return []
+
+
+@traced()
+def get_free_windows(start_datetime: str, end_datetime: str, min_minutes: int = None) -> list:
+    """Свободные промежутки в интервале, куда поместится консультация с перерывом"""
+    if min_minutes is None:
+        min_minutes = settings.SESSION_DURATION_MINUTES + settings.SLOT_BUFFER_MINUTES
+    try:
+        return get_storage().list_free_windows(start_datetime, end_datetime, min_minutes)
+    except Exception:
+        return []
+
+
+@traced()
+def count_past_slots() -> int:
+    """Количество прошедших слотов, включая перенесённые в архив"""
+    try:
+        return get_storage().count_past_slots(_now())
     except Exception:
-        return []
\ No newline at end of file
+        return 0
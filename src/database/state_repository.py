@@ -0,0 +1,34 @@
+from .core import get_db_connection
+from src.utils.tracing import traced
+
+LAST_DIGEST_DATE_KEY = 'last_digest_date'
+
+
+@traced()
+def get_state_value(key: str):
+    """Получает сохраненное значение служебного состояния бота"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT value FROM bot_state WHERE key = ?', (key,))
+            row = cursor.fetchone()
+            return row['value'] if row else None
+    except Exception:
+        return None
+
+
+@traced()
+def set_state_value(key: str, value: str) -> bool:
+    """Сохраняет значение служебного состояния бота"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT OR REPLACE INTO bot_state (key, value, updated_at) '
+                'VALUES (?, ?, CURRENT_TIMESTAMP)',
+                (key, value)
+            )
+            conn.commit()
+            return True
+    except Exception:
+        return False
@@ -0,0 +1,34 @@
+from src.config.settings import settings
+from src.config.tenants import TenantLocal
+from .base import Storage, EXPORT_COLUMNS
+from .memory import MemoryStorage
+from .sqlite import SQLiteStorage
+
+MEMORY_URL_PREFIX = 'memory://'
+
+_storage = TenantLocal(lambda: create_storage(settings.DATABASE_URL), key='storage')
+
+
+def create_storage(database_url: str) -> Storage:
+    """Создает хранилище по схеме DATABASE_URL: memory:// или sqlite:///"""
+    if database_url.startswith(MEMORY_URL_PREFIX):
+        return MemoryStorage()
+
+    from src.database.core import get_db_connection
+    return SQLiteStorage(get_db_connection)
+
+
+def get_storage() -> Storage:
+    """Хранилище текущего психолога, выбранное по settings.DATABASE_URL"""
+    return _storage.get()
+
+
+def set_storage(storage: Storage):
+    """Подменяет хранилище текущего психолога (для бенчмарков и тестов)"""
+    _storage.set(storage)
+
+
+__all__ = [
+    'Storage', 'MemoryStorage', 'SQLiteStorage', 'EXPORT_COLUMNS',
+    'create_storage', 'get_storage', 'set_storage'
+]
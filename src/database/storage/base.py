@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+EXPORT_COLUMNS = [
+    'appointment_id', 'datetime', 'client_name', 'client_contact',
+    'consultation_type', 'client_request', 'created_at', 'is_archived'
+]
+
+# Слоты и занятые из них считаются по дню сессии, записи и время
+# от записи до сессии - по дню, когда клиент записался
+STATS_COLUMNS = ('slots', 'booked', 'bookings', 'primary_bookings', 'lead_minutes')
+
+
+def week_start(day: str) -> str:
+    """Понедельник недели, в которую входит день 'ГГГГ-ММ-ДД'"""
+    date = datetime.strptime(day[:10], '%Y-%m-%d')
+    return (date - timedelta(days=date.weekday())).strftime('%Y-%m-%d')
+
+
+def stats_week_bounds(start_day: str = None, end_day: str = None):
+    """Недели [с, по), которые затрагивает пересчет дней [start_day, end_day)"""
+    week_from = week_start(start_day) if start_day else ''
+    if not end_day:
+        return week_from, '9999'
+    last_day = (datetime.strptime(end_day, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+    week_to = (datetime.strptime(week_start(last_day), '%Y-%m-%d') + timedelta(days=7)).strftime('%Y-%m-%d')
+    return week_from, week_to
+
+
+def sum_stats_by_week(daily_rows) -> dict:
+    """Складывает дневные сводки в недельные"""
+    weeks = {}
+    for row in daily_rows:
+        week = weeks.setdefault(week_start(row['day']), dict.fromkeys(STATS_COLUMNS, 0))
+        for column in STATS_COLUMNS:
+            week[column] += row[column]
+    return weeks
+
+
+class Storage(ABC):
+    """Интерфейс хранилища слотов, записей и напоминаний.
+
+    Время передается строками в формате слотов ('%Y-%m-%d %H:%M'), интервалы
+    полуоткрытые [start, end). Методы возвращают словари, а не строки курсора.
+    """
+
+    # Слоты
+
+    @abstractmethod
+    def add_slots(self, datetimes, duration_minutes: int, buffer_minutes: int = 0):
+        """Добавляет слоты, пропуская уже существующие и пересекающиеся с занятым временем.
+
+        Слот занимает [начало, начало + длительность + перерыв). Возвращает
+        (добавленные слоты, времена слотов, отклоненные из-за пересечения).
+        """
+
+    @abstractmethod
+    def delete_free_slot(self, slot_id: int):
+        """Удаляет свободный слот; возвращает удаленный слот или None"""
+
+    @abstractmethod
+    def list_slots(self, start: str = None, end: str = None, is_booked: bool = None) -> list:
+        """Слоты в интервале по возрастанию времени"""
+
+    @abstractmethod
+    def list_free_windows(self, start: str, end: str, min_minutes: int = 1) -> list:
+        """Промежутки [начало, конец) внутри интервала, не занятые ни одним слотом"""
+
+    @abstractmethod
+    def count_slots_by_day(self, start: str, end: str) -> dict:
+        """Свободные и занятые слоты по дням интервала: {'ГГГГ-ММ-ДД': {'free': n, 'booked': n}}"""
+
+    @abstractmethod
+    def count_past_slots(self, now: str) -> int:
+        """Количество прошедших слотов, включая архив"""
+
+    # Записи
+
+    @abstractmethod
+    def book_appointment(self, slot_id: int, appointment: dict):
+        """Занимает свободный слот и создает запись; возвращает запись или None"""
+
+    @abstractmethod
+    def cancel_appointment(self, appointment_id: int, client_chat_id: int, now: str):
+        """Отменяет будущую запись клиента вместе с неотправленным напоминанием"""
+
+    @abstractmethod
+    def reschedule_appointment(self, appointment_id: int, client_chat_id: int, new_slot_id: int,
+                               now: str, reminder_hours_before: int):
+        """Атомарно переносит запись; возвращает (запись, старый слот) или None"""
+
+    @abstractmethod
+    def list_appointments(self, start: str = None, end: str = None, client_chat_id: int = None) -> list:
+        """Записи со временем слота в интервале по возрастанию времени"""
+
+    @abstractmethod
+    def list_past_appointments(self, now: str, limit: int) -> list:
+        """Последние прошедшие записи, включая архив, от новых к старым"""
+
+    @abstractmethod
+    def iter_appointments(self, start: str = None, end: str = None, batch_size: int = 500):
+        """Построчно выдает записи для выгрузки кортежами в порядке EXPORT_COLUMNS"""
+
+    # Сводки для аналитики
+
+    @abstractmethod
+    def apply_stats_deltas(self, deltas: dict):
+        """Прибавляет изменения {'ГГГГ-ММ-ДД': {колонка: приращение}} к дневным и недельным сводкам"""
+
+    @abstractmethod
+    def rebuild_stats(self, start_day: str = None, end_day: str = None) -> int:
+        """Пересчитывает дневные сводки [start_day, end_day) и их недели по исходным данным, включая архив.
+
+        Возвращает количество пересчитанных дней со слотами или записями.
+        """
+
+    @abstractmethod
+    def list_stats(self, period: str, start_day: str, end_day: str) -> list:
+        """Сводки 'day' или 'week' с ключом в [start_day, end_day) по возрастанию"""
+
+    # Напоминания
+
+    @abstractmethod
+    def add_reminder(self, client_chat_id: int, client_name: str, appointment_datetime: str,
+                     reminder_time: str):
+        """Сохраняет напоминание"""
+
+    @abstractmethod
+    def get_due_reminders(self, now_iso: str) -> list:
+        """Неотправленные напоминания со временем отправки не позже now_iso"""
+
+    @abstractmethod
+    def mark_reminder_sent(self, reminder_id: int):
+        """Отмечает напоминание отправленным"""
+
+    @abstractmethod
+    def expire_reminders(self, now: str) -> int:
+        """Снимает с отправки напоминания о прошедших консультациях; возвращает их количество"""
@@ -0,0 +1,405 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from src.utils.intervals import IntervalSet, insort_many, normalize_slot, to_minutes, from_minutes, free_windows
+from .base import Storage, STATS_COLUMNS, week_start, stats_week_bounds, sum_stats_by_week
+
+
+class MemoryStorage(Storage):
+    """Хранилище в памяти процесса на отсортированных индексах.
+
+    Не обращается к диску и не переживает перезапуск: предназначено для
+    бенчмарков и тестов, где нужно отделить стоимость логики от стоимости
+    хранилища. Архива нет, прошедшие данные остаются в основных индексах.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._slots = {}
+        self._slot_id_by_datetime = {}
+        self._slot_order = []
+        self._free_slot_order = []
+        self._intervals = IntervalSet()
+        self._appointments = {}
+        self._appointment_by_slot = {}
+        self._appointments_by_chat = {}
+        self._reminders = {}
+        self._pending_reminders = []
+        self._next_slot_id = 1
+        self._next_appointment_id = 1
+        self._next_reminder_id = 1
+        self._stats = {'day': {}, 'week': {}}
+
+    @staticmethod
+    def _now_timestamp() -> str:
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    @staticmethod
+    def _range(order: list, start: str = None, end: str = None):
+        """Границы отсортированного списка для интервала [start, end)"""
+        low = bisect_left(order, start) if start else 0
+        high = bisect_left(order, end) if end else len(order)
+        return low, high
+
+    @staticmethod
+    def _remove_sorted(order: list, value):
+        index = bisect_left(order, value)
+        if index < len(order) and order[index] == value:
+            del order[index]
+
+    def _slot_view(self, slot_id: int) -> dict:
+        slot = self._slots[slot_id]
+        return {'id': slot['id'], 'datetime': slot['datetime'], 'is_booked': slot['is_booked']}
+
+    def _appointment_view(self, appointment_id: int) -> dict:
+        appointment = self._appointments[appointment_id]
+        slot = self._slots[appointment['slot_id']]
+        return {
+            'appointment_id': appointment['id'],
+            'slot_id': appointment['slot_id'],
+            'client_name': appointment['client_name'],
+            'client_contact': appointment['client_contact'],
+            'client_request': appointment['client_request'],
+            'consultation_type': appointment['consultation_type'],
+            'client_chat_id': appointment['client_chat_id'],
+            'datetime': slot['datetime'],
+            'duration_minutes': slot['duration_minutes'],
+            'is_booked': slot['is_booked'],
+        }
+
+    def _set_booked(self, slot_id: int, is_booked: bool):
+        slot = self._slots[slot_id]
+        slot['is_booked'] = is_booked
+        if is_booked:
+            self._remove_sorted(self._free_slot_order, slot['datetime'])
+        else:
+            insort(self._free_slot_order, slot['datetime'])
+
+    # Слоты
+
+    def add_slots(self, datetimes, duration_minutes: int, buffer_minutes: int = 0):
+        with self._lock:
+            candidates = [
+                value for value in sorted(dict.fromkeys(normalize_slot(value) for value in datetimes))
+                if value not in self._slot_id_by_datetime
+            ]
+            span = duration_minutes + buffer_minutes
+            starts = [to_minutes(value) for value in candidates]
+            added = self._intervals.add_many([(start, start + span) for start in starts])
+
+            inserted = []
+            conflicts = []
+            for value, is_added in zip(candidates, added):
+                if not is_added:
+                    conflicts.append(value)
+                    continue
+                slot_id = self._next_slot_id
+                self._next_slot_id += 1
+                self._slots[slot_id] = {
+                    'id': slot_id,
+                    'datetime': value,
+                    'is_booked': False,
+                    'duration_minutes': duration_minutes,
+                    'buffer_minutes': buffer_minutes,
+                    'created_at': self._now_timestamp(),
+                }
+                self._slot_id_by_datetime[value] = slot_id
+                inserted.append({'id': slot_id, 'datetime': value})
+            # Пачка импорта вливается в упорядоченные списки одним слиянием
+            new_values = [slot['datetime'] for slot in inserted]
+            insort_many(self._slot_order, new_values)
+            insort_many(self._free_slot_order, new_values)
+            return inserted, conflicts
+
+    def delete_free_slot(self, slot_id: int):
+        with self._lock:
+            slot = self._slots.get(slot_id)
+            if not slot or slot['is_booked']:
+                return None
+            del self._slots[slot_id]
+            del self._slot_id_by_datetime[slot['datetime']]
+            self._intervals.remove(to_minutes(slot['datetime']))
+            self._remove_sorted(self._slot_order, slot['datetime'])
+            self._remove_sorted(self._free_slot_order, slot['datetime'])
+            return {'id': slot['id'], 'datetime': slot['datetime']}
+
+    def list_slots(self, start: str = None, end: str = None, is_booked: bool = None) -> list:
+        with self._lock:
+            order = self._free_slot_order if is_booked is False else self._slot_order
+            low, high = self._range(order, start, end)
+            slots = [self._slot_view(self._slot_id_by_datetime[value]) for value in order[low:high]]
+            if is_booked:
+                slots = [slot for slot in slots if slot['is_booked']]
+            return slots
+
+    def list_free_windows(self, start: str, end: str, min_minutes: int = 1) -> list:
+        with self._lock:
+            start_minutes, end_minutes = to_minutes(start), to_minutes(end)
+            occupied = list(self._intervals.iter_range(start_minutes, end_minutes))
+        windows = free_windows(occupied, start_minutes, end_minutes, min_minutes)
+        return [(from_minutes(window_start), from_minutes(window_end)) for window_start, window_end in windows]
+
+    def count_slots_by_day(self, start: str, end: str) -> dict:
+        with self._lock:
+            low, high = self._range(self._slot_order, start, end)
+            days = {}
+            for value in self._slot_order[low:high]:
+                counts = days.setdefault(value[:10], {'free': 0, 'booked': 0})
+                is_booked = self._slots[self._slot_id_by_datetime[value]]['is_booked']
+                counts['booked' if is_booked else 'free'] += 1
+            return days
+
+    def count_past_slots(self, now: str) -> int:
+        with self._lock:
+            return bisect_left(self._slot_order, now)
+
+    # Записи
+
+    def book_appointment(self, slot_id: int, appointment: dict):
+        with self._lock:
+            slot = self._slots.get(slot_id)
+            if not slot or slot['is_booked']:
+                return None
+
+            appointment_id = self._next_appointment_id
+            self._next_appointment_id += 1
+            self._appointments[appointment_id] = {
+                'id': appointment_id,
+                'slot_id': slot_id,
+                'client_name': appointment['client_name'],
+                'client_contact': appointment['client_contact'],
+                'client_request': appointment['client_request'],
+                'consultation_type': appointment['consultation_type'],
+                'client_chat_id': appointment['client_chat_id'],
+                'created_at': self._now_timestamp(),
+            }
+            self._appointment_by_slot[slot_id] = appointment_id
+            self._appointments_by_chat.setdefault(appointment['client_chat_id'], set()).add(appointment_id)
+            self._set_booked(slot_id, True)
+
+            return dict(
+                appointment, appointment_id=appointment_id, slot_id=slot_id,
+                datetime=slot['datetime'], duration_minutes=slot['duration_minutes'],
+                created_at=self._appointments[appointment_id]['created_at']
+            )
+
+    def _get_client_appointment(self, appointment_id: int, client_chat_id: int, now: str):
+        appointment = self._appointments.get(appointment_id)
+        if not appointment or appointment['client_chat_id'] != client_chat_id:
+            return None
+        if self._slots[appointment['slot_id']]['datetime'] <= now:
+            return None
+        view = self._appointment_view(appointment_id)
+        del view['is_booked']
+        view['created_at'] = appointment['created_at']
+        return view
+
+    def _pending_reminder_ids(self, client_chat_id: int, appointment_datetime: str) -> list:
+        return [
+            reminder['id'] for reminder in self._reminders.values()
+            if not reminder['is_sent']
+            and reminder['client_chat_id'] == client_chat_id
+            and reminder['appointment_datetime'] == appointment_datetime
+        ]
+
+    def cancel_appointment(self, appointment_id: int, client_chat_id: int, now: str):
+        with self._lock:
+            appointment = self._get_client_appointment(appointment_id, client_chat_id, now)
+            if not appointment:
+                return None
+
+            del self._appointments[appointment_id]
+            del self._appointment_by_slot[appointment['slot_id']]
+            self._appointments_by_chat[client_chat_id].discard(appointment_id)
+            self._set_booked(appointment['slot_id'], False)
+
+            for reminder_id in self._pending_reminder_ids(client_chat_id, appointment['datetime']):
+                reminder = self._reminders.pop(reminder_id)
+                self._remove_sorted(self._pending_reminders, (reminder['reminder_time'], reminder_id))
+            return appointment
+
+    def reschedule_appointment(self, appointment_id: int, client_chat_id: int, new_slot_id: int,
+                               now: str, reminder_hours_before: int):
+        with self._lock:
+            appointment = self._get_client_appointment(appointment_id, client_chat_id, now)
+            new_slot = self._slots.get(new_slot_id)
+            if (not appointment or appointment['slot_id'] == new_slot_id or not new_slot
+                    or new_slot['is_booked'] or new_slot['datetime'] <= now):
+                return None
+
+            old_slot = {'id': appointment['slot_id'], 'datetime': appointment['datetime']}
+            self._set_booked(new_slot_id, True)
+            self._set_booked(old_slot['id'], False)
+            del self._appointment_by_slot[old_slot['id']]
+            self._appointment_by_slot[new_slot_id] = appointment_id
+            self._appointments[appointment_id]['slot_id'] = new_slot_id
+
+            new_datetime = new_slot['datetime']
+            reminder_time = (
+                datetime.strptime(new_datetime, '%Y-%m-%d %H:%M') - timedelta(hours=reminder_hours_before)
+            ).isoformat()
+            pending = self._pending_reminder_ids(client_chat_id, old_slot['datetime'])
+            for reminder_id in pending:
+                reminder = self._reminders[reminder_id]
+                self._remove_sorted(self._pending_reminders, (reminder['reminder_time'], reminder_id))
+                reminder.update(appointment_datetime=new_datetime, reminder_time=reminder_time)
+                insort(self._pending_reminders, (reminder_time, reminder_id))
+            if not pending:
+                # Напоминание о старом времени уже ушло: новой консультации нужно свое
+                self._add_reminder(client_chat_id, appointment['client_name'], new_datetime, reminder_time)
+
+            appointment.update(
+                slot_id=new_slot_id, datetime=new_datetime, duration_minutes=new_slot['duration_minutes']
+            )
+            return appointment, old_slot
+
+    def list_appointments(self, start: str = None, end: str = None, client_chat_id: int = None) -> list:
+        with self._lock:
+            if client_chat_id is not None:
+                appointments = [
+                    self._appointment_view(appointment_id)
+                    for appointment_id in self._appointments_by_chat.get(client_chat_id, ())
+                ]
+                return sorted(
+                    (
+                        appointment for appointment in appointments
+                        if (not start or appointment['datetime'] >= start)
+                        and (not end or appointment['datetime'] < end)
+                    ),
+                    key=lambda appointment: appointment['datetime']
+                )
+
+            low, high = self._range(self._slot_order, start, end)
+            appointments = []
+            for value in self._slot_order[low:high]:
+                appointment_id = self._appointment_by_slot.get(self._slot_id_by_datetime[value])
+                if appointment_id is not None:
+                    appointments.append(self._appointment_view(appointment_id))
+            return appointments
+
+    def list_past_appointments(self, now: str, limit: int) -> list:
+        with self._lock:
+            appointments = []
+            for value in reversed(self._slot_order[:bisect_left(self._slot_order, now)]):
+                appointment_id = self._appointment_by_slot.get(self._slot_id_by_datetime[value])
+                if appointment_id is not None:
+                    appointments.append(self._appointment_view(appointment_id))
+                    if len(appointments) >= limit:
+                        break
+            return appointments
+
+    def iter_appointments(self, start: str = None, end: str = None, batch_size: int = 500):
+        for appointment in self.list_appointments(start, end):
+            yield (
+                appointment['appointment_id'],
+                appointment['datetime'],
+                appointment['client_name'],
+                appointment['client_contact'],
+                appointment['consultation_type'],
+                appointment['client_request'],
+                self._appointments[appointment['appointment_id']]['created_at'],
+                0,
+            )
+
+    # Сводки для аналитики
+
+    def _add_stats(self, period: str, key: str, values: dict):
+        row = self._stats[period].setdefault(key, dict.fromkeys(STATS_COLUMNS, 0))
+        for column, delta in values.items():
+            row[column] += delta
+
+    def apply_stats_deltas(self, deltas: dict):
+        with self._lock:
+            for day, values in deltas.items():
+                self._add_stats('day', day, values)
+                self._add_stats('week', week_start(day), values)
+
+    def rebuild_stats(self, start_day: str = None, end_day: str = None) -> int:
+        start, end = start_day or '', end_day or '9999'
+        with self._lock:
+            days = {}
+            for slot in self._slots.values():
+                day = slot['datetime'][:10]
+                if start <= day < end:
+                    row = days.setdefault(day, dict.fromkeys(STATS_COLUMNS, 0))
+                    row['slots'] += 1
+                    row['booked'] += int(slot['is_booked'])
+            for appointment in self._appointments.values():
+                day = appointment['created_at'][:10]
+                if start <= day < end:
+                    row = days.setdefault(day, dict.fromkeys(STATS_COLUMNS, 0))
+                    session = self._slots[appointment['slot_id']]['datetime']
+                    row['bookings'] += 1
+                    row['primary_bookings'] += int(appointment['consultation_type'] == 'primary')
+                    row['lead_minutes'] += max(0, to_minutes(session) - to_minutes(appointment['created_at'][:16]))
+
+            daily = self._stats['day']
+            for day in [day for day in daily if start <= day < end]:
+                del daily[day]
+            daily.update(days)
+
+            week_from, week_to = stats_week_bounds(start_day, end_day)
+            weekly = self._stats['week']
+            for week in [week for week in weekly if week_from <= week < week_to]:
+                del weekly[week]
+            weekly.update(sum_stats_by_week(
+                dict(row, day=day) for day, row in daily.items() if week_from <= day < week_to
+            ))
+            return len(days)
+
+    def list_stats(self, period: str, start_day: str, end_day: str) -> list:
+        with self._lock:
+            return [
+                dict(values, period=key)
+                for key, values in sorted(self._stats[period].items())
+                if start_day <= key < end_day
+            ]
+
+    # Напоминания
+
+    def _add_reminder(self, client_chat_id: int, client_name: str, appointment_datetime: str,
+                      reminder_time: str):
+        reminder_id = self._next_reminder_id
+        self._next_reminder_id += 1
+        self._reminders[reminder_id] = {
+            'id': reminder_id,
+            'client_chat_id': client_chat_id,
+            'client_name': client_name,
+            'appointment_datetime': appointment_datetime,
+            'reminder_time': reminder_time,
+            'is_sent': False,
+        }
+        insort(self._pending_reminders, (reminder_time, reminder_id))
+
+    def add_reminder(self, client_chat_id: int, client_name: str, appointment_datetime: str,
+                     reminder_time: str):
+        with self._lock:
+            self._add_reminder(client_chat_id, client_name, appointment_datetime, reminder_time)
+
+    def get_due_reminders(self, now_iso: str) -> list:
+        with self._lock:
+            due = self._pending_reminders[:bisect_right(self._pending_reminders, (now_iso, float('inf')))]
+            return [
+                {
+                    key: self._reminders[reminder_id][key]
+                    for key in ('id', 'client_chat_id', 'client_name', 'appointment_datetime')
+                }
+                for _, reminder_id in due
+            ]
+
+    def mark_reminder_sent(self, reminder_id: int):
+        with self._lock:
+            reminder = self._reminders.get(reminder_id)
+            if reminder and not reminder['is_sent']:
+                reminder['is_sent'] = True
+                self._remove_sorted(self._pending_reminders, (reminder['reminder_time'], reminder_id))
+
+    def expire_reminders(self, now: str) -> int:
+        with self._lock:
+            expired = [
+                reminder_id for _, reminder_id in self._pending_reminders
+                if self._reminders[reminder_id]['appointment_datetime'] <= now
+            ]
+            for reminder_id in expired:
+                self.mark_reminder_sent(reminder_id)
+            return len(expired)
@@ -0,0 +1,530 @@
+from datetime import datetime, timedelta
+from src.utils.intervals import IntervalSet, normalize_slot, to_minutes, from_minutes, free_windows
+from .base import Storage, STATS_COLUMNS, week_start, stats_week_bounds, sum_stats_by_week
+
+
+def _reminder_time(appointment_datetime: str, hours_before: int) -> str:
+    """Время отправки напоминания для консультации"""
+    appointment_dt = datetime.strptime(appointment_datetime, '%Y-%m-%d %H:%M')
+    return (appointment_dt - timedelta(hours=hours_before)).isoformat()
+
+
+class SQLiteStorage(Storage):
+    """Хранилище в SQLite: горячие таблицы плюс архивные для прошедших данных"""
+
+    def __init__(self, connection_factory):
+        self.connection_factory = connection_factory
+
+    # Слоты
+
+    def add_slots(self, datetimes, duration_minutes: int, buffer_minutes: int = 0):
+        unique_datetimes = list(dict.fromkeys(normalize_slot(value) for value in datetimes))
+        if not unique_datetimes:
+            return [], []
+        span = duration_minutes + buffer_minutes
+
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(
+                f'SELECT datetime FROM schedule_slots WHERE datetime IN ({",".join("?" * len(unique_datetimes))})',
+                unique_datetimes
+            )
+            existing = {row['datetime'] for row in cursor.fetchall()}
+
+            # Пересечения внутри пачки проверяются по ее собственному индексу,
+            # с расписанием - по ближайшему предшественнику конца нового слота
+            batch = IntervalSet()
+            new_datetimes = []
+            conflicts = []
+            for value in sorted(value for value in unique_datetimes if value not in existing):
+                start = to_minutes(value)
+                end = start + span
+                if batch.overlaps(start, end) or self._overlaps_schedule(cursor, start, from_minutes(end)):
+                    conflicts.append(value)
+                    continue
+                batch.add(start, end)
+                new_datetimes.append(value)
+
+            inserted = []
+            if new_datetimes:
+                cursor.executemany(
+                    '''INSERT OR IGNORE INTO schedule_slots (datetime, is_booked, duration_minutes, buffer_minutes)
+                    VALUES (?, FALSE, ?, ?)''',
+                    [(value, duration_minutes, buffer_minutes) for value in new_datetimes]
+                )
+                cursor.execute(
+                    f'SELECT id, datetime FROM schedule_slots WHERE datetime IN ({",".join("?" * len(new_datetimes))})',
+                    new_datetimes
+                )
+                inserted = [dict(row) for row in cursor.fetchall()]
+            conn.commit()
+            return inserted, conflicts
+
+    @staticmethod
+    def _predecessor(cursor, before: str):
+        """Слот с наибольшим началом раньше before (поиск по индексу datetime)"""
+        cursor.execute('''
+            SELECT datetime, duration_minutes + buffer_minutes AS span
+            FROM schedule_slots
+            WHERE datetime < ?
+            ORDER BY datetime DESC
+            LIMIT 1
+        ''', (before,))
+        return cursor.fetchone()
+
+    def _overlaps_schedule(self, cursor, start: int, end: str) -> bool:
+        """Пересекается ли [start, end) с уже существующим слотом"""
+        previous = self._predecessor(cursor, end)
+        return bool(previous) and to_minutes(previous['datetime']) + previous['span'] > start
+
+    def list_free_windows(self, start: str, end: str, min_minutes: int = 1) -> list:
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            previous = self._predecessor(cursor, start)
+            cursor.execute('''
+                SELECT datetime, duration_minutes + buffer_minutes AS span
+                FROM schedule_slots
+                WHERE datetime >= ? AND datetime < ?
+                ORDER BY datetime
+            ''', (start, end))
+            rows = ([previous] if previous else []) + cursor.fetchall()
+
+        occupied = [(to_minutes(row['datetime']), to_minutes(row['datetime']) + row['span']) for row in rows]
+        windows = free_windows(occupied, to_minutes(start), to_minutes(end), min_minutes)
+        return [(from_minutes(window_start), from_minutes(window_end)) for window_start, window_end in windows]
+
+    def delete_free_slot(self, slot_id: int):
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(
+                'SELECT id, datetime, is_booked FROM schedule_slots WHERE id = ?',
+                (slot_id,)
+            )
+            slot = cursor.fetchone()
+
+            if not slot or slot['is_booked']:
+                conn.rollback()
+                return None
+
+            cursor.execute('DELETE FROM schedule_slots WHERE id = ? AND is_booked = FALSE', (slot_id,))
+            conn.commit()
+            return {'id': slot['id'], 'datetime': slot['datetime']}
+
+    def list_slots(self, start: str = None, end: str = None, is_booked: bool = None) -> list:
+        conditions = ['datetime >= ?', 'datetime < ?']
+        params = [start or '', end or '9999']
+        if is_booked is not None:
+            conditions.append('is_booked = ?')
+            params.append(bool(is_booked))
+
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT id, datetime, is_booked
+                FROM schedule_slots
+                WHERE {' AND '.join(conditions)}
+                ORDER BY datetime
+            ''', params)
+            return [dict(slot) for slot in cursor.fetchall()]
+
+    def count_slots_by_day(self, start: str, end: str) -> dict:
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            # Диапазон по индексу (datetime, is_booked) без обращения к таблице
+            cursor.execute('''
+                SELECT substr(datetime, 1, 10) AS day, COUNT(*) AS total, SUM(is_booked) AS booked
+                FROM schedule_slots
+                WHERE datetime >= ? AND datetime < ?
+                GROUP BY day
+            ''', (start, end))
+            return {
+                row['day']: {'free': row['total'] - row['booked'], 'booked': row['booked']}
+                for row in cursor.fetchall()
+            }
+
+    def count_past_slots(self, now: str) -> int:
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT
+                    (SELECT COUNT(*) FROM schedule_slots WHERE datetime < ?) +
+                    (SELECT COUNT(*) FROM schedule_slots_archive)
+            ''', (now,))
+            return cursor.fetchone()[0]
+
+    # Записи
+
+    def book_appointment(self, slot_id: int, appointment: dict):
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+
+            cursor.execute(
+                'UPDATE schedule_slots SET is_booked = TRUE WHERE id = ? AND is_booked = FALSE',
+                (slot_id,)
+            )
+            if cursor.rowcount != 1:
+                conn.rollback()
+                return None
+
+            cursor.execute(
+                '''INSERT INTO appointments
+                (client_name, client_contact, client_request, slot_id, consultation_type, client_chat_id)
+                VALUES (?, ?, ?, ?, ?, ?)''',
+                (
+                    appointment['client_name'], appointment['client_contact'],
+                    appointment['client_request'], slot_id,
+                    appointment['consultation_type'], appointment['client_chat_id']
+                )
+            )
+            appointment_id = cursor.lastrowid
+
+            cursor.execute('''
+                SELECT s.datetime, s.duration_minutes, datetime(a.created_at, 'localtime') AS created_at
+                FROM appointments a
+                JOIN schedule_slots s ON a.slot_id = s.id
+                WHERE a.id = ?
+            ''', (appointment_id,))
+            slot = cursor.fetchone()
+            conn.commit()
+
+        return dict(
+            appointment, appointment_id=appointment_id, slot_id=slot_id,
+            datetime=slot['datetime'], duration_minutes=slot['duration_minutes'],
+            created_at=slot['created_at']
+        )
+
+    def _get_client_appointment(self, cursor, appointment_id: int, client_chat_id: int, now: str):
+        """Находит будущую запись клиента внутри открытой транзакции"""
+        cursor.execute('''
+            SELECT
+                a.id as appointment_id,
+                a.slot_id,
+                a.client_name,
+                a.client_contact,
+                a.client_request,
+                a.consultation_type,
+                a.client_chat_id,
+                datetime(a.created_at, 'localtime') AS created_at,
+                s.datetime,
+                s.duration_minutes
+            FROM appointments a
+            JOIN schedule_slots s ON a.slot_id = s.id
+            WHERE a.id = ? AND a.client_chat_id = ? AND s.datetime > ?
+        ''', (appointment_id, client_chat_id, now))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def cancel_appointment(self, appointment_id: int, client_chat_id: int, now: str):
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+
+            appointment = self._get_client_appointment(cursor, appointment_id, client_chat_id, now)
+            if not appointment:
+                conn.rollback()
+                return None
+
+            cursor.execute('DELETE FROM appointments WHERE id = ?', (appointment_id,))
+            cursor.execute(
+                'UPDATE schedule_slots SET is_booked = FALSE WHERE id = ?',
+                (appointment['slot_id'],)
+            )
+            cursor.execute(
+                '''DELETE FROM reminders
+                WHERE client_chat_id = ? AND appointment_datetime = ? AND is_sent = FALSE''',
+                (client_chat_id, appointment['datetime'])
+            )
+            conn.commit()
+            return appointment
+
+    def reschedule_appointment(self, appointment_id: int, client_chat_id: int, new_slot_id: int,
+                               now: str, reminder_hours_before: int):
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+
+            appointment = self._get_client_appointment(cursor, appointment_id, client_chat_id, now)
+            if not appointment or appointment['slot_id'] == new_slot_id:
+                conn.rollback()
+                return None
+
+            cursor.execute(
+                '''UPDATE schedule_slots SET is_booked = TRUE
+                WHERE id = ? AND is_booked = FALSE AND datetime > ?''',
+                (new_slot_id, now)
+            )
+            if cursor.rowcount != 1:
+                conn.rollback()
+                return None
+
+            cursor.execute(
+                'UPDATE schedule_slots SET is_booked = FALSE WHERE id = ?',
+                (appointment['slot_id'],)
+            )
+            cursor.execute(
+                'UPDATE appointments SET slot_id = ? WHERE id = ?',
+                (new_slot_id, appointment_id)
+            )
+
+            cursor.execute('SELECT datetime, duration_minutes FROM schedule_slots WHERE id = ?', (new_slot_id,))
+            new_slot = cursor.fetchone()
+            new_datetime = new_slot['datetime']
+
+            reminder_time = _reminder_time(new_datetime, reminder_hours_before)
+            cursor.execute(
+                '''UPDATE reminders SET appointment_datetime = ?, reminder_time = ?
+                WHERE client_chat_id = ? AND appointment_datetime = ? AND is_sent = FALSE''',
+                (new_datetime, reminder_time, client_chat_id, appointment['datetime'])
+            )
+            if cursor.rowcount == 0:
+                # Напоминание о старом времени уже ушло: новой консультации нужно свое
+                cursor.execute(
+                    '''INSERT INTO reminders
+                    (client_chat_id, client_name, appointment_datetime, reminder_time, is_sent)
+                    VALUES (?, ?, ?, ?, FALSE)''',
+                    (client_chat_id, appointment['client_name'], new_datetime, reminder_time)
+                )
+            conn.commit()
+
+        old_slot = {'id': appointment['slot_id'], 'datetime': appointment['datetime']}
+        appointment.update(
+            slot_id=new_slot_id, datetime=new_datetime, duration_minutes=new_slot['duration_minutes']
+        )
+        return appointment, old_slot
+
+    def list_appointments(self, start: str = None, end: str = None, client_chat_id: int = None) -> list:
+        conditions = ['s.datetime >= ?', 's.datetime < ?']
+        params = [start or '', end or '9999']
+        if client_chat_id is not None:
+            conditions.append('a.client_chat_id = ?')
+            params.append(client_chat_id)
+
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT
+                    a.id as appointment_id,
+                    a.slot_id,
+                    a.client_name,
+                    a.client_contact,
+                    a.client_request,
+                    a.consultation_type,
+                    a.client_chat_id,
+                    s.datetime,
+                    s.duration_minutes,
+                    s.is_booked
+                FROM schedule_slots s
+                JOIN appointments a ON a.slot_id = s.id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY s.datetime
+            ''', params)
+            return [dict(appointment) for appointment in cursor.fetchall()]
+
+    def list_past_appointments(self, now: str, limit: int) -> list:
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM (
+                    SELECT
+                        a.id as appointment_id,
+                        a.client_name,
+                        a.client_contact,
+                        a.client_request,
+                        a.consultation_type,
+                        s.datetime,
+                        s.is_booked
+                    FROM appointments a
+                    JOIN schedule_slots s ON a.slot_id = s.id
+                    WHERE s.datetime < ?
+                    UNION ALL
+                    SELECT
+                        id as appointment_id,
+                        client_name,
+                        client_contact,
+                        client_request,
+                        consultation_type,
+                        slot_datetime as datetime,
+                        TRUE as is_booked
+                    FROM appointments_archive
+                )
+                ORDER BY datetime DESC
+                LIMIT ?
+            ''', (now, limit))
+            return [dict(appointment) for appointment in cursor.fetchall()]
+
+    def iter_appointments(self, start: str = None, end: str = None, batch_size: int = 500):
+        # Каждая часть читается по индексу в порядке даты без сортировки в памяти
+        queries = [
+            '''
+                SELECT id, slot_datetime, client_name, client_contact,
+                       consultation_type, client_request, created_at, 1
+                FROM appointments_archive
+                WHERE slot_datetime >= ? AND slot_datetime < ?
+                ORDER BY slot_datetime
+            ''',
+            '''
+                SELECT a.id, s.datetime, a.client_name, a.client_contact,
+                       a.consultation_type, a.client_request, a.created_at, 0
+                FROM schedule_slots s
+                JOIN appointments a ON a.slot_id = s.id
+                WHERE s.datetime >= ? AND s.datetime < ?
+                ORDER BY s.datetime
+            ''',
+        ]
+
+        with self.connection_factory() as conn:
+            for query in queries:
+                cursor = conn.execute(query, (start or '', end or '9999'))
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield tuple(row)
+
+    # Сводки для аналитики
+
+    @staticmethod
+    def _upsert_stats(cursor, table: str, key: str, rows: dict, accumulate: bool):
+        columns = ', '.join(STATS_COLUMNS)
+        placeholders = ', '.join('?' for _ in STATS_COLUMNS)
+        if accumulate:
+            conflict = 'DO UPDATE SET ' + ', '.join(f'{column} = {column} + excluded.{column}' for column in STATS_COLUMNS)
+        else:
+            conflict = 'DO UPDATE SET ' + ', '.join(f'{column} = excluded.{column}' for column in STATS_COLUMNS)
+        cursor.executemany(
+            f'INSERT INTO {table} ({key}, {columns}) VALUES (?, {placeholders}) ON CONFLICT({key}) {conflict}',
+            [(row_key, *(values.get(column, 0) for column in STATS_COLUMNS)) for row_key, values in rows.items()]
+        )
+
+    def apply_stats_deltas(self, deltas: dict):
+        weeks = {}
+        for day, values in deltas.items():
+            week = weeks.setdefault(week_start(day), {})
+            for column, delta in values.items():
+                week[column] = week.get(column, 0) + delta
+
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            self._upsert_stats(cursor, 'stats_daily', 'day', deltas, accumulate=True)
+            self._upsert_stats(cursor, 'stats_weekly', 'week', weeks, accumulate=True)
+            conn.commit()
+
+    def rebuild_stats(self, start_day: str = None, end_day: str = None) -> int:
+        start, end = start_day or '', end_day or '9999'
+        days = {}
+
+        def day_row(day):
+            return days.setdefault(day, dict.fromkeys(STATS_COLUMNS, 0))
+
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+
+            cursor.execute('''
+                SELECT substr(datetime, 1, 10) AS day, COUNT(*) AS slots, SUM(is_booked) AS booked
+                FROM (
+                    SELECT datetime, is_booked FROM schedule_slots WHERE datetime >= ? AND datetime < ?
+                    UNION ALL
+                    SELECT datetime, is_booked FROM schedule_slots_archive WHERE datetime >= ? AND datetime < ?
+                )
+                GROUP BY day
+            ''', (start, end, start, end))
+            for row in cursor.fetchall():
+                day_row(row['day']).update(slots=row['slots'], booked=row['booked'])
+
+            # Сессия не раньше записи, поэтому отбор по индексу времени слота не теряет записей периода.
+            # Время записи берется с точностью до минуты, как в приращениях сводок
+            cursor.execute('''
+                SELECT
+                    substr(created, 1, 10) AS day,
+                    COUNT(*) AS bookings,
+                    SUM(consultation_type = 'primary') AS primary_bookings,
+                    SUM(MAX(0, CAST(round((julianday(session) - julianday(created)) * 1440) AS INTEGER))) AS lead_minutes
+                FROM (
+                    SELECT strftime('%Y-%m-%d %H:%M', a.created_at, 'localtime') AS created, s.datetime AS session, a.consultation_type
+                    FROM appointments a
+                    JOIN schedule_slots s ON a.slot_id = s.id
+                    WHERE s.datetime >= ?
+                    UNION ALL
+                    SELECT strftime('%Y-%m-%d %H:%M', created_at, 'localtime'), slot_datetime, consultation_type
+                    FROM appointments_archive
+                    WHERE slot_datetime >= ?
+                )
+                WHERE created >= ? AND created < ?
+                GROUP BY day
+            ''', (start, start, start, end))
+            for row in cursor.fetchall():
+                day_row(row['day']).update(
+                    bookings=row['bookings'],
+                    primary_bookings=row['primary_bookings'],
+                    lead_minutes=row['lead_minutes']
+                )
+
+            cursor.execute('DELETE FROM stats_daily WHERE day >= ? AND day < ?', (start, end))
+            self._upsert_stats(cursor, 'stats_daily', 'day', days, accumulate=False)
+
+            week_from, week_to = stats_week_bounds(start_day, end_day)
+            cursor.execute(
+                f'SELECT day, {", ".join(STATS_COLUMNS)} FROM stats_daily WHERE day >= ? AND day < ?',
+                (week_from, week_to)
+            )
+            weeks = sum_stats_by_week(cursor.fetchall())
+            cursor.execute('DELETE FROM stats_weekly WHERE week >= ? AND week < ?', (week_from, week_to))
+            self._upsert_stats(cursor, 'stats_weekly', 'week', weeks, accumulate=False)
+            conn.commit()
+        return len(days)
+
+    def list_stats(self, period: str, start_day: str, end_day: str) -> list:
+        table, key = {'day': ('stats_daily', 'day'), 'week': ('stats_weekly', 'week')}[period]
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'SELECT {key} AS period, {", ".join(STATS_COLUMNS)} FROM {table} '
+                f'WHERE {key} >= ? AND {key} < ? ORDER BY {key}',
+                (start_day, end_day)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    # Напоминания
+
+    def add_reminder(self, client_chat_id: int, client_name: str, appointment_datetime: str,
+                     reminder_time: str):
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO reminders
+                (client_chat_id, client_name, appointment_datetime, reminder_time, is_sent)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (client_chat_id, client_name, appointment_datetime, reminder_time, False))
+            conn.commit()
+
+    def get_due_reminders(self, now_iso: str) -> list:
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, client_chat_id, client_name, appointment_datetime
+                FROM reminders
+                WHERE reminder_time <= ? AND is_sent = FALSE
+            ''', (now_iso,))
+            return [dict(reminder) for reminder in cursor.fetchall()]
+
+    def mark_reminder_sent(self, reminder_id: int):
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE reminders SET is_sent = TRUE WHERE id = ?', (reminder_id,))
+            conn.commit()
+
+    def expire_reminders(self, now: str) -> int:
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'UPDATE reminders SET is_sent = TRUE WHERE is_sent = FALSE AND appointment_datetime <= ?',
+                (now,)
+            )
+            conn.commit()
+            return cursor.rowcount
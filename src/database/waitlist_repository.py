@@ -0,0 +1,67 @@
+from .core import get_db_connection
+from src.utils.tracing import traced
+
+
+@traced()
+def join_waitlist(client_chat_id: int, client_name: str = None, preferred_date: str = "") -> bool:
+    """Добавляет клиента в лист ожидания (preferred_date пустая строка - любой день)"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''INSERT OR IGNORE INTO waitlist (client_chat_id, client_name, preferred_date) 
+                VALUES (?, ?, ?)''',
+                (client_chat_id, client_name, preferred_date)
+            )
+            conn.commit()
+            return True
+    except Exception:
+        return False
+
+
+@traced()
+def leave_waitlist(client_chat_id: int) -> bool:
+    """Удаляет все заявки клиента из листа ожидания"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM waitlist WHERE client_chat_id = ?', (client_chat_id,))
+            conn.commit()
+            return True
+    except Exception:
+        return False
+
+
+@traced()
+def get_waitlist_matches(slot_date: str, limit: int):
+    """Первые в очереди клиенты, ожидающие слот на дату slot_date.
+
+    Заявки не удаляются: сервис снимает их из очереди remove_waitlist_entry
+    только после успешной отправки уведомления.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, client_chat_id, client_name, preferred_date
+                FROM waitlist
+                WHERE preferred_date IN ('', ?)
+                ORDER BY id
+                LIMIT ?
+            ''', (slot_date, limit))
+            return [dict(entry) for entry in cursor.fetchall()]
+    except Exception:
+        return []
+
+
+@traced()
+def remove_waitlist_entry(entry_id: int) -> bool:
+    """Удаляет одну заявку из листа ожидания"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM waitlist WHERE id = ?', (entry_id,))
+            conn.commit()
+            return True
+    except Exception:
+        return False
@@ -0,0 +1,259 @@
+import logging
+import threading
+from datetime import datetime
+from src.config.tenants import TenantLocal
+from src.config.settings import settings
+from src.database import events
+from src.database.appointment_repository import get_upcoming_appointments
+from src.database.schedule_repository import get_future_slots, count_past_slots
+from src.utils.formatters import format_datetime
+
+
+def _now() -> str:
+    """Текущее время в формате слотов"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M')
+
+
+class AdminDashboard:
+    """Материализованная сводка для админа: будущие слоты, записи и ближайшая сессия.
+
+    Строится из базы один раз и дальше обновляется событиями репозиториев;
+    прошедшие слоты вычищаются при обращении, когда наступает время самого раннего из них.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._slots = {}
+        self._appointments = {}
+        self._past_slots_count = 0
+        self._next_expiry = None
+        self._loaded = False
+        # Счетчик событий: сводка, прочитанная из базы до события, не должна его затереть
+        self._changes = 0
+        self._appointments_text = None
+        self._slots_text = None
+
+    def load(self):
+        """Строит сводку из базы; если расписание изменилось во время чтения, читает заново"""
+        while True:
+            with self._lock:
+                changes = self._changes
+            slots = get_future_slots()
+            appointments = get_upcoming_appointments()
+            past_slots_count = count_past_slots()
+
+            with self._lock:
+                if changes != self._changes:
+                    continue
+                self._slots = {slot['id']: {'datetime': slot['datetime'], 'is_booked': bool(slot['is_booked'])} for slot in slots}
+                self._appointments = {appointment['slot_id']: dict(appointment) for appointment in appointments}
+                self._past_slots_count = past_slots_count
+                self._loaded = True
+                self._touch()
+                return
+
+    def _touch(self):
+        """Сбрасывает отрисованные сообщения после изменения"""
+        self._appointments_text = None
+        self._slots_text = None
+        self._next_expiry = min((slot['datetime'] for slot in self._slots.values()), default=None)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _drop_expired(self):
+        """Переносит наступившие слоты в счетчик прошедших"""
+        now = _now()
+        if self._next_expiry is None or self._next_expiry > now:
+            return
+        expired = [slot_id for slot_id, slot in self._slots.items() if slot['datetime'] <= now]
+        for slot_id in expired:
+            del self._slots[slot_id]
+            self._appointments.pop(slot_id, None)
+        self._past_slots_count += len(expired)
+        self._touch()
+
+    # Обработчики событий
+
+    def _on_slots_added(self, slots):
+        with self._lock:
+            self._changes += 1
+            if not self._loaded:
+                return
+            now = _now()
+            for slot in slots:
+                if slot['datetime'] > now:
+                    self._slots[slot['id']] = {'datetime': slot['datetime'], 'is_booked': False}
+                else:
+                    self._past_slots_count += 1
+            self._touch()
+
+    def _on_slot_deleted(self, slot):
+        with self._lock:
+            self._changes += 1
+            if not self._loaded:
+                return
+            if self._slots.pop(slot['id'], None) is None and slot['datetime'] <= _now():
+                self._past_slots_count = max(0, self._past_slots_count - 1)
+            self._touch()
+
+    def _on_appointment_booked(self, appointment):
+        with self._lock:
+            self._changes += 1
+            if not self._loaded or appointment['slot_id'] not in self._slots:
+                return
+            self._slots[appointment['slot_id']]['is_booked'] = True
+            self._appointments[appointment['slot_id']] = dict(appointment)
+            self._touch()
+
+    def _on_appointment_cancelled(self, appointment):
+        with self._lock:
+            self._changes += 1
+            if not self._loaded:
+                return
+            self._appointments.pop(appointment['slot_id'], None)
+            if appointment['slot_id'] in self._slots:
+                self._slots[appointment['slot_id']]['is_booked'] = False
+            self._touch()
+
+    def _on_appointment_rescheduled(self, appointment, old_slot):
+        with self._lock:
+            self._changes += 1
+            if not self._loaded:
+                return
+            self._appointments.pop(old_slot['id'], None)
+            if old_slot['id'] in self._slots:
+                self._slots[old_slot['id']]['is_booked'] = False
+            if appointment['slot_id'] in self._slots:
+                self._slots[appointment['slot_id']]['is_booked'] = True
+                self._appointments[appointment['slot_id']] = dict(appointment)
+            self._touch()
+
+    # Представления
+
+    def get_next_session(self):
+        """Ближайшая предстоящая запись или None"""
+        with self._lock:
+            self._ensure_loaded()
+            self._drop_expired()
+            return min(self._appointments.values(), key=lambda appointment: appointment['datetime'], default=None)
+
+    def get_counts(self) -> dict:
+        """Количество свободных, занятых и прошедших слотов"""
+        with self._lock:
+            self._ensure_loaded()
+            self._drop_expired()
+            booked = sum(1 for slot in self._slots.values() if slot['is_booked'])
+            return {'free': len(self._slots) - booked, 'booked': booked, 'past': self._past_slots_count}
+
+    def render_appointments(self) -> str:
+        """Сообщение «Ближайшие записи»"""
+        with self._lock:
+            self._check_consistency()
+            self._ensure_loaded()
+            self._drop_expired()
+            if self._appointments_text is None:
+                self._appointments_text = self._build_appointments_text()
+            return self._appointments_text
+
+    def render_slots(self) -> str:
+        """Сообщение «Мои слоты»"""
+        with self._lock:
+            self._check_consistency()
+            self._ensure_loaded()
+            self._drop_expired()
+            if self._slots_text is None:
+                self._slots_text = self._build_slots_text()
+            return self._slots_text
+
+    def _build_appointments_text(self) -> str:
+        appointments = sorted(self._appointments.values(), key=lambda appointment: appointment['datetime'])
+        if not appointments:
+            return "📋 **Ближайшие записи**\n\nНа данный момент нет предстоящих записей."
+
+        message = "📋 **Ближайшие записи:**\n\n"
+        message += f"⏭ **Ближайшая сессия:** {format_datetime(appointments[0]['datetime'])}\n\n"
+        for appointment in appointments:
+            message += (
+                f"👤 **{appointment['client_name']}**\n"
+                f"📅 {format_datetime(appointment['datetime'])}\n"
+                f"📞 {appointment['client_contact']}\n"
+                f"📝 {appointment['client_request']}\n"
+                f"🎯 {'🆕 Первичная' if appointment.get('consultation_type') == 'primary' else '🔄 Повторная'}\n"
+                f"🔄 🟢 Предстоящая\n"
+                f"――――――――――――――――――――\n"
+            )
+        message += f"\n📊 **Всего записей:** {len(appointments)}"
+        return message
+
+    def _build_slots_text(self) -> str:
+        if not self._slots:
+            return "👀 **Мои слоты**\n\nНа данный момент нет активных слотов."
+
+        free_slots = []
+        booked_slots = []
+        for slot in sorted(self._slots.values(), key=lambda slot: slot['datetime']):
+            formatted_date = format_datetime(slot['datetime'])
+            if slot['is_booked']:
+                booked_slots.append(f"• {formatted_date} 🔴 (Занят)")
+            else:
+                free_slots.append(f"• {formatted_date} 🟢 (Свободен)")
+
+        message = "👀 **Мои активные слоты:**\n\n"
+        if free_slots:
+            message += "🟢 **Свободные слоты:**\n" + "\n".join(free_slots) + "\n\n"
+        if booked_slots:
+            message += "🔴 **Занятые слоты:**\n" + "\n".join(booked_slots)
+
+        message += f"\n📊 **Итого:** {len(free_slots)} свободных, {len(booked_slots)} занятых"
+        if self._past_slots_count:
+            message += f"\n\n📚 **В архиве:** {self._past_slots_count} прошедших слотов"
+        return message
+
+    # Отладка
+
+    def find_inconsistencies(self) -> list:
+        """Сравнивает сводку с базой; возвращает список расхождений"""
+        with self._lock:
+            self._ensure_loaded()
+            self._drop_expired()
+            model_slots = {slot_id: (slot['datetime'], slot['is_booked']) for slot_id, slot in self._slots.items()}
+            model_appointments = {
+                slot_id: appointment['appointment_id'] for slot_id, appointment in self._appointments.items()
+            }
+            model_past = self._past_slots_count
+
+        db_slots = {slot['id']: (slot['datetime'], bool(slot['is_booked'])) for slot in get_future_slots()}
+        db_appointments = {
+            appointment['slot_id']: appointment['appointment_id'] for appointment in get_upcoming_appointments()
+        }
+
+        problems = []
+        if model_slots != db_slots:
+            problems.append(f"слоты: в сводке {len(model_slots)}, в базе {len(db_slots)}")
+        if model_appointments != db_appointments:
+            problems.append(f"записи: в сводке {len(model_appointments)}, в базе {len(db_appointments)}")
+        db_past = count_past_slots()
+        if model_past != db_past:
+            problems.append(f"прошедшие слоты: в сводке {model_past}, в базе {db_past}")
+        return problems
+
+    def _check_consistency(self):
+        """В режиме отладки сверяет сводку с базой и перестраивает ее при расхождении"""
+        if not settings.DEBUG or not self._loaded:
+            return
+        problems = self.find_inconsistencies()
+        if problems:
+            self.logger.warning(f"Сводка админа разошлась с базой ({'; '.join(problems)}), перестраиваю")
+            self.load()
+
+
+admin_dashboard = TenantLocal(AdminDashboard, key='admin_dashboard')
+
+events.subscribe(events.SLOTS_ADDED, admin_dashboard.bind('_on_slots_added'))
+events.subscribe(events.SLOT_DELETED, admin_dashboard.bind('_on_slot_deleted'))
+events.subscribe(events.APPOINTMENT_BOOKED, admin_dashboard.bind('_on_appointment_booked'))
+events.subscribe(events.APPOINTMENT_CANCELLED, admin_dashboard.bind('_on_appointment_cancelled'))
+events.subscribe(events.APPOINTMENT_RESCHEDULED, admin_dashboard.bind('_on_appointment_rescheduled'))
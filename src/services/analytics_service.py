@@ -0,0 +1,138 @@
+import logging
+from datetime import datetime, timedelta
+from src.database import events
+from src.database.analytics_repository import apply_stats_deltas, rebuild_stats, get_weekly_stats
+from src.database.storage.base import STATS_COLUMNS, week_start
+from src.utils.intervals import to_minutes
+
+REPORT_WEEKS = 8
+
+
+def _lead_minutes(created_at: str, session: str) -> int:
+    """Минуты от записи до начала сессии"""
+    return max(0, to_minutes(session) - to_minutes(created_at[:16]))
+
+
+def _percent(part: int, total: int) -> str:
+    return f"{round(part * 100 / total)}%" if total else "—"
+
+
+class AnalyticsService:
+    """Поддерживает сводки аналитики в актуальном состоянии и строит по ним отчет.
+
+    Каждое изменение расписания превращается в приращения дневной и недельной
+    сводок, поэтому отчет читает только сводки, а не всю историю записей.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _apply(self, deltas: dict):
+        if not apply_stats_deltas(deltas):
+            self.logger.error("Не удалось обновить сводки аналитики, исправит пересчет дня или rebuild_stats.py")
+
+    # Обработчики событий
+
+    def _on_slots_added(self, slots):
+        deltas = {}
+        for slot in slots:
+            day = deltas.setdefault(slot['datetime'][:10], {'slots': 0})
+            day['slots'] += 1
+        self._apply(deltas)
+
+    def _on_slot_deleted(self, slot):
+        self._apply({slot['datetime'][:10]: {'slots': -1}})
+
+    def _on_appointment_booked(self, appointment):
+        # Время записи из хранилища: пересчет сводок считает по нему же
+        created_at = appointment.get('created_at') or datetime.now().strftime('%Y-%m-%d %H:%M')
+        deltas = {appointment['datetime'][:10]: {'booked': 1}}
+        booking_day = deltas.setdefault(created_at[:10], {})
+        booking_day.update(
+            bookings=1,
+            primary_bookings=int(appointment.get('consultation_type') == 'primary'),
+            lead_minutes=_lead_minutes(created_at, appointment['datetime'])
+        )
+        self._apply(deltas)
+
+    def _on_appointment_cancelled(self, appointment):
+        deltas = {appointment['datetime'][:10]: {'booked': -1}}
+        created_at = appointment.get('created_at')
+        if created_at:
+            booking_day = deltas.setdefault(created_at[:10], {})
+            booking_day.update(
+                bookings=-1,
+                primary_bookings=-int(appointment.get('consultation_type') == 'primary'),
+                lead_minutes=-_lead_minutes(created_at, appointment['datetime'])
+            )
+        self._apply(deltas)
+
+    def _on_appointment_rescheduled(self, appointment, old_slot):
+        deltas = {old_slot['datetime'][:10]: {'booked': -1}}
+        new_day = deltas.setdefault(appointment['datetime'][:10], {'booked': 0})
+        new_day['booked'] += 1
+        created_at = appointment.get('created_at')
+        if created_at:
+            booking_day = deltas.setdefault(created_at[:10], {})
+            booking_day['lead_minutes'] = booking_day.get('lead_minutes', 0) + (
+                _lead_minutes(created_at, appointment['datetime']) - _lead_minutes(created_at, old_slot['datetime'])
+            )
+        self._apply(deltas)
+
+    # Смена дня и отчет
+
+    def close_day(self, day: str = None):
+        """Пересчитывает сводку завершившегося дня по исходным данным, исправляя возможные расхождения"""
+        if day is None:
+            day = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        if rebuild_stats(day, next_day) is None:
+            self.logger.error(f"Не удалось пересчитать сводку за {day}")
+
+    def build_report(self, weeks: int = REPORT_WEEKS) -> str:
+        """Отчет по недельным сводкам за последние недели"""
+        current_week = week_start(datetime.now().strftime('%Y-%m-%d'))
+        first_week = (datetime.strptime(current_week, '%Y-%m-%d') - timedelta(weeks=weeks - 1)).strftime('%Y-%m-%d')
+        end_week = (datetime.strptime(current_week, '%Y-%m-%d') + timedelta(weeks=1)).strftime('%Y-%m-%d')
+        rows = get_weekly_stats(first_week, end_week)
+        if not rows:
+            return f"📈 **Статистика**\n\nЗа последние {weeks} недель нет ни слотов, ни записей."
+
+        totals = {column: sum(row[column] for row in rows) for column in STATS_COLUMNS}
+        repeat = totals['bookings'] - totals['primary_bookings']
+        message = (
+            f"📈 **Статистика за {weeks} недель**\n\n"
+            f"📅 Загрузка: {totals['booked']} из {totals['slots']} слотов ({_percent(totals['booked'], totals['slots'])})\n"
+            f"📝 Записей: {totals['bookings']} "
+            f"(🆕 первичных {totals['primary_bookings']} — {_percent(totals['primary_bookings'], totals['bookings'])}, "
+            f"🔄 повторных {repeat} — {_percent(repeat, totals['bookings'])})\n"
+        )
+        if totals['bookings']:
+            lead_days = totals['lead_minutes'] / totals['bookings'] / 1440
+            message += f"⏳ Запись в среднем за {lead_days:.1f} дн. до сессии\n"
+
+        message += "\n**По неделям** (загрузка, новые записи):\n"
+        previous = None
+        for row in rows:
+            week = datetime.strptime(row['period'], '%Y-%m-%d')
+            utilization = row['booked'] / row['slots'] if row['slots'] else None
+            trend = ''
+            if utilization is not None and previous is not None:
+                trend = ' ▲' if utilization > previous else ' ▼' if utilization < previous else ''
+            message += (
+                f"{week.strftime('%d.%m')}–{(week + timedelta(days=6)).strftime('%d.%m')}: "
+                f"{_percent(row['booked'], row['slots'])} ({row['booked']}/{row['slots']}){trend}, "
+                f"{row['bookings']}\n"
+            )
+            if utilization is not None:
+                previous = utilization
+        return message
+
+
+analytics_service = AnalyticsService()
+
+events.subscribe(events.SLOTS_ADDED, analytics_service._on_slots_added)
+events.subscribe(events.SLOT_DELETED, analytics_service._on_slot_deleted)
+events.subscribe(events.APPOINTMENT_BOOKED, analytics_service._on_appointment_booked)
+events.subscribe(events.APPOINTMENT_CANCELLED, analytics_service._on_appointment_cancelled)
+events.subscribe(events.APPOINTMENT_RESCHEDULED, analytics_service._on_appointment_rescheduled)
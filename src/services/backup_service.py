@@ -0,0 +1,148 @@
+import asyncio
+import glob
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from src.config.settings import settings
+from src.config.tenants import current_tenant
+from src.database.backup_repository import backup_database, verify_backup, is_backup_supported
+from src.utils.tracing import tracer
+
+CHUNK_SIZE = 1024 * 1024
+STAMP_FORMAT = '%Y%m%d-%H%M%S'
+# Точный шаблон метки, чтобы снимки психолога anna не смешивались со снимками anna-b
+STAMP_GLOB = '[0-9]' * 8 + '-' + '[0-9]' * 6
+
+
+def _file_digest(fileobj) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupService:
+    """Резервные копии базы психолога без остановки бота.
+
+    Снимок снимается онлайн-API SQLite короткими шагами, проверяется
+    integrity_check, сжимается и сверяется с исходной копией по SHA-256.
+    В каталоге BACKUP_DIR хранятся BACKUP_KEEP последних снимков каждого психолога.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._running = set()
+
+    def _prefix(self) -> str:
+        return os.path.join(settings.BACKUP_DIR, f'{current_tenant().name}-')
+
+    def _glob(self, suffix: str) -> list:
+        return sorted(glob.glob(f'{glob.escape(self._prefix())}{STAMP_GLOB}{suffix}'))
+
+    def list_snapshots(self) -> list:
+        """Готовые снимки текущего психолога, от старых к новым"""
+        return self._glob('.db.gz')
+
+    def latest_age(self):
+        """Сколько секунд назад сделан последний снимок, None - снимков нет"""
+        snapshots = self.list_snapshots()
+        if not snapshots:
+            return None
+        return time.time() - os.path.getmtime(snapshots[-1])
+
+    def _rotate(self):
+        """Удаляет старые снимки сверх BACKUP_KEEP и остатки прерванных попыток"""
+        snapshots = self.list_snapshots()
+        stale = snapshots[:-settings.BACKUP_KEEP] if settings.BACKUP_KEEP > 0 else []
+        stale += self._glob('.db.tmp') + self._glob('.db.gz.part')
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError as e:
+                self.logger.warning(f"Не удалось удалить старый снимок {path}: {e}")
+
+    def _create_snapshot(self) -> dict:
+        """Копирует, проверяет и сжимает базу; выполняется в отдельном потоке"""
+        os.makedirs(settings.BACKUP_DIR, exist_ok=True)
+        # Остатки прерванной попытки удаляются до новой, чтобы не попасть в ротацию
+        self._rotate()
+        base = f"{self._prefix()}{datetime.now().strftime(STAMP_FORMAT)}"
+        raw_path, part_path, final_path = f'{base}.db.tmp', f'{base}.db.gz.part', f'{base}.db.gz'
+
+        try:
+            stats = backup_database(raw_path, settings.BACKUP_PAGES_PER_STEP, settings.BACKUP_STEP_PAUSE)
+            problems = verify_backup(raw_path)
+            if problems:
+                raise RuntimeError(f"снимок не прошел проверку: {'; '.join(problems[:5])}")
+
+            with open(raw_path, 'rb') as raw:
+                raw_digest = _file_digest(raw)
+                raw.seek(0)
+                with gzip.open(part_path, 'wb', compresslevel=6) as compressed:
+                    shutil.copyfileobj(raw, compressed, CHUNK_SIZE)
+            with gzip.open(part_path, 'rb') as compressed:
+                if _file_digest(compressed) != raw_digest:
+                    raise RuntimeError("сжатый снимок не совпадает с копией базы")
+
+            stats['size'] = os.path.getsize(raw_path)
+            stats['compressed_size'] = os.path.getsize(part_path)
+            os.replace(part_path, final_path)
+        finally:
+            for path in (raw_path, part_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        stats['path'] = final_path
+        stats['throughput'] = stats['size'] / stats['duration'] if stats['duration'] else 0.0
+        self._rotate()
+        return stats
+
+    async def run(self, force: bool = True):
+        """Делает снимок базы текущего психолога и возвращает его показатели.
+
+        Без force снимок делается, только если последний старше BACKUP_INTERVAL.
+        None - снимок не нужен, уже идет или не удался (ошибка пишется в лог).
+        """
+        tenant = current_tenant().name
+        if not is_backup_supported() or tenant in self._running:
+            return None
+        if not force:
+            age = self.latest_age()
+            if age is not None and age < settings.BACKUP_INTERVAL:
+                return None
+
+        self._running.add(tenant)
+        try:
+            with tracer.span('job.backup', root=True):
+                stats = await asyncio.to_thread(self._create_snapshot)
+            self.logger.info(
+                f"Резервная копия {stats['path']}: {stats['size'] / 1024 / 1024:.1f} МБ за {stats['duration']:.2f} с "
+                f"({stats['throughput'] / 1024 / 1024:.1f} МБ/с), "
+                f"самое долгое ожидание записи {stats['max_write_wait'] * 1000:.1f} мс"
+            )
+            return stats
+        except Exception as e:
+            self.logger.error(f"Ошибка резервного копирования базы: {e}")
+            return None
+        finally:
+            self._running.discard(tenant)
+
+    def format_report(self, stats: dict) -> str:
+        """Сообщение админу о готовом снимке"""
+        restarts = f"\n🔁 Перезапусков из-за записи: {stats['restarts']}" if stats['restarts'] else ""
+        return (
+            "💾 **Резервная копия готова**\n\n"
+            f"📁 `{os.path.basename(stats['path'])}`\n"
+            f"📦 {stats['size'] / 1024 / 1024:.2f} МБ → {stats['compressed_size'] / 1024 / 1024:.2f} МБ\n"
+            f"⏱ {stats['duration']:.2f} с, {stats['throughput'] / 1024 / 1024:.1f} МБ/с\n"
+            f"🔒 Самое долгое ожидание записи: {stats['max_write_wait'] * 1000:.1f} мс"
+            f"{restarts}\n"
+            f"🗂 Хранится снимков: {len(self.list_snapshots())}"
+        )
+
+
+backup_service = BackupService()
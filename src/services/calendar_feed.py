@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime as format_http_date, parsedate_to_datetime
+from src.config.tenants import TenantLocal, current_tenant, use_tenant
+from src.config.settings import settings
+from src.database import events
+from src.database.appointment_repository import get_upcoming_appointments
+
+CALENDAR_NAME = 'Консультации'
+
+
+def _escape(value) -> str:
+    """Экранирование текста по RFC 5545"""
+    return (
+        str(value or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line: str) -> str:
+    """Переносит строку длиннее 75 байт по правилам iCalendar"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = char
+            limit = 74
+        else:
+            current += char
+    parts.append(current)
+    return '\r\n '.join(parts)
+
+
+def _build_event(appointment) -> str:
+    """Собирает VEVENT для записи"""
+    # Время слотов - местное время сервера; в календарь уходит UTC, чтобы клиенты не сдвигали события
+    start = datetime.strptime(appointment['datetime'], '%Y-%m-%d %H:%M').astimezone(timezone.utc)
+    duration = appointment.get('duration_minutes') or settings.SESSION_DURATION_MINUTES
+    end = start + timedelta(minutes=duration)
+    consultation = 'Первичная' if appointment.get('consultation_type') == 'primary' else 'Повторная'
+    description = (
+        f"Контакт: {appointment.get('client_contact', '')}\n"
+        f"Тип: {consultation}\n"
+        f"Запрос: {appointment.get('client_request', '')}"
+    )
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:appointment-{appointment['appointment_id']}@psychologist-bot",
+        f"DTSTAMP:{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART:{start.strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTEND:{end.strftime('%Y%m%dT%H%M%SZ')}",
+        f"SUMMARY:{_escape('Консультация: ' + appointment.get('client_name', ''))}",
+        f"DESCRIPTION:{_escape(description)}",
+        'END:VEVENT',
+    ]
+    return '\r\n'.join(_fold(line) for line in lines)
+
+
+class CalendarFeed:
+    """iCalendar-представление будущих записей, обновляемое по событиям"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._events = {}
+        self._loaded = False
+        self._body = None
+        self._etag = None
+        self._last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self._next_expiry = None
+        self._server = None
+
+    def load(self):
+        """Однократно строит представление из базы"""
+        self._events = {
+            appointment['slot_id']: (appointment['datetime'], _build_event(appointment))
+            for appointment in get_upcoming_appointments()
+        }
+        self._loaded = True
+        self._touch()
+
+    def _touch(self):
+        """Сбрасывает отрисованный файл после изменения"""
+        self._body = None
+        self._last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def _on_appointment_booked(self, appointment):
+        if self._loaded:
+            self._events[appointment['slot_id']] = (appointment['datetime'], _build_event(appointment))
+            self._touch()
+
+    def _on_appointment_cancelled(self, appointment):
+        if self._loaded and self._events.pop(appointment['slot_id'], None):
+            self._touch()
+
+    def _on_appointment_rescheduled(self, appointment, old_slot):
+        if self._loaded:
+            self._events.pop(old_slot['id'], None)
+            self._events[appointment['slot_id']] = (appointment['datetime'], _build_event(appointment))
+            self._touch()
+
+    def _on_slot_deleted(self, slot):
+        if self._loaded and self._events.pop(slot['id'], None):
+            self._touch()
+
+    def _drop_expired(self):
+        """Убирает прошедшие записи, когда наступает время самой ранней из них"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M')
+        if self._next_expiry is None or self._next_expiry >= now:
+            return
+        expired = [slot_id for slot_id, (slot_datetime, _) in self._events.items() if slot_datetime <= now]
+        for slot_id in expired:
+            del self._events[slot_id]
+        if expired:
+            self._touch()
+
+    def get_feed(self):
+        """Возвращает (содержимое, ETag, время изменения) файла календаря"""
+        if not self._loaded:
+            self.load()
+        self._drop_expired()
+
+        if self._body is None:
+            sorted_events = sorted(self._events.values())
+            lines = [
+                'BEGIN:VCALENDAR',
+                'VERSION:2.0',
+                'PRODID:-//psychologist-bot//sessions//RU',
+                'CALSCALE:GREGORIAN',
+                _fold(f'X-WR-CALNAME:{CALENDAR_NAME}'),
+            ]
+            lines.extend(event for _, event in sorted_events)
+            lines.append('END:VCALENDAR')
+            self._body = ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+            self._etag = '"' + hashlib.sha1(self._body).hexdigest()[:20] + '"'
+            self._next_expiry = sorted_events[0][0] if sorted_events else None
+
+        return self._body, self._etag, self._last_modified
+
+    def is_not_modified(self, if_none_match: str = None, if_modified_since: str = None) -> bool:
+        """Проверяет условные заголовки запроса клиента календаря"""
+        _, etag, last_modified = self.get_feed()
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since) >= last_modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def start_http_server(self):
+        """Запускает локальный HTTP-эндпоинт календаря, если он настроен"""
+        if not settings.CALENDAR_HTTP_PORT or not settings.CALENDAR_FEED_TOKEN:
+            return
+        await asyncio.to_thread(self.load)
+        tenant = current_tenant()
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            with use_tenant(tenant):
+                await self._handle_http(reader, writer)
+
+        self._server = await asyncio.start_server(
+            handle, settings.CALENDAR_HTTP_HOST, settings.CALENDAR_HTTP_PORT
+        )
+        self.logger.info(
+            f"Календарь доступен по адресу http://{settings.CALENDAR_HTTP_HOST}:"
+            f"{settings.CALENDAR_HTTP_PORT}/calendar/<token>.ics"
+        )
+
+    async def stop_http_server(self):
+        """Останавливает HTTP-эндпоинт календаря"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Минимальный обработчик HTTP/1.1 для GET и HEAD запросов календаря"""
+        try:
+            request_line = (await asyncio.wait_for(reader.readline(), timeout=10)).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await asyncio.wait_for(reader.readline(), timeout=10)).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if len(request_line) < 2 or request_line[0] not in ('GET', 'HEAD'):
+                await self._write_response(writer, '405 Method Not Allowed')
+                return
+            if request_line[1].split('?')[0] != f'/calendar/{settings.CALENDAR_FEED_TOKEN}.ics':
+                await self._write_response(writer, '404 Not Found')
+                return
+
+            body, etag, last_modified = self.get_feed()
+            response_headers = {
+                'ETag': etag,
+                'Last-Modified': format_http_date(last_modified, usegmt=True),
+                'Cache-Control': 'no-cache',
+            }
+            if self.is_not_modified(headers.get('if-none-match'), headers.get('if-modified-since')):
+                await self._write_response(writer, '304 Not Modified', response_headers)
+                return
+
+            response_headers['Content-Type'] = 'text/calendar; charset=utf-8'
+            await self._write_response(
+                writer, '200 OK', response_headers,
+                body if request_line[0] == 'GET' else b'', content_length=len(body)
+            )
+        except Exception as e:
+            self.logger.warning(f"Ошибка обработки запроса календаря: {e}")
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: str, headers: dict = None,
+                              body: bytes = b'', content_length: int = None):
+        """Отправляет HTTP-ответ и закрывает соединение"""
+        headers = dict(headers or {})
+        headers['Content-Length'] = str(len(body) if content_length is None else content_length)
+        headers['Connection'] = 'close'
+        head = f'HTTP/1.1 {status}\r\n' + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
+
+
+calendar_feed = TenantLocal(CalendarFeed, key='calendar_feed')
+
+events.subscribe(events.APPOINTMENT_BOOKED, calendar_feed.bind('_on_appointment_booked'))
+events.subscribe(events.APPOINTMENT_CANCELLED, calendar_feed.bind('_on_appointment_cancelled'))
+events.subscribe(events.APPOINTMENT_RESCHEDULED, calendar_feed.bind('_on_appointment_rescheduled'))
+events.subscribe(events.SLOT_DELETED, calendar_feed.bind('_on_slot_deleted'))
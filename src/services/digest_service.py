@@ -0,0 +1,79 @@
+import logging
+from datetime import datetime, timedelta, time
+from telegram import Bot
+from src.config.tenants import TenantLocal
+from src.config.settings import settings
+from src.database.appointment_repository import get_appointments_between
+
+
+class DigestService:
+    """Ежедневная сводка записей на следующий день для администраторов"""
+
+    def __init__(self):
+        self.bot = None
+        self.logger = logging.getLogger(__name__)
+
+    def set_bot(self, bot: Bot):
+        """Устанавливает бота для отправки сообщений"""
+        self.bot = bot
+
+    def get_send_time(self) -> time:
+        """Время отправки сводки в локальном часовом поясе"""
+        hours, minutes = (int(part) for part in settings.ADMIN_DIGEST_TIME.split(':'))
+        return time(hour=hours, minute=minutes, tzinfo=datetime.now().astimezone().tzinfo)
+
+    def build_digest(self, day: datetime) -> str:
+        """Собирает текст сводки на указанный день"""
+        start = day.strftime('%Y-%m-%d 00:00')
+        end = (day + timedelta(days=1)).strftime('%Y-%m-%d 00:00')
+        appointments = get_appointments_between(start, end)
+
+        header = f"🗓 **Записи на {day.strftime('%d.%m.%Y')}**\n\n"
+        if not appointments:
+            return header + "Записей нет."
+
+        message = header
+        for appointment in appointments:
+            session_time = appointment['datetime'][-5:]
+            consultation = '🆕 Первичная' if appointment['consultation_type'] == 'primary' else '🔄 Повторная'
+            message += (
+                f"🕐 **{session_time}** — {appointment['client_name']}\n"
+                f"📞 {appointment['client_contact']}\n"
+                f"🎯 {consultation}\n"
+                f"――――――――――――――――――――\n"
+            )
+        message += f"\n📊 **Всего записей:** {len(appointments)}"
+        return message
+
+    async def send_daily_digest(self) -> bool:
+        """Отправляет каждому администратору одну сводку на завтра; True, если все ее получили"""
+        if not self.bot:
+            return False
+
+        try:
+            message = self.build_digest(datetime.now() + timedelta(days=1))
+        except Exception as e:
+            self.logger.error(f"Ошибка формирования сводки: {e}")
+            return False
+
+        delivered = True
+        for admin_id in settings.ADMIN_IDS:
+            try:
+                await self.bot.send_message(
+                    chat_id=admin_id,
+                    text=message,
+                    parse_mode='Markdown'
+                )
+            except Exception as e:
+                self.logger.error(f"Не удалось отправить сводку администратору {admin_id}: {e}")
+                delivered = False
+        return delivered
+
+
+digest_service = TenantLocal(DigestService, key='digest_service')
+
+
+def init_digest_service(bot: Bot):
+    """Инициализирует сервис ежедневной сводки"""
+    digest_service.set_bot(bot)
+    return digest_service
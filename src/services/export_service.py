@@ -0,0 +1,75 @@
+import csv
+import os
+import tempfile
+from src.database.appointment_repository import EXPORT_COLUMNS, iter_appointments_for_export
+
+EXPORT_HEADERS = [
+    'ID записи', 'Дата и время', 'Клиент', 'Контакт',
+    'Тип консультации', 'Запрос', 'Создана', 'В архиве'
+]
+
+EXPORT_FORMATS = ['csv', 'xlsx']
+
+
+def _format_row(row):
+    """Приводит строку выгрузки к читаемому виду"""
+    row = list(row)
+    row[EXPORT_COLUMNS.index('consultation_type')] = (
+        'Первичная' if row[EXPORT_COLUMNS.index('consultation_type')] == 'primary' else 'Повторная'
+    )
+    row[EXPORT_COLUMNS.index('is_archived')] = 'да' if row[EXPORT_COLUMNS.index('is_archived')] else 'нет'
+    return row
+
+
+def is_xlsx_available() -> bool:
+    """Установлен ли openpyxl для выгрузки в XLSX"""
+    try:
+        import openpyxl  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _write_csv(rows, path: str) -> int:
+    """Потоково пишет строки в CSV и возвращает их количество"""
+    count = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as export_file:
+        writer = csv.writer(export_file)
+        writer.writerow(EXPORT_HEADERS)
+        for row in rows:
+            writer.writerow(_format_row(row))
+            count += 1
+    return count
+
+
+def _write_xlsx(rows, path: str) -> int:
+    """Потоково пишет строки в XLSX (режим write_only) и возвращает их количество"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Записи')
+    sheet.append(EXPORT_HEADERS)
+    count = 0
+    for row in rows:
+        sheet.append(_format_row(row))
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def export_appointments(export_format: str = 'csv', start_datetime: str = None, end_datetime: str = None):
+    """Выгружает записи во временный файл и возвращает пару (путь, количество строк).
+
+    Файл удаляет вызывающий код после отправки.
+    """
+    writer = _write_xlsx if export_format == 'xlsx' else _write_csv
+    fd, path = tempfile.mkstemp(prefix='appointments_', suffix=f'.{export_format}')
+    os.close(fd)
+
+    try:
+        count = writer(iter_appointments_for_export(start_datetime, end_datetime), path)
+    except Exception:
+        os.remove(path)
+        raise
+
+    return path, count
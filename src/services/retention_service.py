@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from src.config.settings import settings
+from src.database.archive_repository import archive_expired_data, is_archive_supported
+from src.utils.tracing import tracer
+
+
+class RetentionService:
+    """Фоновый перенос прошедших данных в архивные таблицы"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self):
+        """Архивирует данные старше ARCHIVE_AFTER_DAYS, не блокируя цикл событий"""
+        if not is_archive_supported():
+            return
+        cutoff = (datetime.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)).strftime('%Y-%m-%d %H:%M')
+        try:
+            with tracer.span('job.retention', root=True):
+                moved = await asyncio.to_thread(
+                    archive_expired_data,
+                    cutoff,
+                    settings.RETENTION_BATCH_SIZE,
+                    settings.RETENTION_VACUUM_PAGES
+                )
+            if any(moved.values()):
+                self.logger.info(
+                    f"Архивировано слотов: {moved['slots']}, напоминаний: {moved['reminders']}, "
+                    f"освобождено страниц: {moved['vacuumed_pages']}"
+                )
+        except Exception as e:
+            self.logger.error(f"Ошибка архивации данных: {e}")
+
+
+retention_service = RetentionService()
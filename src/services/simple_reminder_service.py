@@ -17,7 +17,7 @@ class SimpleReminderService:
     async def send_new_appointment_notification(self, client_name: str, appointment_datetime: str, 
                                               client_contact: str, client_request: str):
         """Отправляет уведомление админам о новой записи"""
-        if not self.bot:
+        if not self.bot or not settings.ADMIN_REALTIME_NOTIFICATIONS:
             return
             
         try:
@@ -0,0 +1,66 @@
+import threading
+from src.config.tenants import TenantLocal
+from src.database import events
+from src.database.schedule_repository import get_month_availability
+
+
+class SlotCalendar:
+    """Помесячная сводка слотов по дням для календаря админа.
+
+    Месяц считается одним сгруппированным запросом и хранится до первого
+    изменения расписания в этом месяце.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._months = {}
+        self._version = 0
+
+    def get_month(self, month: str) -> dict:
+        """Свободные и занятые слоты по дням месяца 'ГГГГ-ММ'"""
+        with self._lock:
+            days = self._months.get(month)
+            version = self._version
+        if days is not None:
+            return days
+
+        days = get_month_availability(month)
+        with self._lock:
+            # Расписание могло измениться, пока шел запрос: такой результат не кэшируем
+            if version == self._version:
+                self._months[month] = days
+        return days
+
+    def clear(self):
+        with self._lock:
+            self._months.clear()
+            self._version += 1
+
+    def _invalidate(self, *datetimes):
+        with self._lock:
+            for value in datetimes:
+                self._months.pop(value[:7], None)
+            self._version += 1
+
+    # Обработчики событий
+
+    def _on_slots_added(self, slots):
+        self._invalidate(*(slot['datetime'] for slot in slots))
+
+    def _on_slot_deleted(self, slot):
+        self._invalidate(slot['datetime'])
+
+    def _on_appointment_changed(self, appointment):
+        self._invalidate(appointment['datetime'])
+
+    def _on_appointment_rescheduled(self, appointment, old_slot):
+        self._invalidate(appointment['datetime'], old_slot['datetime'])
+
+
+slot_calendar = TenantLocal(SlotCalendar, key='slot_calendar')
+
+events.subscribe(events.SLOTS_ADDED, slot_calendar.bind('_on_slots_added'))
+events.subscribe(events.SLOT_DELETED, slot_calendar.bind('_on_slot_deleted'))
+events.subscribe(events.APPOINTMENT_BOOKED, slot_calendar.bind('_on_appointment_changed'))
+events.subscribe(events.APPOINTMENT_CANCELLED, slot_calendar.bind('_on_appointment_changed'))
+events.subscribe(events.APPOINTMENT_RESCHEDULED, slot_calendar.bind('_on_appointment_rescheduled'))
@@ -0,0 +1,96 @@
+import csv
+from datetime import datetime, timezone
+from src.database.schedule_repository import add_slots_bulk
+from src.utils.validators import is_valid_datetime, is_future_datetime
+from src.utils.intervals import normalize_slot
+
+SLOT_FORMAT = '%Y-%m-%d %H:%M'
+IMPORT_CHUNK_SIZE = 500
+INVALID_EXAMPLES_LIMIT = 5
+
+
+def _iter_csv_values(lines):
+    """Значения слотов из CSV: «ГГГГ-ММ-ДД ЧЧ:ММ» в первой колонке
+    или дата и время в двух первых колонках"""
+    first_line = next(lines, None)
+    if first_line is None:
+        return
+    delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+
+    def rows():
+        yield first_line
+        yield from lines
+
+    for line_number, row in enumerate(csv.reader(rows(), delimiter=delimiter), start=1):
+        cells = [cell.strip() for cell in row if cell.strip()]
+        if not cells:
+            continue
+        # Строку заголовка без цифр не считаем ошибкой
+        if line_number == 1 and not any(char.isdigit() for char in ''.join(cells)):
+            continue
+        value = cells[0]
+        if len(cells) > 1 and not is_valid_datetime(value):
+            value = f'{cells[0]} {cells[1]}'
+        yield line_number, value
+
+
+def _unfold_ics(lines):
+    """Склеивает перенесенные строки iCalendar"""
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _parse_ics_datetime(value: str):
+    """Преобразует DTSTART из iCalendar в формат слота (UTC переводится в местное время)"""
+    try:
+        if value.endswith('Z'):
+            dt = datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc).astimezone()
+            return dt.strftime(SLOT_FORMAT)
+        return datetime.strptime(value, '%Y%m%dT%H%M%S').strftime(SLOT_FORMAT)
+    except ValueError:
+        return value
+
+
+def _iter_ics_values(lines):
+    """Значения DTSTART событий из ICS"""
+    for line_number, line in enumerate(_unfold_ics(lines), start=1):
+        name, _, value = line.partition(':')
+        if name.split(';')[0].upper() == 'DTSTART':
+            yield line_number, _parse_ics_datetime(value.strip())
+
+
+def import_slots_from_file(path: str, file_kind: str) -> dict:
+    """Потоково разбирает CSV или ICS файл и массово добавляет будущие слоты.
+
+    Возвращает отчет: добавлено, пропущено (уже есть), пересекается с другими слотами,
+    с ошибкой и примеры ошибок.
+    """
+    report = {'inserted': 0, 'skipped': 0, 'conflicts': 0, 'invalid': 0, 'invalid_examples': []}
+
+    def valid_values(values):
+        for line_number, value in values:
+            if is_valid_datetime(value) and is_future_datetime(value):
+                yield normalize_slot(value)
+            else:
+                report['invalid'] += 1
+                if len(report['invalid_examples']) < INVALID_EXAMPLES_LIMIT:
+                    report['invalid_examples'].append(f'{line_number}: {value}')
+
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as import_file:
+        lines = iter(import_file)
+        values = _iter_ics_values(lines) if file_kind == 'ics' else _iter_csv_values(lines)
+        result = add_slots_bulk(valid_values(values), chunk_size=IMPORT_CHUNK_SIZE)
+
+    report['inserted'] = result['inserted']
+    report['skipped'] = result['skipped']
+    report['conflicts'] = result['conflicts']
+    return report
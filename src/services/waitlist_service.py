@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from telegram import Bot
+from telegram.error import Forbidden, RetryAfter
+from src.config.tenants import TenantLocal
+from src.config.settings import settings
+from src.database import events
+from src.database.schedule_repository import get_day_slots
+from src.database.waitlist_repository import get_waitlist_matches, remove_waitlist_entry
+from src.utils.formatters import format_datetime
+
+
+class WaitlistService:
+    """Уведомляет клиентов из листа ожидания об освободившихся слотах"""
+
+    def __init__(self):
+        self.bot = None
+        self.logger = logging.getLogger(__name__)
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    def set_bot(self, bot: Bot):
+        """Устанавливает бота для отправки сообщений"""
+        self.bot = bot
+
+    def start(self):
+        """Запускает фоновую отправку уведомлений в текущем цикле событий"""
+        if self._worker:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 0):
+        """Останавливает фоновую отправку, дав очереди до timeout секунд на отправку уже найденных уведомлений"""
+        if not self._worker:
+            return
+        if timeout > 0 or self._queue.qsize():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"Не отправлено уведомлений листа ожидания: пачек в очереди {self._queue.qsize()}")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def on_slots_freed(self, slots):
+        """Ставит освободившиеся слоты в очередь на сопоставление (из любого потока)"""
+        if self._queue is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, list(slots))
+
+    def _on_slots_added(self, slots):
+        self.on_slots_freed(slots)
+
+    def _on_appointment_cancelled(self, appointment):
+        self.on_slots_freed([{'id': appointment['slot_id'], 'datetime': appointment['datetime']}])
+
+    def _on_appointment_rescheduled(self, appointment, old_slot):
+        self.on_slots_freed([old_slot])
+
+    async def _run(self):
+        """Разбирает очередь освободившихся слотов"""
+        while True:
+            slots = await self._queue.get()
+            try:
+                await self._notify_waiting_clients(slots)
+            except Exception as e:
+                self.logger.error(f"Ошибка обработки листа ожидания: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _still_free(self, slot_date: str, slot_ids) -> list:
+        """Освободившиеся слоты даты, которые все еще свободны и не прошли"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M')
+        return [
+            slot for slot in get_day_slots(slot_date)
+            if slot['id'] in slot_ids and not slot['is_booked'] and slot['datetime'] > now
+        ]
+
+    async def _notify_waiting_clients(self, slots):
+        """Отправляет по уведомлению на каждый освободившийся слот в порядке очереди.
+
+        Заявка снимается из листа только после успешной отправки, поэтому
+        клиент, которому не удалось написать, дождется следующего слота.
+        Перед каждой отправкой слот перепроверяется: если его уже заняли,
+        уведомления по нему прекращаются.
+        """
+        slots_by_date = Counter(slot['datetime'][:10] for slot in slots)
+        slot_ids = {slot['id'] for slot in slots}
+
+        for slot_date, count in sorted(slots_by_date.items()):
+            entries = await asyncio.to_thread(
+                get_waitlist_matches, slot_date, count * settings.WAITLIST_NOTIFY_PER_SLOT
+            )
+            for entry in entries:
+                free_slots = await asyncio.to_thread(self._still_free, slot_date, slot_ids)
+                if not free_slots:
+                    break
+                if await self._send_notification(entry['client_chat_id'], free_slots[0]['datetime']):
+                    await asyncio.to_thread(remove_waitlist_entry, entry['id'])
+                await asyncio.sleep(1 / settings.WAITLIST_SEND_RATE)
+
+    async def _send_notification(self, client_chat_id: int, slot_datetime: str, retry: bool = True) -> bool:
+        """Отправляет клиенту уведомление о свободном времени; True, если заявку можно снять"""
+        if not self.bot:
+            return False
+
+        try:
+            await self.bot.send_message(
+                chat_id=client_chat_id,
+                text=(
+                    "🔔 **Появилось свободное время!**\n\n"
+                    f"📅 {format_datetime(slot_datetime)}\n\n"
+                    "Нажмите «📅 Записаться на консультацию», чтобы выбрать слот."
+                ),
+                parse_mode='Markdown'
+            )
+            return True
+        except RetryAfter as e:
+            if not retry:
+                self.logger.warning(f"Не удалось уведомить клиента {client_chat_id}: {e}")
+                return False
+            await asyncio.sleep(e.retry_after)
+            return await self._send_notification(client_chat_id, slot_datetime, retry=False)
+        except Forbidden as e:
+            # Клиент заблокировал бота: ждать в очереди ему бессмысленно
+            self.logger.warning(f"Клиент {client_chat_id} недоступен, заявка снята: {e}")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Не удалось уведомить клиента {client_chat_id}, заявка остается в листе: {e}")
+            return False
+
+
+waitlist_service = TenantLocal(WaitlistService, key='waitlist_service')
+
+events.subscribe(events.SLOTS_ADDED, waitlist_service.bind('_on_slots_added'))
+events.subscribe(events.APPOINTMENT_CANCELLED, waitlist_service.bind('_on_appointment_cancelled'))
+events.subscribe(events.APPOINTMENT_RESCHEDULED, waitlist_service.bind('_on_appointment_rescheduled'))
+
+
+def init_waitlist_service(bot: Bot):
+    """Инициализирует сервис листа ожидания"""
+    waitlist_service.set_bot(bot)
+    return waitlist_service
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from telegram import InputFile, Message
+from telegram.error import BadRequest
+from src.config.tenants import TenantLocal
+from src.config.settings import settings
+from src.database.media_repository import (
+    get_cached_file_id,
+    save_cached_file_id,
+    delete_cached_file_id
+)
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+PHOTO_EXTENSIONS = ['png', 'jpg', 'jpeg']
+
+
+class WelcomePhotoService:
+    """Отправка приветственного фото по закэшированному file_id"""
+
+    def __init__(self, assets_dir: str = ASSETS_DIR):
+        self.assets_dir = assets_dir
+        self.logger = logging.getLogger(__name__)
+        self._photo_path = None
+        self._file_signature = None
+        self._file_hash = None
+        self._file_id = None
+        self._checked_at = None
+        self._lock = asyncio.Lock()
+
+    def _find_photo(self):
+        """Ищет файл фото: WELCOME_PHOTO или psychologist_photo с поддерживаемым расширением"""
+        if settings.WELCOME_PHOTO:
+            return settings.WELCOME_PHOTO if os.path.exists(settings.WELCOME_PHOTO) else None
+        for ext in PHOTO_EXTENSIONS:
+            path = os.path.join(self.assets_dir, f'psychologist_photo.{ext}')
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _scan(self) -> tuple:
+        """Сверяет файл на диске с кэшем; выполняется в отдельном потоке.
+
+        Файл читается и хэшируется, только если изменились путь, mtime или размер.
+        Возвращает (путь, сигнатура, хэш, file_id).
+        """
+        photo_path = self._find_photo()
+        if not photo_path:
+            return None, None, None, None
+
+        stat = os.stat(photo_path)
+        signature = (photo_path, stat.st_mtime_ns, stat.st_size)
+        if signature == self._file_signature:
+            return photo_path, signature, self._file_hash, self._file_id
+
+        with open(photo_path, 'rb') as photo:
+            file_hash = hashlib.sha256(photo.read()).hexdigest()
+        if file_hash == self._file_hash:
+            return photo_path, signature, file_hash, self._file_id
+        return photo_path, signature, file_hash, get_cached_file_id(file_hash)
+
+    def _is_stale(self) -> bool:
+        return (self._checked_at is None or
+                time.monotonic() - self._checked_at >= settings.WELCOME_PHOTO_CHECK_INTERVAL)
+
+    async def _ensure_fresh(self):
+        """Проверяет файл на диске не чаще раза в WELCOME_PHOTO_CHECK_INTERVAL секунд"""
+        if not self._is_stale():
+            return
+        async with self._lock:
+            if not self._is_stale():
+                return
+            self._photo_path, self._file_signature, self._file_hash, self._file_id = (
+                await asyncio.to_thread(self._scan)
+            )
+            self._checked_at = time.monotonic()
+
+    async def _reply_cached(self, message: Message, caption: str, reply_markup) -> bool:
+        """Отправляет фото по file_id; False, если file_id нет или он недействителен"""
+        file_id = self._file_id
+        if not file_id:
+            return False
+        try:
+            await message.reply_photo(photo=file_id, caption=caption, reply_markup=reply_markup)
+            return True
+        except BadRequest:
+            if self._file_id == file_id:
+                self.logger.warning("Закэшированный file_id недействителен, фото будет загружено заново")
+                self._file_id = None
+                await asyncio.to_thread(delete_cached_file_id, self._file_hash)
+            return False
+
+    async def reply_photo(self, message: Message, caption: str, reply_markup=None) -> bool:
+        """Отвечает приветственным фото; возвращает False, если фото нет"""
+        await self._ensure_fresh()
+
+        if not self._photo_path:
+            return False
+
+        if await self._reply_cached(message, caption, reply_markup):
+            return True
+
+        # Одна загрузка на всех: остальные дождутся file_id и отправят фото по нему
+        async with self._lock:
+            if await self._reply_cached(message, caption, reply_markup):
+                return True
+
+            photo_path, file_hash = self._photo_path, self._file_hash
+            content = await asyncio.to_thread(_read_file, photo_path)
+            sent_message = await message.reply_photo(
+                photo=InputFile(content, filename=os.path.basename(photo_path)),
+                caption=caption,
+                reply_markup=reply_markup
+            )
+
+            if sent_message.photo:
+                self._file_id = sent_message.photo[-1].file_id
+                await asyncio.to_thread(save_cached_file_id, file_hash, self._file_id)
+
+        return True
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+welcome_photo_service = TenantLocal(WelcomePhotoService, key='welcome_photo_service')
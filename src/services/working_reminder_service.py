@@ -1,24 +1,32 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from telegram import Bot
+from src.config.tenants import TenantLocal
 from src.config.settings import settings
 from src.utils.formatters import format_datetime
-from src.database.core import get_db_connection
+from src.utils.tracing import tracer, traced
+from src.database.reminder_repository import (
+    save_reminder, get_due_reminders, mark_reminder_sent, expire_stale_reminders
+)
 
 
 class WorkingReminderService:
     def __init__(self):
         self.bot = None
         self.logger = logging.getLogger(__name__)
+        self._sending = asyncio.Lock()
+        self._stopping = False
 
     def set_bot(self, bot: Bot):
         """Устанавливает бота для отправки сообщений"""
         self.bot = bot
 
+    @traced('reminders.send_new_appointment_notification')
     async def send_new_appointment_notification(self, client_name: str, appointment_datetime: str, 
                                               client_contact: str, client_request: str):
         """Отправляет уведомление админам о новой записи"""
-        if not self.bot:
+        if not self.bot or not settings.ADMIN_REALTIME_NOTIFICATIONS:
             return
             
         try:
@@ -40,53 +48,89 @@ class WorkingReminderService:
         except Exception:
             pass
 
+    @traced('reminders.send_appointment_change_notification')
+    async def send_appointment_change_notification(self, client_name: str, old_datetime: str,
+                                                   new_datetime: str = None):
+        """Отправляет уведомление админам об отмене или переносе записи"""
+        if not self.bot or not settings.ADMIN_REALTIME_NOTIFICATIONS:
+            return
+            
+        try:
+            if new_datetime:
+                message = (
+                    f"🔄 **Запись перенесена**\n\n"
+                    f"👤 **Клиент:** {client_name}\n"
+                    f"📅 **Было:** {format_datetime(old_datetime)}\n"
+                    f"📅 **Стало:** {format_datetime(new_datetime)}"
+                )
+            else:
+                message = (
+                    f"❌ **Запись отменена клиентом**\n\n"
+                    f"👤 **Клиент:** {client_name}\n"
+                    f"📅 **Время:** {format_datetime(old_datetime)}"
+                )
+            
+            for admin_id in settings.ADMIN_IDS:
+                await self.bot.send_message(
+                    chat_id=admin_id,
+                    text=message,
+                    parse_mode='Markdown'
+                )
+        except Exception:
+            pass
+
+    @traced('reminders.save_reminder_to_db')
     def save_reminder_to_db(self, client_chat_id: int, client_name: str, appointment_datetime: str):
         """Сохраняет напоминание в базу данных для отправки за 24 часа"""
         try:
             appointment_dt = datetime.strptime(appointment_datetime, '%Y-%m-%d %H:%M')
-            reminder_time = appointment_dt - timedelta(hours=24)
+            reminder_time = appointment_dt - timedelta(hours=settings.REMINDER_HOURS_BEFORE)
             
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO reminders 
-                    (client_chat_id, client_name, appointment_datetime, reminder_time, is_sent) 
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (client_chat_id, client_name, appointment_datetime, reminder_time.isoformat(), False))
-                conn.commit()
+            save_reminder(client_chat_id, client_name, appointment_datetime, reminder_time.isoformat())
         except Exception:
             pass
 
     async def check_and_send_reminders(self):
-        """Проверяет и отправляет напоминания, которые должны быть отправлены сейчас"""
-        if not self.bot:
+        """Проверяет и отправляет напоминания, которые должны быть отправлены сейчас.
+        
+        Напоминания о прошедших консультациях снимаются с отправки, остальные
+        уходят не быстрее REMINDER_SEND_RATE в секунду. Если предыдущий проход
+        (например, догоняющий после простоя) еще идет, новый пропускается.
+        """
+        if not self.bot or self._stopping or self._sending.locked():
             return
             
-        try:
-            current_time = datetime.now()
-            
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT id, client_chat_id, client_name, appointment_datetime 
-                    FROM reminders 
-                    WHERE reminder_time <= ? AND is_sent = FALSE
-                ''', (current_time.isoformat(),))
-                
-                reminders = cursor.fetchall()
-                
-                for reminder in reminders:
-                    reminder_id, client_chat_id, client_name, appointment_datetime = reminder
-                    
-                    await self._send_reminder_to_client(client_chat_id, client_name, appointment_datetime)
+        async with self._sending:
+            try:
+                with tracer.span('job.check_reminders', root=True):
+                    current_time = datetime.now()
                     
-                    cursor.execute('UPDATE reminders SET is_sent = TRUE WHERE id = ?', (reminder_id,))
-                    conn.commit()
+                    expired = expire_stale_reminders(current_time.strftime('%Y-%m-%d %H:%M'))
+                    if expired:
+                        self.logger.info(f"Пропущено напоминаний о прошедших консультациях: {expired}")
                     
-        except Exception:
-            pass
+                    for reminder in get_due_reminders(current_time.isoformat()):
+                        if self._stopping:
+                            break
+                        await self._send_reminder_to_client(
+                            reminder['client_chat_id'], reminder['client_name'], reminder['appointment_datetime']
+                        )
+                        mark_reminder_sent(reminder['id'])
+                        await asyncio.sleep(1 / settings.REMINDER_SEND_RATE)
+                        
+            except Exception:
+                pass
 
+    async def stop(self, timeout: float):
+        """Прекращает отправку: дожидается текущего сообщения, остальные останутся в базе до следующего запуска"""
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._sending.acquire(), timeout=timeout)
+            self._sending.release()
+        except asyncio.TimeoutError:
+            self.logger.warning("Отправка напоминаний не завершилась за отведенное время")
+
+    @traced('reminders.send_reminder_to_client')
     async def _send_reminder_to_client(self, client_chat_id: int, client_name: str, appointment_datetime: str):
         """Отправляет напоминание клиенту"""
         try:
@@ -107,26 +151,10 @@ class WorkingReminderService:
             pass
 
 
-working_reminder_service = WorkingReminderService()
+working_reminder_service = TenantLocal(WorkingReminderService, key='working_reminder_service')
 
 
 def init_working_reminder_service(bot: Bot):
     """Инициализирует рабочий сервис напоминаний"""
     working_reminder_service.set_bot(bot)
-    
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reminders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                client_chat_id INTEGER NOT NULL,
-                client_name TEXT NOT NULL,
-                appointment_datetime TEXT NOT NULL,
-                reminder_time TEXT NOT NULL,
-                is_sent BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-    
-    return working_reminder_service
\ No newline at end of file
+    return working_reminder_service
@@ -0,0 +1,124 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+SLOT_FORMAT = '%Y-%m-%d %H:%M'
+# Меньшие пачки вставляются по одной: сдвиг списка дешевле полного слияния
+MERGE_THRESHOLD = 64
+
+
+def normalize_slot(value: str) -> str:
+    """Приводит время слота к виду с ведущими нулями: сортировка строк совпадает с хронологией"""
+    return datetime.strptime(value, SLOT_FORMAT).strftime(SLOT_FORMAT)
+
+
+def to_minutes(value: str) -> int:
+    """Переводит время слота в минуты от начала эпохи календаря (без учета перевода часов)"""
+    dt = datetime.strptime(value, SLOT_FORMAT)
+    return dt.toordinal() * 1440 + dt.hour * 60 + dt.minute
+
+
+def from_minutes(minutes: int) -> str:
+    """Обратное преобразование для to_minutes"""
+    days, rest = divmod(minutes, 1440)
+    return (datetime.fromordinal(days) + timedelta(minutes=rest)).strftime(SLOT_FORMAT)
+
+
+def shift(value: str, minutes: int) -> str:
+    """Сдвигает время слота на указанное число минут"""
+    return from_minutes(to_minutes(value) + minutes)
+
+
+def insort_many(values: list, new_values: list):
+    """Вставляет отсортированные new_values в отсортированный список values.
+
+    Одна вставка сдвигает весь хвост списка, поэтому большая пачка
+    дописывается в конец и сортируется: Timsort находит две готовые
+    последовательности и сливает их за O(n + k).
+    """
+    if len(new_values) < MERGE_THRESHOLD:
+        for value in new_values:
+            insort(values, value)
+    else:
+        values.extend(new_values)
+        values.sort()
+
+
+class IntervalSet:
+    """Отсортированные непересекающиеся полуинтервалы [start, end) в минутах.
+
+    Так как интервалы не пересекаются, их концы упорядочены так же, как
+    начала, и пересечение с новым интервалом возможно только у ближайшего
+    предшественника его конца: проверка занимает O(log n).
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._ends = []
+
+    def __len__(self):
+        return len(self._starts)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Пересекается ли [start, end) с каким-либо интервалом"""
+        index = bisect_left(self._starts, end) - 1
+        return index >= 0 and self._ends[index] > start
+
+    def add(self, start: int, end: int) -> bool:
+        """Добавляет интервал, если он ни с чем не пересекается"""
+        if self.overlaps(start, end):
+            return False
+        index = bisect_left(self._starts, start)
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+        return True
+
+    def add_many(self, intervals) -> list:
+        """Добавляет пачку интервалов; возвращает по флагу добавления на каждый в исходном порядке.
+
+        Результат тот же, что у add по возрастанию начал, но списки пополняются
+        одним слиянием за O(n + k) вместо сдвига на каждый интервал.
+        """
+        added = [False] * len(intervals)
+        new_starts, new_ends = [], []
+        for index in sorted(range(len(intervals)), key=lambda item: intervals[item][0]):
+            start, end = intervals[index]
+            if (new_ends and new_ends[-1] > start) or self.overlaps(start, end):
+                continue
+            added[index] = True
+            new_starts.append(start)
+            new_ends.append(end)
+        # Интервалы не пересекаются, поэтому концы упорядочены так же, как начала,
+        # и оба списка сливаются независимо
+        insort_many(self._starts, new_starts)
+        insort_many(self._ends, new_ends)
+        return added
+
+    def remove(self, start: int):
+        """Удаляет интервал, начинающийся в start"""
+        index = bisect_left(self._starts, start)
+        if index < len(self._starts) and self._starts[index] == start:
+            del self._starts[index]
+            del self._ends[index]
+
+    def iter_range(self, start: int, end: int):
+        """Интервалы, пересекающие [start, end), по возрастанию"""
+        index = max(bisect_right(self._starts, start) - 1, 0)
+        while index < len(self._starts) and self._starts[index] < end:
+            if self._ends[index] > start:
+                yield self._starts[index], self._ends[index]
+            index += 1
+
+
+def free_windows(occupied, start: int, end: int, min_length: int = 1) -> list:
+    """Свободные промежутки [start, end) между занятыми интервалами, отсортированными по началу"""
+    windows = []
+    cursor = start
+    for busy_start, busy_end in occupied:
+        if busy_start - cursor >= min_length:
+            windows.append((cursor, min(busy_start, end)))
+        cursor = max(cursor, busy_end)
+        if cursor >= end:
+            break
+    if end - cursor >= min_length:
+        windows.append((cursor, end))
+    return [(window_start, window_end) for window_start, window_end in windows if window_end - window_start >= min_length]
@@ -0,0 +1,83 @@
+import time
+
+
+class RateLimiter:
+    """Token bucket на пользователя и общий token bucket на весь бот.
+
+    Состояние пользователя хранится как список [токены, время обновления,
+    предупреждён ли]. Полностью восстановившиеся бакеты ничем не отличаются
+    от новых, поэтому простаивающие записи периодически удаляются.
+    """
+
+    def __init__(self, user_rate: float, user_burst: float,
+                 global_rate: float, global_burst: float, idle_ttl: float = 600):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.idle_ttl = max(idle_ttl, user_burst / user_rate if user_rate > 0 else 0)
+        self._buckets = {}
+        self._global_tokens = global_burst
+        self._global_updated_at = time.monotonic()
+        self._swept_at = self._global_updated_at
+
+    def __len__(self):
+        return len(self._buckets)
+
+    @staticmethod
+    def _refill(tokens: float, updated_at: float, rate: float, burst: float, now: float) -> float:
+        """Пополняет бакет за прошедшее время"""
+        return min(burst, tokens + max(0.0, now - updated_at) * rate)
+
+    def check(self, user_id: int, now: float = None):
+        """Списывает токен запроса.
+
+        Возвращает пару (разрешено, нужно ли предупредить пользователя).
+        Предупреждение выдаётся один раз за серию отклонённых запросов.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        if now - self._swept_at >= self.idle_ttl:
+            self._evict_idle(now)
+
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = [self.user_burst, now, False]
+            self._buckets[user_id] = bucket
+
+        user_tokens = bucket[0]
+        if self.user_rate > 0:
+            user_tokens = self._refill(bucket[0], bucket[1], self.user_rate, self.user_burst, now)
+        global_tokens = self._global_tokens
+        if self.global_rate > 0:
+            global_tokens = self._refill(
+                self._global_tokens, self._global_updated_at,
+                self.global_rate, self.global_burst, now
+            )
+
+        bucket[1] = now
+        self._global_updated_at = now
+
+        user_allowed = self.user_rate <= 0 or user_tokens >= 1
+        global_allowed = self.global_rate <= 0 or global_tokens >= 1
+
+        if user_allowed and global_allowed:
+            bucket[0] = user_tokens - 1 if self.user_rate > 0 else user_tokens
+            self._global_tokens = global_tokens - 1 if self.global_rate > 0 else global_tokens
+            bucket[2] = False
+            return True, False
+
+        bucket[0] = user_tokens
+        self._global_tokens = global_tokens
+        notify = not bucket[2]
+        bucket[2] = True
+        return False, notify
+
+    def _evict_idle(self, now: float):
+        """Удаляет бакеты пользователей, простаивающих дольше idle_ttl"""
+        self._swept_at = now
+        cutoff = now - self.idle_ttl
+        idle_users = [user_id for user_id, bucket in self._buckets.items() if bucket[1] <= cutoff]
+        for user_id in idle_users:
+            del self._buckets[user_id]
@@ -0,0 +1,86 @@
+import heapq
+import time
+
+
+class SlotHolds:
+    """Временные брони слотов на время заполнения анкеты.
+
+    У пользователя не больше одной брони. Сроки лежат в куче (срок, слот,
+    пользователь); записи продленных и снятых броней не удаляются из кучи
+    сразу, а пропускаются, когда до них доходит очередь.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._holds = {}
+        self._by_user = {}
+        self._expiry = []
+
+    def __len__(self):
+        return len(self._holds)
+
+    def _expire(self, now: float):
+        """Снимает брони с наступившим сроком"""
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, slot_id, user_id = heapq.heappop(self._expiry)
+            if self._holds.get(slot_id) == (user_id, expires_at):
+                del self._holds[slot_id]
+                del self._by_user[user_id]
+        # Куча не должна расти из-за продлений: пересобираем, когда устаревших записей большинство
+        if len(self._expiry) > 2 * len(self._holds) + 64:
+            self._expiry = [(expires_at, slot_id, user_id) for slot_id, (user_id, expires_at) in self._holds.items()]
+            heapq.heapify(self._expiry)
+
+    def _set(self, slot_id: int, user_id: int, now: float):
+        expires_at = now + self.ttl
+        self._holds[slot_id] = (user_id, expires_at)
+        self._by_user[user_id] = slot_id
+        heapq.heappush(self._expiry, (expires_at, slot_id, user_id))
+
+    def hold(self, slot_id: int, user_id: int, now: float = None) -> bool:
+        """Бронирует слот за пользователем, снимая его прежнюю бронь; False, если слот держит другой"""
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+
+        holder = self._holds.get(slot_id)
+        if holder and holder[0] != user_id:
+            return False
+        self.release(user_id)
+        self._set(slot_id, user_id, now)
+        return True
+
+    def extend(self, user_id: int, now: float = None) -> bool:
+        """Продлевает бронь активного пользователя; False, если брони уже нет"""
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+
+        slot_id = self._by_user.get(user_id)
+        if slot_id is None:
+            return False
+        self._set(slot_id, user_id, now)
+        return True
+
+    def release(self, user_id: int):
+        """Снимает бронь пользователя"""
+        slot_id = self._by_user.pop(user_id, None)
+        if slot_id is not None:
+            del self._holds[slot_id]
+
+    def held_by_other(self, slot_id: int, user_id: int, now: float = None) -> bool:
+        """Держит ли слот другой пользователь"""
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+
+        holder = self._holds.get(slot_id)
+        return bool(holder) and holder[0] != user_id
+
+    def visible_to(self, slots: list, user_id: int, now: float = None) -> list:
+        """Слоты без чужих броней"""
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+
+        return [slot for slot in slots if self._holds.get(slot['id'], (user_id,))[0] == user_id]
@@ -0,0 +1,213 @@
+import contextvars
+import functools
+import heapq
+import inspect
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from src.config.settings import settings
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """Отрезок работы внутри трассы"""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start', 'duration_ms', 'error')
+
+    def __init__(self, trace, name: str, parent_id: str = None, attributes: dict = None):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'offset_ms': round((self.start - self.trace.start) * 1000, 3),
+            'duration_ms': round(self.duration_ms or 0, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class Trace:
+    """Все отрезки одного обновления или фоновой задачи"""
+
+    __slots__ = ('trace_id', 'name', 'start', 'started_at', 'spans', 'root')
+
+    def __init__(self, name: str):
+        self.trace_id = secrets.token_hex(16)
+        self.name = name
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.root = None
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms or 0
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': round(self.started_at, 3),
+            'duration_ms': round(self.duration_ms, 3),
+            'spans': [span.to_dict() for span in self.spans],
+        }
+
+
+class JsonlTraceExporter:
+    """Пишет каждую завершенную трассу одной строкой JSON в локальный файл"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, trace: Trace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class Tracer:
+    """Трассировка обновлений: корневой отрезок на обновление, дочерние на БД, Bot API и шаги сервисов.
+
+    Решение о сохранении принимается по завершении трассы: сохраняется доля
+    sample_rate всех трасс и любая трасса медленнее slow_ms. Самые медленные
+    трассы также держатся в памяти для просмотра из бота.
+    """
+
+    def __init__(self, enabled: bool = False, exporter=None, sample_rate: float = 1.0,
+                 slow_ms: float = 1000, keep_slowest: int = 10):
+        self.enabled = enabled
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.keep_slowest = keep_slowest
+        self.logger = logging.getLogger(__name__)
+        self._slowest = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, root: bool = False, **attributes):
+        """Отрезок внутри текущей трассы; root=True начинает новую трассу, если ее нет.
+
+        Вне трассы дочерние отрезки не создаются, так что инструментирование
+        ничего не стоит, когда трассировка выключена.
+        """
+        parent = _current_span.get()
+        if not self.enabled or (parent is None and not root):
+            yield None
+            return
+
+        if parent is None:
+            trace = Trace(name)
+            span = Span(trace, name, attributes=attributes)
+            trace.root = span
+        else:
+            trace = parent.trace
+            span = Span(trace, name, parent.span_id, attributes)
+        trace.spans.append(span)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - span.start) * 1000
+            _current_span.reset(token)
+            if span is trace.root:
+                self._finish(trace)
+
+    def _finish(self, trace: Trace):
+        """Сохраняет трассу, если она попала в выборку или оказалась медленной"""
+        is_slow = trace.duration_ms >= self.slow_ms
+        if self.exporter and (is_slow or random.random() < self.sample_rate):
+            try:
+                self.exporter.export(trace)
+            except Exception as e:
+                self.logger.warning(f"Не удалось сохранить трассу: {e}")
+
+        if self.keep_slowest:
+            with self._lock:
+                item = (trace.duration_ms, trace.trace_id, trace)
+                if len(self._slowest) < self.keep_slowest:
+                    heapq.heappush(self._slowest, item)
+                elif item > self._slowest[0]:
+                    heapq.heapreplace(self._slowest, item)
+
+    def get_slowest(self) -> list:
+        """Самые медленные трассы с момента запуска, от медленных к быстрым"""
+        with self._lock:
+            return [trace for _, _, trace in sorted(self._slowest, reverse=True)]
+
+    def shutdown(self):
+        if self.exporter:
+            self.exporter.close()
+
+
+def format_trace(trace: Trace) -> str:
+    """Текстовая разбивка трассы по отрезкам с отступами по вложенности"""
+    depth = {}
+    lines = []
+    for span in trace.spans:
+        depth[span.span_id] = depth.get(span.parent_id, -1) + 1
+        lines.append(f"{'  ' * depth[span.span_id]}{span.name}: {span.duration_ms or 0:.1f} мс"
+                     + (f" ({span.error})" if span.error else ''))
+    return '\n'.join(lines)
+
+
+tracer = Tracer(
+    enabled=settings.TRACING_ENABLED,
+    exporter=JsonlTraceExporter(settings.TRACE_FILE) if settings.TRACE_FILE else None,
+    sample_rate=settings.TRACE_SAMPLE_RATE,
+    slow_ms=settings.TRACE_SLOW_MS,
+    keep_slowest=settings.TRACE_KEEP_SLOWEST,
+)
+
+
+def traced(name: str = None):
+    """Декоратор: оборачивает вызов функции в отрезок текущей трассы"""
+    def decorator(func):
+        span_name = name or f'{func.__module__.rsplit(".", 1)[-1]}.{func.__name__}'
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
@@ -0,0 +1,50 @@
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+# Настройки читаются при импорте src: тесты не должны зависеть от локального .env
+os.environ.setdefault('BOT_TOKEN', 'test-token')
+os.environ.setdefault('DATABASE_URL', 'memory://tests')
+
+from src.config.tenants import Tenant, use_tenant  # noqa: E402
+from src.database.models import DatabaseManager  # noqa: E402
+from src.database.storage import MemoryStorage, SQLiteStorage, set_storage  # noqa: E402
+
+
+def sqlite_connection_factory(path):
+    """Фабрика соединений к файлу базы, приведенной к актуальной схеме"""
+    manager = DatabaseManager(f'sqlite:///{path}')
+
+    @contextmanager
+    def connection():
+        conn = manager.get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    return connection
+
+
+@pytest.fixture
+def day():
+    """День в будущем, чтобы записи можно было отменять и переносить"""
+    return (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def storage(request, tmp_path):
+    """Одно и то же хранилище в обеих реализациях"""
+    if request.param == 'memory':
+        return MemoryStorage()
+    return SQLiteStorage(sqlite_connection_factory(tmp_path / 'bot.db'))
+
+
+@pytest.fixture
+def tenant_storage(storage):
+    """Хранилище отдельного психолога, через которое работают репозитории и события"""
+    with use_tenant(Tenant('tests')):
+        set_storage(storage)
+        yield storage
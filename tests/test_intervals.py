@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from src.utils.intervals import (
+    MERGE_THRESHOLD, IntervalSet, free_windows, from_minutes, insort_many, normalize_slot, to_minutes
+)
+
+
+def test_normalize_slot_pads_month_day_and_hour():
+    assert normalize_slot('2030-1-5 9:05') == '2030-01-05 09:05'
+    assert normalize_slot('2030-01-05 09:05') == '2030-01-05 09:05'
+    with pytest.raises(ValueError):
+        normalize_slot('2030-01-05')
+
+
+def test_minutes_round_trip():
+    assert from_minutes(to_minutes('2030-12-31 23:30') + 60) == '2031-01-01 00:30'
+
+
+@pytest.mark.parametrize('size', [MERGE_THRESHOLD - 1, MERGE_THRESHOLD, MERGE_THRESHOLD * 4])
+def test_insort_many_keeps_order(size):
+    values = sorted(random.Random(size).sample(range(10000), 200))
+    new_values = sorted(random.Random(-size).sample(range(10000), size))
+
+    insort_many(values, new_values)
+
+    assert values == sorted(values)
+    assert len(values) == 200 + size
+
+
+def test_interval_set_rejects_overlaps():
+    intervals = IntervalSet()
+
+    assert intervals.add(60, 120)
+    assert intervals.add(180, 240)
+    assert not intervals.add(100, 130)
+    assert not intervals.add(30, 61)
+    assert not intervals.add(0, 1000)
+    # Полуинтервалы: касание концами не пересечение
+    assert intervals.add(120, 180)
+    assert len(intervals) == 3
+    assert list(intervals.iter_range(0, 1000)) == [(60, 120), (120, 180), (180, 240)]
+
+
+def test_interval_set_remove_and_iter_range():
+    intervals = IntervalSet()
+    for start in (0, 100, 200, 300):
+        intervals.add(start, start + 50)
+
+    intervals.remove(100)
+    intervals.remove(150)
+
+    assert list(intervals.iter_range(40, 260)) == [(0, 50), (200, 250)]
+    assert list(intervals.iter_range(50, 200)) == []
+    assert intervals.add(100, 150)
+
+
+@pytest.mark.parametrize('size', [MERGE_THRESHOLD // 2, MERGE_THRESHOLD * 4])
+def test_add_many_matches_sequential_add(size):
+    generator = random.Random(size)
+    existing = [(start, start + generator.randint(10, 60)) for start in range(0, 20000, 200)]
+    batch = [(start, start + generator.randint(10, 90)) for start in generator.sample(range(20000), size)]
+
+    sequential = IntervalSet()
+    merged = IntervalSet()
+    for start, end in existing:
+        sequential.add(start, end)
+        merged.add(start, end)
+    expected = {index: sequential.add(*batch[index]) for index in sorted(range(size), key=lambda index: batch[index][0])}
+
+    assert merged.add_many(batch) == [expected[index] for index in range(size)]
+    assert list(merged.iter_range(0, 30000)) == list(sequential.iter_range(0, 30000))
+
+
+def test_free_windows():
+    occupied = [(0, 30), (60, 90), (95, 120), (150, 200)]
+
+    assert free_windows(occupied, 10, 180) == [(30, 60), (90, 95), (120, 150)]
+    assert free_windows(occupied, 10, 180, min_length=10) == [(30, 60), (120, 150)]
+    assert free_windows(occupied, 200, 260) == [(200, 260)]
+    assert free_windows([], 0, 60) == [(0, 60)]
+    assert free_windows([(0, 100)], 10, 60) == []
@@ -0,0 +1,88 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from src.config.settings import settings
+from src.database.migrations import LATEST_VERSION, _create_base_schema, get_schema_version, run_migrations
+from src.database.storage import SQLiteStorage
+
+from tests.conftest import sqlite_connection_factory
+
+
+def _baseline_database(path):
+    """База в исходной схеме, как ее создавали версии бота без миграций"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    _create_base_schema(conn)
+    now = datetime.now()
+    rows = [
+        ((now - timedelta(days=3)).strftime('%Y-%m-%d 10:00'), 101, 'primary'),
+        ((now + timedelta(days=2)).strftime('%Y-%m-%d 12:00'), 102, 'repeat'),
+        ((now + timedelta(days=5)).strftime('%Y-%m-%d 09:00'), None, 'primary'),
+    ]
+    for index, (slot_datetime, chat_id, consultation_type) in enumerate(rows):
+        cursor = conn.execute('INSERT INTO schedule_slots (datetime, is_booked) VALUES (?, TRUE)', (slot_datetime,))
+        conn.execute(
+            '''INSERT INTO appointments (client_name, client_contact, slot_id, consultation_type, created_at)
+            VALUES (?, ?, ?, ?, ?)''',
+            (f'Клиент {index}', f'@client{index}', cursor.lastrowid, consultation_type,
+             (now - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S'))
+        )
+        if chat_id:
+            conn.execute(
+                '''INSERT INTO reminders (client_chat_id, client_name, appointment_datetime, reminder_time)
+                VALUES (?, ?, ?, ?)''',
+                (chat_id, f'Клиент {index}', slot_datetime, slot_datetime.replace(' ', 'T'))
+            )
+    conn.execute('INSERT INTO schedule_slots (datetime) VALUES (?)', ((now + timedelta(days=6)).strftime('%Y-%m-%d 15:00'),))
+    return conn
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def test_baseline_database_is_upgraded(tmp_path):
+    path = tmp_path / 'legacy.db'
+    conn = _baseline_database(path)
+    assert get_schema_version(conn) == 0
+
+    assert run_migrations(conn) == LATEST_VERSION
+    assert get_schema_version(conn) == LATEST_VERSION
+
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'media_cache', 'schedule_slots_archive', 'appointments_archive', 'reminders_archive',
+            'waitlist', 'stats_daily', 'stats_weekly', 'bot_state'} <= tables
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert 'idx_reminders_backfill_datetime' not in indexes
+    assert {'duration_minutes', 'buffer_minutes'} <= _columns(conn, 'schedule_slots')
+    assert conn.execute('SELECT DISTINCT duration_minutes FROM schedule_slots').fetchall() == [
+        (int(settings.SESSION_DURATION_MINUTES),)
+    ]
+
+    # client_chat_id заполнен из напоминаний там, где они были
+    assert conn.execute('SELECT client_chat_id FROM appointments ORDER BY id').fetchall() == [(101,), (102,), (None,)]
+    conn.close()
+
+
+def test_migration_backfills_stats(tmp_path):
+    path = tmp_path / 'legacy.db'
+    conn = _baseline_database(path)
+    run_migrations(conn)
+    conn.close()
+
+    storage = SQLiteStorage(sqlite_connection_factory(path))
+    migrated = (storage.list_stats('day', '', '9999'), storage.list_stats('week', '', '9999'))
+    assert sum(row['slots'] for row in migrated[0]) == 4
+    assert sum(row['bookings'] for row in migrated[0]) == 3
+
+    storage.rebuild_stats()
+    assert (storage.list_stats('day', '', '9999'), storage.list_stats('week', '', '9999')) == migrated
+
+
+def test_migrations_are_idempotent(tmp_path):
+    conn = _baseline_database(tmp_path / 'legacy.db')
+    run_migrations(conn)
+    slots = conn.execute('SELECT * FROM schedule_slots ORDER BY id').fetchall()
+
+    assert run_migrations(conn) == LATEST_VERSION
+    assert conn.execute('SELECT * FROM schedule_slots ORDER BY id').fetchall() == slots
+    conn.close()
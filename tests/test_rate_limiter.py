@@ -0,0 +1,50 @@
+import time
+
+from src.utils.rate_limiter import RateLimiter
+
+
+def test_user_burst_then_refill():
+    limiter = RateLimiter(user_rate=1, user_burst=3, global_rate=0, global_burst=0)
+
+    assert [limiter.check(1, now=0) for _ in range(3)] == [(True, False)] * 3
+    assert limiter.check(1, now=0) == (False, True)
+    # Предупреждение - один раз за серию отказов
+    assert limiter.check(1, now=0.5) == (False, False)
+    assert limiter.check(1, now=1) == (True, False)
+    assert limiter.check(1, now=1) == (False, True)
+
+
+def test_users_have_separate_buckets():
+    limiter = RateLimiter(user_rate=1, user_burst=1, global_rate=0, global_burst=0)
+
+    assert limiter.check(1, now=0) == (True, False)
+    assert limiter.check(2, now=0) == (True, False)
+    assert limiter.check(1, now=0) == (False, True)
+
+
+def test_global_limit_applies_to_all_users():
+    limiter = RateLimiter(user_rate=10, user_burst=10, global_rate=1, global_burst=2)
+
+    assert limiter.check(1, now=0)[0]
+    assert limiter.check(2, now=0)[0]
+    assert limiter.check(3, now=0) == (False, True)
+    assert limiter.check(3, now=1)[0]
+
+
+def test_zero_rate_disables_limit():
+    limiter = RateLimiter(user_rate=0, user_burst=0, global_rate=0, global_burst=0)
+
+    assert all(limiter.check(1, now=0) == (True, False) for _ in range(100))
+
+
+def test_idle_buckets_are_evicted():
+    limiter = RateLimiter(user_rate=1, user_burst=5, global_rate=0, global_burst=0, idle_ttl=60)
+    # Очистка отсчитывается от времени создания лимитера
+    start = time.monotonic()
+    for user_id in range(100):
+        limiter.check(user_id, now=start)
+    assert len(limiter) == 100
+
+    limiter.check(1000, now=start + 100)
+
+    assert len(limiter) == 1
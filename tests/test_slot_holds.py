@@ -0,0 +1,65 @@
+from src.utils.slot_holds import SlotHolds
+
+
+def test_hold_blocks_other_users_until_expiry():
+    holds = SlotHolds(ttl=60)
+
+    assert holds.hold(1, user_id=10, now=0)
+    assert not holds.hold(1, user_id=20, now=30)
+    assert holds.held_by_other(1, user_id=20, now=30)
+    assert not holds.held_by_other(1, user_id=10, now=30)
+
+    assert holds.hold(1, user_id=20, now=60)
+    assert holds.held_by_other(1, user_id=10, now=60)
+
+
+def test_new_hold_releases_previous_slot():
+    holds = SlotHolds(ttl=60)
+    holds.hold(1, user_id=10, now=0)
+
+    assert holds.hold(2, user_id=10, now=1)
+    assert len(holds) == 1
+    assert holds.hold(1, user_id=20, now=2)
+
+
+def test_extend_moves_expiry():
+    holds = SlotHolds(ttl=60)
+    holds.hold(1, user_id=10, now=0)
+
+    assert holds.extend(10, now=50)
+    # Устаревшая запись кучи с прежним сроком не снимает продленную бронь
+    assert holds.held_by_other(1, user_id=20, now=100)
+    assert not holds.held_by_other(1, user_id=20, now=110)
+    assert not holds.extend(10, now=110)
+
+
+def test_release():
+    holds = SlotHolds(ttl=60)
+    holds.hold(1, user_id=10, now=0)
+
+    holds.release(10)
+    holds.release(10)
+
+    assert len(holds) == 0
+    assert holds.hold(1, user_id=20, now=1)
+
+
+def test_visible_to_hides_slots_held_by_others():
+    holds = SlotHolds(ttl=60)
+    slots = [{'id': 1}, {'id': 2}, {'id': 3}]
+    holds.hold(1, user_id=10, now=0)
+    holds.hold(2, user_id=20, now=0)
+
+    assert holds.visible_to(slots, user_id=10, now=1) == [{'id': 1}, {'id': 3}]
+    assert holds.visible_to(slots, user_id=30, now=1) == [{'id': 3}]
+    assert holds.visible_to(slots, user_id=30, now=60) == slots
+
+
+def test_extensions_do_not_grow_heap():
+    holds = SlotHolds(ttl=60)
+    holds.hold(1, user_id=10, now=0)
+
+    for now in range(1, 10000):
+        holds.extend(10, now=now)
+
+    assert len(holds._expiry) <= 2 * len(holds) + 65
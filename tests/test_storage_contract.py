@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+
+from src.database import appointment_repository, schedule_repository
+from src.database.analytics_repository import get_daily_stats, get_weekly_stats, rebuild_stats
+from src.services.analytics_service import analytics_service  # noqa: F401 - подписка на события
+from src.utils.intervals import MERGE_THRESHOLD
+
+CLIENT = {
+    'client_name': 'Анна',
+    'client_contact': '@anna',
+    'client_request': 'тревога',
+    'consultation_type': 'primary',
+    'client_chat_id': 7,
+}
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M')
+
+
+def _datetimes(slots):
+    return [slot['datetime'] for slot in slots]
+
+
+def _slot_ids(storage, *datetimes):
+    ids = {slot['datetime']: slot['id'] for slot in storage.list_slots()}
+    return [ids[value] for value in datetimes]
+
+
+def test_add_single_slot(storage, day):
+    inserted, conflicts = storage.add_slots([f'{day} 10:00'], 50)
+
+    assert _datetimes(inserted) == [f'{day} 10:00']
+    assert conflicts == []
+    assert storage.list_slots() == [{'id': inserted[0]['id'], 'datetime': f'{day} 10:00', 'is_booked': False}]
+
+
+def test_add_slots_skips_existing_and_rejects_overlaps(storage, day):
+    storage.add_slots([f'{day} 10:00'], 50)
+
+    inserted, conflicts = storage.add_slots(
+        [f'{day} 12:00', f'{day} 10:00', f'{day} 10:30', f'{day} 11:00', f'{day} 11:30'], 50, 10
+    )
+
+    # 10:00 уже есть, 10:30 пересекается с ним, 11:30 - со слотом 11:00 из той же пачки,
+    # а 12:00 начинается ровно в конце перерыва после 11:00
+    assert sorted(_datetimes(inserted)) == [f'{day} 11:00', f'{day} 12:00']
+    assert conflicts == [f'{day} 10:30', f'{day} 11:30']
+    assert _datetimes(storage.list_slots()) == [f'{day} 10:00', f'{day} 11:00', f'{day} 12:00']
+
+
+def test_add_slots_normalizes_unpadded_times(storage, day):
+    storage.add_slots([f'{day} 10:00'], 50)
+    year, month, day_of_month = (int(part) for part in day.split('-'))
+
+    inserted, conflicts = storage.add_slots([f'{year}-{month}-{day_of_month} 9:05'], 50)
+
+    assert _datetimes(inserted) == [f'{day} 09:05']
+    assert conflicts == []
+    assert _datetimes(storage.list_slots()) == [f'{day} 09:05', f'{day} 10:00']
+
+
+def test_bulk_add_matches_one_by_one(storage, day):
+    start = datetime.strptime(f'{day} 00:00', '%Y-%m-%d %H:%M')
+    existing = [(start + timedelta(minutes=90 * index)).strftime('%Y-%m-%d %H:%M') for index in range(20)]
+    storage.add_slots(existing, 60)
+
+    # Пачка больше порога слияния: каждый второй слот пересекается с существующим
+    batch = [(start + timedelta(minutes=45 * index)).strftime('%Y-%m-%d %H:%M') for index in range(MERGE_THRESHOLD * 2)]
+    inserted, conflicts = storage.add_slots(batch, 30)
+
+    expected = []
+    busy = [(start + timedelta(minutes=90 * index), start + timedelta(minutes=90 * index + 60)) for index in range(20)]
+    for value in batch:
+        slot_start = datetime.strptime(value, '%Y-%m-%d %H:%M')
+        slot_end = slot_start + timedelta(minutes=30)
+        if value in existing:
+            continue
+        if all(slot_end <= busy_start or slot_start >= busy_end for busy_start, busy_end in busy):
+            expected.append(value)
+            busy.append((slot_start, slot_end))
+
+    assert sorted(_datetimes(inserted)) == expected
+    assert len(conflicts) == len(batch) - len(expected) - len(set(batch) & set(existing))
+    assert _datetimes(storage.list_slots()) == sorted(existing + expected)
+    assert _datetimes(storage.list_slots(is_booked=False)) == sorted(existing + expected)
+
+
+def test_book_cancel_and_reschedule(storage, day):
+    storage.add_slots([f'{day} 10:00', f'{day} 12:00', f'{day} 14:00'], 60)
+    first, second, third = _slot_ids(storage, f'{day} 10:00', f'{day} 12:00', f'{day} 14:00')
+
+    appointment = storage.book_appointment(first, CLIENT)
+    assert appointment['datetime'] == f'{day} 10:00'
+    assert appointment['duration_minutes'] == 60
+    assert storage.book_appointment(first, CLIENT) is None
+    assert _datetimes(storage.list_slots(is_booked=True)) == [f'{day} 10:00']
+    assert _datetimes(storage.list_appointments(client_chat_id=7)) == [f'{day} 10:00']
+
+    appointment_id = appointment['appointment_id']
+    storage.add_reminder(7, 'Анна', f'{day} 10:00', f'{day}T09:00:00')
+
+    assert storage.cancel_appointment(appointment_id, 8, _now()) is None
+    assert storage.reschedule_appointment(appointment_id, 7, first, _now(), 1) is None
+
+    moved, old_slot = storage.reschedule_appointment(appointment_id, 7, second, _now(), 1)
+    assert moved['datetime'] == f'{day} 12:00'
+    assert old_slot == {'id': first, 'datetime': f'{day} 10:00'}
+    assert _datetimes(storage.list_slots(is_booked=False)) == [f'{day} 10:00', f'{day} 14:00']
+    reminders = storage.get_due_reminders('9999')
+    assert [reminder['appointment_datetime'] for reminder in reminders] == [f'{day} 12:00']
+
+    # Напоминание о прежнем времени уже ушло: после переноса нужно новое
+    storage.mark_reminder_sent(reminders[0]['id'])
+    storage.reschedule_appointment(appointment_id, 7, third, _now(), 1)
+    assert [reminder['appointment_datetime'] for reminder in storage.get_due_reminders('9999')] == [f'{day} 14:00']
+
+    cancelled = storage.cancel_appointment(appointment_id, 7, _now())
+    assert cancelled['datetime'] == f'{day} 14:00'
+    assert storage.list_appointments() == []
+    assert storage.list_slots(is_booked=True) == []
+    assert storage.get_due_reminders('9999') == []
+
+
+def test_delete_free_slot(storage, day):
+    storage.add_slots([f'{day} 10:00', f'{day} 12:00'], 60)
+    free, booked = _slot_ids(storage, f'{day} 10:00', f'{day} 12:00')
+    storage.book_appointment(booked, CLIENT)
+
+    assert storage.delete_free_slot(booked) is None
+    assert storage.delete_free_slot(free) == {'id': free, 'datetime': f'{day} 10:00'}
+    # Освободившееся время снова можно занять
+    inserted, _ = storage.add_slots([f'{day} 10:30'], 60)
+    assert _datetimes(inserted) == [f'{day} 10:30']
+
+
+def test_month_view(storage, day):
+    next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    storage.add_slots([f'{day} 10:00', f'{day} 12:00', f'{next_day} 14:00'], 60)
+    storage.book_appointment(_slot_ids(storage, f'{day} 12:00')[0], CLIENT)
+
+    after_next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=2)).strftime('%Y-%m-%d')
+    assert storage.count_slots_by_day(f'{day} 00:00', f'{after_next_day} 00:00') == {
+        day: {'free': 1, 'booked': 1},
+        next_day: {'free': 1, 'booked': 0},
+    }
+    assert storage.count_slots_by_day(f'{next_day} 00:00', f'{after_next_day} 00:00') == {
+        next_day: {'free': 1, 'booked': 0},
+    }
+
+
+def test_free_windows(storage, day):
+    storage.add_slots([f'{day} 10:00'], 60)
+    storage.add_slots([f'{day} 12:00'], 60, 15)
+
+    assert storage.list_free_windows(f'{day} 09:00', f'{day} 14:00', 30) == [
+        (f'{day} 09:00', f'{day} 10:00'),
+        (f'{day} 11:00', f'{day} 12:00'),
+        (f'{day} 13:15', f'{day} 14:00'),
+    ]
+    assert storage.list_free_windows(f'{day} 09:00', f'{day} 14:00', 50) == [
+        (f'{day} 09:00', f'{day} 10:00'),
+        (f'{day} 11:00', f'{day} 12:00'),
+    ]
+    # Слот, начавшийся до интервала, тоже занимает его начало
+    assert storage.list_free_windows(f'{day} 10:30', f'{day} 11:30') == [(f'{day} 11:00', f'{day} 11:30')]
+
+
+def test_rebuild_stats_matches_incremental(tenant_storage, day):
+    next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    far_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=9)).strftime('%Y-%m-%d')
+    schedule_repository.add_slot_to_schedule(f'{day} 10:00')
+    schedule_repository.add_slots_bulk([f'{day} 12:00', f'{day} 14:00', f'{next_day} 10:00', f'{far_day} 10:00'])
+    ids = dict(zip(
+        ['10', '12', '14', 'next', 'far'],
+        _slot_ids(tenant_storage, f'{day} 10:00', f'{day} 12:00', f'{day} 14:00', f'{next_day} 10:00', f'{far_day} 10:00')
+    ))
+
+    assert appointment_repository.book_appointment(ids['10'], 'Анна', '@anna', client_chat_id=7)
+    assert appointment_repository.book_appointment(ids['12'], 'Борис', '@boris', consultation_type='repeat', client_chat_id=8)
+    assert appointment_repository.book_appointment(ids['14'], 'Вера', '@vera', client_chat_id=9)
+    appointments = {appointment['client_chat_id']: appointment['appointment_id']
+                    for appointment in tenant_storage.list_appointments()}
+    assert appointment_repository.reschedule_appointment(appointments[7], 7, ids['far'])
+    assert appointment_repository.cancel_appointment(appointments[9], 9)
+    assert schedule_repository.delete_available_slot(ids['next'])
+
+    incremental = (get_daily_stats('', '9999'), get_weekly_stats('', '9999'))
+    assert sum(row['bookings'] for row in incremental[0]) == 2
+
+    assert rebuild_stats() > 0
+    rebuilt = (get_daily_stats('', '9999'), get_weekly_stats('', '9999'))
+
+    def nonzero(rows):
+        return [row for row in rows if any(value for key, value in row.items() if key != 'period')]
+
+    assert nonzero(rebuilt[0]) == nonzero(incremental[0])
+    assert nonzero(rebuilt[1]) == nonzero(incremental[1])